@@ -1,22 +1,246 @@
-"""Rolling buffer for recently captured frames."""
+"""Rolling buffers for recently captured frames."""
 
 from __future__ import annotations
 
-from collections import deque
-from dataclasses import dataclass
+import heapq
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Deque, List
+from typing import Callable, List, Literal, Optional, Tuple, Union
 
+import numpy as np
 
-@dataclass
+try:  # pragma: no cover - optional dependency
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - executed when OpenCV unavailable
+    cv2 = None
+
+
+@dataclass(slots=True)
 class FrameRef:
     """Reference to a frame stored on disk."""
 
     path: Path
     ts: float
+    frame_id: Optional[int] = None
+
+    def load(self) -> Optional[np.ndarray]:
+        """Read the frame from disk (``None`` if unreadable)."""
+        return cv2.imread(str(self.path)) if cv2 is not None else None
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedFrame:
+    """Encoded frame bytes copied out of an :class:`EncodedRingBuffer`."""
+
+    data: bytes
+    ts: float
+    frame_id: Optional[int] = None
+
+    def load(self) -> Optional[np.ndarray]:
+        """Decode the frame (``None`` if OpenCV is unavailable)."""
+        if cv2 is None:  # pragma: no cover - executed if OpenCV missing
+            return None
+        buf = np.frombuffer(self.data, dtype=np.uint8)
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+@dataclass(frozen=True, slots=True)
+class RawFrame:
+    """Zero-copy, read-only view of a slot in an :class:`MmapRingBuffer`.
+
+    ``image`` aliases the ring file and shows a newer frame once the slot is
+    reused ``capacity`` appends later. ``stamp`` views the slot's timestamp,
+    so :meth:`load` can tell whether the slot still holds this frame.
+    """
+
+    image: np.ndarray
+    ts: float
+    frame_id: Optional[int] = None
+    stamp: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    def load(self) -> Optional[np.ndarray]:
+        """Copy the frame out of its slot (``None`` once the slot was reused).
+
+        Frames without a ``stamp`` are not backed by a ring and are returned
+        as they are.
+        """
+        if self.stamp is None:
+            return self.image
+        if self.stamp[0] != self.ts:
+            return None
+        image = self.image.copy()
+        # a reused slot gets its new timestamp before its pixels, so an
+        # unchanged stamp after the copy means the copy is this frame
+        return image if self.stamp[0] == self.ts else None
+
+
+BufferedFrame = Union[FrameRef, EncodedFrame, RawFrame]
+
+# receives the frames of a completed window, oldest first
+WindowCallback = Callable[[List[BufferedFrame]], None]
+
+
+@dataclass(order=True)
+class _Pending:
+    """Window waiting for its post-event frames (ordered by ``deadline``)."""
+
+    deadline: float
+    seq: int
+    start: float = field(compare=False)
+    callback: WindowCallback = field(compare=False)
+
+
+class FrameRing(ABC):
+    """Fixed-capacity ring of frames indexed by capture time.
+
+    Timestamps and frame ids are kept in numpy arrays beside the payload
+    each subclass stores per slot. Frames arrive in capture order, so both
+    arrays are sorted along the ring and lookups are ``searchsorted`` calls
+    over its (at most two) contiguous segments; ``window`` materializes
+    only the requested range. ``defer`` registers a callback that fires
+    from the appending thread once the window's post-event frames have
+    arrived, so clips can be finalized without polling; callbacks should
+    hand heavy work off. Appends and queries may come from different
+    threads.
+
+    Subclasses implement :meth:`_entry` and an append method:
+    :class:`RollingBuffer` takes paths of written frames, a
+    :class:`PixelRing` takes the grabbed arrays.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self._ts = np.zeros(self.capacity, dtype=np.float64)
+        self._ids = np.full(self.capacity, -1, dtype=np.int64)
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._pending: List[_Pending] = []
+        self._seq = itertools.count()
+
+    @abstractmethod
+    def _entry(self, slot: int) -> BufferedFrame:
+        """Materialize the frame held in physical ``slot``."""
+
+    def _frame_id(self, slot: int) -> Optional[int]:
+        frame_id = int(self._ids[slot])
+        return None if frame_id < 0 else frame_id
+
+    # callers of the helpers below hold ``_lock``
+
+    def _drop_oldest(self) -> None:
+        self._start = (self._start + 1) % self.capacity
+        self._count -= 1
+
+    def _push(self, ts: float, frame_id: Optional[int]) -> int:
+        """Index a new newest frame and return its physical slot."""
+        if self._count == self.capacity:
+            self._drop_oldest()
+        slot = (self._start + self._count) % self.capacity
+        self._ts[slot] = ts
+        self._ids[slot] = -1 if frame_id is None else frame_id
+        self._count += 1
+        return slot
+
+    def _bisect(
+        self, keys: np.ndarray, value: float, side: Literal["left", "right"]
+    ) -> int:
+        """Logical insertion index of ``value`` in the sorted ring ``keys``."""
+        head = keys[self._start : self._start + self._count]
+        i = int(np.searchsorted(head, value, side))
+        if i < len(head):
+            return i
+        tail = keys[: self._count - len(head)]
+        return i + int(np.searchsorted(tail, value, side))
+
+    def _slice(self, lo: int, hi: int) -> List[BufferedFrame]:
+        return [self._entry((self._start + i) % self.capacity) for i in range(lo, hi)]
+
+    def _between(self, start: float, end: float) -> List[BufferedFrame]:
+        lo = self._bisect(self._ts, start, "left")
+        return self._slice(lo, self._bisect(self._ts, end, "right"))
+
+    def _pop_due(self, now: float) -> List[Tuple[_Pending, List[BufferedFrame]]]:
+        due = []
+        while self._pending and self._pending[0].deadline < now:
+            pending = heapq.heappop(self._pending)
+            due.append((pending, self._between(pending.start, pending.deadline)))
+        return due
+
+    def _appended(self, ts: float) -> None:
+        """Run the deferred windows a frame at ``ts`` completed (lock released)."""
+        with self._lock:
+            due = self._pop_due(ts)
+        for pending, frames in due:
+            pending.callback(frames)
+
+    def at(self, ts: float) -> Optional[BufferedFrame]:
+        """Latest frame captured at or before ``ts`` (``None`` if older)."""
+        with self._lock:
+            i = self._bisect(self._ts, ts, "right")
+            return self._slice(i - 1, i)[0] if i else None
+
+    def find(self, frame_id: int) -> Optional[BufferedFrame]:
+        """Frame with id ``frame_id`` if it is still buffered."""
+        with self._lock:
+            i = self._bisect(self._ids, frame_id, "left")
+            if i < self._count:
+                slot = (self._start + i) % self.capacity
+                if self._ids[slot] == frame_id:
+                    return self._entry(slot)
+            return None
+
+    def between(self, start: float, end: float) -> List[BufferedFrame]:
+        """Frames with ``start <= ts <= end``, oldest first."""
+        with self._lock:
+            return self._between(start, end)
+
+    def window(self, ts: float, pre_s: float, post_s: float) -> List[BufferedFrame]:
+        """Frames from ``pre_s`` seconds before ``ts`` to ``post_s`` after."""
+        return self.between(ts - pre_s, ts + post_s)
+
+    def defer(
+        self, ts: float, pre_s: float, post_s: float, callback: WindowCallback
+    ) -> None:
+        """Call ``callback(window(ts, pre_s, post_s))`` once it is complete.
 
+        The window is complete when a frame newer than ``ts + post_s`` has
+        been appended; if one already has, ``callback`` runs immediately.
+        """
+        pending = _Pending(ts + post_s, next(self._seq), ts - pre_s, callback)
+        with self._lock:
+            last = (self._start + self._count - 1) % self.capacity
+            if not self._count or self._ts[last] <= pending.deadline:
+                heapq.heappush(self._pending, pending)
+                return
+            frames = self._between(pending.start, pending.deadline)
+        callback(frames)
+
+    def flush(self) -> None:
+        """Finalize every deferred window with the frames available now."""
+        with self._lock:
+            due = self._pop_due(float("inf"))
+        for pending, frames in due:
+            pending.callback(frames)
+
+    @property
+    def pending(self) -> int:
+        """Number of deferred windows still waiting for frames."""
+        return len(self._pending)
 
-class RollingBuffer:
+    def to_list(self) -> List[BufferedFrame]:
+        """Return a snapshot list of the buffer contents."""
+        with self._lock:
+            return self._slice(0, self._count)
+
+    def __len__(self) -> int:  # pragma: no cover - trivial
+        return self._count
+
+
+class RollingBuffer(FrameRing):
     """Ring buffer keeping roughly N seconds of frame references.
 
     The buffer stores ``FrameRef`` objects and keeps at most ``fps * seconds``
@@ -25,25 +249,268 @@ class RollingBuffer:
     """
 
     def __init__(self, fps: int, seconds: int) -> None:
+        super().__init__(fps * seconds)
         self.fps = fps
         self.seconds = seconds
-        self.capacity = fps * seconds
-        # ``deque`` drops items automatically when ``maxlen`` is exceeded.
-        self._buffer: Deque[FrameRef] = deque(maxlen=self.capacity)
+        self._paths: List[Optional[Path]] = [None] * self.capacity
 
-    def append(self, path: Path, ts: float) -> None:
+    def append(self, path: Path, ts: float, frame_id: Optional[int] = None) -> None:
         """Add a new frame reference to the buffer.
 
         Args:
             path: Path to the stored frame on disk.
             ts: Timestamp when the frame was captured (seconds).
+            frame_id: Id of the captured frame, for :meth:`find`.
         """
 
-        self._buffer.append(FrameRef(path, ts))
+        with self._lock:
+            self._paths[self._push(ts, frame_id)] = path
+        self._appended(ts)
 
-    def to_list(self) -> List[FrameRef]:
-        """Return a snapshot list of the buffer contents."""
-        return list(self._buffer)
+    def _entry(self, slot: int) -> FrameRef:
+        path = self._paths[slot]
+        assert path is not None
+        return FrameRef(path, float(self._ts[slot]), self._frame_id(slot))
 
-    def __len__(self) -> int:  # pragma: no cover - trivial
-        return len(self._buffer)
+
+class PixelRing(FrameRing):
+    """Ring storing the frames themselves rather than paths to them."""
+
+    @abstractmethod
+    def append_frame(
+        self, frame: np.ndarray, ts: float, frame_id: Optional[int] = None
+    ) -> None:
+        """Store a copy of the BGR ``frame`` as the newest entry."""
+
+
+# what a capture loop can append to: written paths or grabbed arrays
+CaptureBuffer = Union[RollingBuffer, PixelRing]
+
+
+class EncodedRingBuffer(PixelRing):
+    """Rolling buffer of JPEG frames packed into one preallocated byte ring.
+
+    Frames are encoded in memory and copied back to back into a single
+    ``uint8`` array of ``fps * seconds * frame_bytes`` bytes, addressed by
+    per-slot offset and size arrays: memory is fixed up front, nothing
+    touches the filesystem and no object is kept per buffered frame. A
+    frame that does not fit before the end of the array wraps to its start,
+    evicting the oldest frames it overlaps, so ``frame_bytes`` should cover
+    the average encoded frame or the ring holds less than ``seconds``.
+    Queries return :class:`EncodedFrame` copies that later appends cannot
+    overwrite.
+    """
+
+    def __init__(
+        self,
+        fps: int,
+        seconds: int,
+        frame_bytes: int = 256 * 1024,
+        jpeg_quality: int = 90,
+    ) -> None:
+        super().__init__(fps * seconds)
+        self.fps = fps
+        self.seconds = seconds
+        self.jpeg_quality = jpeg_quality
+        self.data = np.empty(self.capacity * max(1, frame_bytes), dtype=np.uint8)
+        self._offsets = np.zeros(self.capacity, dtype=np.int64)
+        self._sizes = np.zeros(self.capacity, dtype=np.int64)
+        self._head = 0  # byte offset of the next write
+
+    def append(self, data: bytes, ts: float, frame_id: Optional[int] = None) -> None:
+        """Copy one encoded frame into the ring."""
+        payload = np.frombuffer(data, dtype=np.uint8)
+        size = len(payload)
+        if size > len(self.data):
+            raise ValueError(
+                f"Encoded frame of {size} bytes exceeds the {len(self.data)}-byte ring"
+            )
+        with self._lock:
+            wrap = self._head + size > len(self.data)
+            start = 0 if wrap else self._head
+            # evict the oldest frames in the bytes this write consumes: its
+            # own range plus, on wrap, the unused tail after ``_head``
+            while self._count:
+                old_start = int(self._offsets[self._start])
+                old_end = old_start + int(self._sizes[self._start])
+                tail = wrap and old_start >= self._head
+                if not tail and (start + size <= old_start or old_end <= start):
+                    break
+                self._drop_oldest()
+            slot = self._push(ts, frame_id)
+            self.data[start : start + size] = payload
+            self._offsets[slot] = start
+            self._sizes[slot] = size
+            self._head = start + size
+        self._appended(ts)
+
+    def append_frame(
+        self, frame: np.ndarray, ts: float, frame_id: Optional[int] = None
+    ) -> None:
+        """JPEG-encode a BGR ``frame`` and append it."""
+        if cv2 is None:  # pragma: no cover - executed if OpenCV missing
+            raise RuntimeError("OpenCV is required to encode frames")
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+        ok, buf = cv2.imencode(".jpg", frame, params)
+        if not ok:
+            raise OSError("Failed to encode frame")
+        self.append(buf.tobytes(), ts, frame_id)
+
+    def _entry(self, slot: int) -> EncodedFrame:
+        start = int(self._offsets[slot])
+        data = self.data[start : start + int(self._sizes[slot])].tobytes()
+        return EncodedFrame(data, float(self._ts[slot]), self._frame_id(slot))
+
+
+# ring file layout: magic, int64 [capacity, height, width, channels, start,
+# count], float64 timestamps and int64 frame ids per slot, then the frames
+# from the first page boundary on
+_MAGIC = b"FCRING01"
+_META = 6
+_PAGE = 4096
+
+
+class MmapRingBuffer(PixelRing):
+    """Rolling buffer of raw frames in a memory-mapped ring file.
+
+    Each of the ``fps * seconds`` slots holds one uncompressed frame of a
+    fixed ``(height, width, channels)`` shape, so minutes of full-resolution
+    history cost disk and page cache rather than process memory. The ring
+    start, count, timestamps and frame ids live in a small header that the
+    index arrays map directly, and queries return :class:`RawFrame` views of
+    the slots without copying. Reopening the same ``path`` with the same
+    capacity and shape resumes the ring after a restart; frame ids of the
+    previous run are cleared (they restart with the new process) so those
+    frames are found by time only. The header is updated after each frame is
+    fully written, so a crash never exposes a half-written slot.
+
+    Without ``shape`` the ring adopts an existing file's shape, or creates
+    the file on the first appended frame. A frame of another shape starts a
+    new ring file; views of the old one stay valid.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fps: int,
+        seconds: int,
+        shape: Optional[Tuple[int, int, int]] = None,
+    ) -> None:
+        super().__init__(fps * seconds)
+        self.path = Path(path)
+        self.fps = fps
+        self.seconds = seconds
+        self.shape: Optional[Tuple[int, int, int]] = None
+        self._mm: Optional[np.memmap] = None
+        self._meta: Optional[np.ndarray] = None
+        self._frames: Optional[np.ndarray] = None
+        if shape is not None or self.path.exists():
+            self._open(shape)
+
+    def _header_size(self) -> int:
+        size = len(_MAGIC) + 8 * _META + 16 * self.capacity
+        return -(-size // _PAGE) * _PAGE
+
+    def _stored_meta(self) -> Optional[Tuple[int, ...]]:
+        """Header fields of an existing ring file with our capacity."""
+        try:
+            with open(self.path, "rb") as fh:
+                head = fh.read(len(_MAGIC) + 8 * _META)
+        except OSError:
+            return None
+        if len(head) < len(_MAGIC) + 8 * _META or not head.startswith(_MAGIC):
+            return None
+        meta = tuple(int(v) for v in np.frombuffer(head[len(_MAGIC) :], np.int64))
+        return meta if meta[0] == self.capacity else None
+
+    def _open(self, dims: Optional[Tuple[int, ...]]) -> None:
+        stored = self._stored_meta()
+        if dims is None:
+            if stored is None:
+                return
+            dims = stored[1:4]
+        if len(dims) != 3:
+            raise ValueError(f"Frames must be (height, width, channels), got {dims}")
+        height, width, channels = (int(v) for v in dims)
+        shape: Tuple[int, int, int] = (height, width, channels)
+        header = self._header_size()
+        size = header + self.capacity * int(np.prod(shape))
+        resume = (
+            stored is not None
+            and stored[1:4] == shape
+            and self.path.stat().st_size == size
+            and 0 <= stored[4] < self.capacity
+            and 0 <= stored[5] <= self.capacity
+        )
+        if not resume:
+            # unlink rather than truncate: views of the old file stay mapped
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.unlink(missing_ok=True)
+        mm = np.memmap(self.path, np.uint8, "r+" if resume else "w+", shape=(size,))
+        meta_at = len(_MAGIC)
+        ts_at = meta_at + 8 * _META
+        ids_at = ts_at + 8 * self.capacity
+        meta = mm[meta_at:ts_at].view(np.int64)
+        self._ts = mm[ts_at:ids_at].view(np.float64)
+        self._ids = mm[ids_at : ids_at + 8 * self.capacity].view(np.int64)
+        if resume:
+            self._ids[:] = -1
+            self._start, self._count = int(meta[4]), int(meta[5])
+        else:
+            mm[:meta_at] = np.frombuffer(_MAGIC, np.uint8)
+            meta[:] = (self.capacity, height, width, channels, 0, 0)
+            self._start = self._count = 0
+        self._mm = mm
+        self._meta = meta
+        self._frames = mm[header:].reshape((self.capacity, height, width, channels))
+        self.shape = shape
+
+    def _sync(self) -> None:
+        assert self._meta is not None
+        self._meta[4] = self._start
+        self._meta[5] = self._count
+
+    def _drop_oldest(self) -> None:
+        super()._drop_oldest()
+        # persist the eviction before the slot is overwritten
+        self._sync()
+
+    def append_frame(
+        self, frame: np.ndarray, ts: float, frame_id: Optional[int] = None
+    ) -> None:
+        """Copy ``frame`` into the next slot."""
+        with self._lock:
+            if frame.shape != self.shape:
+                self._open(frame.shape)
+            assert self._frames is not None
+            slot = self._push(ts, frame_id)
+            self._frames[slot] = frame
+            self._sync()
+        self._appended(ts)
+
+    def sync(self) -> None:
+        """Flush the ring file to disk."""
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+
+    def _entry(self, slot: int) -> RawFrame:
+        assert self._frames is not None
+        image = self._frames[slot]
+        image.flags.writeable = False
+        stamp = self._ts[slot : slot + 1]
+        return RawFrame(image, float(stamp[0]), self._frame_id(slot), stamp)
+
+
+__all__ = [
+    "BufferedFrame",
+    "CaptureBuffer",
+    "EncodedFrame",
+    "EncodedRingBuffer",
+    "FrameRef",
+    "FrameRing",
+    "MmapRingBuffer",
+    "PixelRing",
+    "RawFrame",
+    "RollingBuffer",
+]
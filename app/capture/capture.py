@@ -2,15 +2,27 @@
 
 from __future__ import annotations
 
+import itertools
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 
-from app.config.load import load_settings
-from .buffer import RollingBuffer
+from app.config.load import Settings, load_settings
+from app.schemas.models import FramePacket
+from .buffer import (
+    CaptureBuffer,
+    EncodedRingBuffer,
+    MmapRingBuffer,
+    PixelRing,
+    RollingBuffer,
+)
+from .scheduler import FrameScheduler
+from .writer import FrameWriter
 
 try:  # pragma: no cover - optional dependency
     import cv2  # type: ignore
@@ -48,6 +60,97 @@ def grab(region: Optional[Dict[str, int]] = None) -> np.ndarray:
         return frame
 
 
+class Grabber:
+    """Long-lived screen grabber reusing one ``mss`` session and frame buffer.
+
+    Unlike :func:`grab`, which opens a capture session and allocates several
+    arrays per call, a ``Grabber`` keeps the ``mss`` handle open and converts
+    BGRA to BGR straight into a pre-allocated destination.
+    """
+
+    def __init__(self, region: Optional[Dict[str, int]] = None) -> None:
+        if mss is None:
+            raise RuntimeError("No screen capture backend available")
+        self._sct = mss.mss()
+        self.monitor = dict(region or self._sct.monitors[1])
+        self.shape = (int(self.monitor["height"]), int(self.monitor["width"]), 3)
+        self._buf = np.empty(self.shape, dtype=np.uint8)
+
+    def grab_into(self, dst: Optional[np.ndarray] = None) -> np.ndarray:
+        """Capture a frame into ``dst`` (or the internal buffer) and return it.
+
+        The internal buffer is overwritten by the next call; pass your own
+        ``dst`` when the frame must outlive it.
+        """
+        out = self._buf if dst is None else dst
+        img = self._sct.grab(self.monitor)
+        # zero-copy view over the BGRA bytes returned by mss
+        src = np.frombuffer(img.raw, dtype=np.uint8).reshape(img.height, img.width, 4)
+        if cv2 is not None:
+            cv2.cvtColor(src, cv2.COLOR_BGRA2BGR, dst=out)
+        else:  # drop alpha channel if OpenCV not present
+            np.copyto(out, src[:, :, :3])
+        return out
+
+    def close(self) -> None:
+        self._sct.close()
+
+    def __enter__(self) -> "Grabber":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class FrameLease:
+    """A pooled frame plus the number of holders still using it."""
+
+    __slots__ = ("frame", "_pool", "_refs")
+
+    def __init__(self, frame: np.ndarray, pool: "FramePool") -> None:
+        self.frame = frame
+        self._pool = pool
+        self._refs = 1
+
+    def retain(self) -> None:
+        """Register another holder; each holder calls :meth:`release` once."""
+        with self._pool._lock:
+            self._refs += 1
+
+    def release(self) -> None:
+        """Drop one holder; the last one returns the frame to its pool."""
+        with self._pool._lock:
+            self._refs -= 1
+            if self._refs == 0 and len(self._pool._free) < self._pool.size:
+                self._pool._free.append(self.frame)
+
+
+class FramePool:
+    """Recycle frame arrays of one shape between grabs.
+
+    Frames outlive the next grab while they are queued for writing or
+    buffering, so the grabber's own buffer cannot be reused for them; the
+    pool hands out a free array instead, allocating only when all are in
+    use. A lease never released (a frame dropped by the writer, or handed
+    to detection for good) is simply garbage-collected with its frame. At
+    most ``size`` idle arrays are kept.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], size: int = 8) -> None:
+        self.shape = shape
+        self.size = size
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> FrameLease:
+        """Lease a frame array (contents undefined) with one holder."""
+        with self._lock:
+            frame = self._free.pop() if self._free else None
+        if frame is None:
+            frame = np.empty(self.shape, dtype=np.uint8)
+        return FrameLease(frame, self)
+
+
 def save_frame(frame: np.ndarray, path: Path) -> None:
     """Write a frame to disk as JPEG."""
     if cv2 is not None:
@@ -58,34 +161,170 @@ def save_frame(frame: np.ndarray, path: Path) -> None:
         raise RuntimeError("No image writer available")
 
 
-def capture_loop() -> None:
-    """Run the capture loop using configured settings."""
-    settings = load_settings()
+def make_writer(settings: Settings) -> FrameWriter:
+    """Build the frame writer pool described by ``settings.capture``."""
+    cap = settings.capture
+    return FrameWriter(
+        workers=cap.writer_workers,
+        maxsize=cap.writer_queue,
+        encoder=cap.encoder,
+        jpeg_quality=cap.jpeg_quality,
+        png_level=cap.png_level,
+        policy=cap.writer_policy,
+    )
+
+
+BUFFERS = ("files", "encoded", "mmap")
+
+
+def make_buffer(settings: Settings, stream: str = "full") -> CaptureBuffer:
+    """Build ``stream``'s rolling buffer as set by ``settings.capture.buffer``."""
+    cap = settings.capture
+    fps, seconds = int(settings.fps), int(settings.buffer_seconds)
+    if cap.buffer == "files":
+        return RollingBuffer(fps=fps, seconds=seconds)
+    if cap.buffer == "encoded":
+        return EncodedRingBuffer(
+            fps,
+            seconds,
+            frame_bytes=cap.buffer_frame_kb * 1024,
+            jpeg_quality=cap.jpeg_quality,
+        )
+    if cap.buffer == "mmap":
+        return MmapRingBuffer(Path(cap.buffer_dir) / f"{stream}.ring", fps, seconds)
+    raise ValueError(
+        f"Unknown capture buffer {cap.buffer!r}; expected one of {BUFFERS}"
+    )
+
+
+def capture_loop(
+    sink: Optional[Callable[[FramePacket], None]] = None,
+    *,
+    settings: Optional[Settings] = None,
+    scheduler: Optional[FrameScheduler] = None,
+    stop: Optional[threading.Event] = None,
+    stream: str = "full",
+    frame_ids: Optional[Iterator[int]] = None,
+    buffer: Optional[CaptureBuffer] = None,
+) -> None:
+    """Run the capture loop using configured settings.
+
+    Args:
+        sink: Optional callback receiving a :class:`FramePacket` per frame.
+        settings: Settings to use instead of loading them from disk.
+        scheduler: Frame pacing; defaults to a :class:`FrameScheduler` at
+            ``settings.fps``. Pass one in to read its ``stats`` while the
+            loop runs.
+        stop: Event ending the loop when set; otherwise it runs until
+            interrupted.
+        stream: Name of the ``settings.regions`` entry to capture; also
+            used as the packets' ``stream_id``.
+        frame_ids: Source of frame ids. Share one iterator (for example
+            ``itertools.count(1)``) between several capture loops so ids
+            stay unique across streams.
+        buffer: Rolling buffer receiving every frame; pass one in to cut
+            event clips from it. Defaults to :func:`make_buffer`. Its
+            timestamps are the packets' ``timestamp`` as UTC epoch seconds.
+
+    Frames are written by a :class:`FrameWriter` pool so disk I/O stays out
+    of the capture cadence. With ``capture.in_memory`` enabled, packets carry
+    the grabbed array and reach ``sink`` immediately while only every
+    ``capture.persist_every``-th frame is written. Otherwise every frame is
+    written and its packet is delivered, in order, once the file exists.
+    A :class:`RollingBuffer` indexes the written files; a
+    :class:`PixelRing` (such as :class:`EncodedRingBuffer`) takes every
+    grabbed frame on its own thread, skipping frames while more than a
+    second of them is waiting. Frame arrays come from a :class:`FramePool`
+    and are recycled once written and buffered.
+    """
+    settings = settings or load_settings()
     fps: int = int(settings.fps)
-    buffer_seconds: int = int(settings.buffer_seconds)
+    in_memory = bool(settings.capture.in_memory)
+    persist_every = int(settings.capture.persist_every)
     regions = settings.regions
-    region = regions.get("full") if isinstance(regions, dict) else None
+    region = regions.get(stream) if isinstance(regions, dict) else None
 
     session = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     out_dir = Path("data") / "media" / session
+    if stream != "full":
+        out_dir = out_dir / stream
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    buffer = RollingBuffer(fps=fps, seconds=buffer_seconds)
-    delay = 1.0 / fps
+    if buffer is None:
+        buffer = make_buffer(settings, stream)
+    paths = buffer if isinstance(buffer, RollingBuffer) else None
+    buffer_pool: Optional[ThreadPoolExecutor] = None
+    if isinstance(buffer, PixelRing):
+        pixels = buffer
+        buffer_pool = ThreadPoolExecutor(1, thread_name_prefix=f"buffer-{stream}")
+        backlog = threading.Semaphore(max(1, fps))
+
+        def _buffer_frame(lease: FrameLease, ts: float, frame_id: int) -> None:
+            try:
+                pixels.append_frame(lease.frame, ts, frame_id)
+            finally:
+                lease.release()
+                backlog.release()
+
+    writer = make_writer(settings)
+    grabber = Grabber(region)
+    cap = settings.capture
+    frames = FramePool(grabber.shape, cap.writer_queue + cap.writer_workers + 2)
+    scheduler = scheduler or FrameScheduler(fps)
+    frame_ids = frame_ids or itertools.count(1)
+    seq = 0
 
     try:
-        while True:
-            start = time.time()
-            frame = grab(region)
+        while stop is None or not stop.is_set():
+            scheduler.wait()
+            # frames outlive the next grab (queued for writing or detection),
+            # so each one gets a pooled array instead of the grabber's buffer
+            lease = frames.acquire()
+            frame = grabber.grab_into(lease.frame)
             ts = time.time()
-            frame_path = out_dir / f"{ts:.6f}.jpg"
-            save_frame(frame, frame_path)
-            buffer.append(frame_path, ts)
-            sleep_for = delay - (time.time() - start)
-            if sleep_for > 0:
-                time.sleep(sleep_for)
+            seq += 1
+            frame_path = out_dir / f"{ts:.6f}{writer.suffix}"
+            pkt = FramePacket(
+                frame_id=next(frame_ids),
+                timestamp=datetime.utcfromtimestamp(ts),
+                path=frame_path,
+                image=frame if in_memory else None,
+                stream_id=stream,
+            )
+
+            if buffer_pool is not None and backlog.acquire(blocking=False):
+                lease.retain()
+                buffer_pool.submit(_buffer_frame, lease, ts, pkt.frame_id)
+
+            def _written(
+                path: Path,
+                pkt: FramePacket = pkt,
+                ts: float = ts,
+                lease: FrameLease = lease,
+            ) -> None:
+                lease.release()
+                if paths is not None:
+                    paths.append(path, ts, pkt.frame_id)
+                if sink is not None and not in_memory:
+                    sink(pkt)
+
+            if not in_memory or (persist_every > 0 and seq % persist_every == 0):
+                lease.retain()
+                if not writer.submit(frame, frame_path, _written):
+                    lease.release()
+            if sink is not None and in_memory:
+                # detectors and the events they raise keep the array, so a
+                # frame handed over in memory is never recycled
+                lease.retain()
+                sink(pkt)
+            lease.release()
     except KeyboardInterrupt:  # pragma: no cover - CLI interruption
         pass
+    finally:
+        grabber.close()
+        writer.close()
+        if buffer_pool is not None:
+            buffer_pool.shutdown(wait=True)
 
 
 def main() -> None:  # pragma: no cover - thin wrapper
@@ -0,0 +1,137 @@
+"""Drift-free frame scheduler with capture timing telemetry."""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+# upper edges (milliseconds) of the jitter histogram buckets; the last bucket
+# collects everything above the final edge
+DEFAULT_JITTER_EDGES_MS: Sequence[float] = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0)
+
+
+class TimingStats:
+    """Thread-safe counters describing how well the capture cadence is held.
+
+    ``jitter`` is how late a frame started relative to its absolute deadline.
+    ``late_frames`` counts frames that missed their deadline by at least one
+    full period and ``skipped_frames`` the deadlines dropped to catch up.
+    """
+
+    def __init__(
+        self,
+        target_fps: float,
+        jitter_edges_ms: Sequence[float] = DEFAULT_JITTER_EDGES_MS,
+        window: int = 120,
+    ) -> None:
+        self.target_fps = target_fps
+        self.jitter_edges_ms = list(jitter_edges_ms)
+        self.jitter_hist: List[int] = [0] * (len(self.jitter_edges_ms) + 1)
+        self.frames = 0
+        self.late_frames = 0
+        self.skipped_frames = 0
+        self.max_jitter_ms = 0.0
+        self._jitter_sum_ms = 0.0
+        self._started: Optional[float] = None
+        self._last: Optional[float] = None
+        self._recent: Deque[float] = deque(maxlen=max(2, window))
+        self._lock = threading.Lock()
+
+    def record(self, now: float, jitter_s: float, skipped: int) -> None:
+        jitter_ms = max(0.0, jitter_s * 1000.0)
+        with self._lock:
+            if self._started is None:
+                self._started = now
+            self._last = now
+            self._recent.append(now)
+            self.frames += 1
+            self.skipped_frames += skipped
+            if skipped:
+                self.late_frames += 1
+            self._jitter_sum_ms += jitter_ms
+            self.max_jitter_ms = max(self.max_jitter_ms, jitter_ms)
+            self.jitter_hist[bisect_right(self.jitter_edges_ms, jitter_ms)] += 1
+
+    def achieved_fps(self) -> float:
+        """Frame rate over the most recent ticks (0 until two ticks exist)."""
+        with self._lock:
+            if len(self._recent) < 2:
+                return 0.0
+            span = self._recent[-1] - self._recent[0]
+            return (len(self._recent) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return a JSON-serialisable view of the counters."""
+        recent_fps = self.achieved_fps()
+        with self._lock:
+            elapsed = (
+                self._last - self._started
+                if self._started is not None and self._last is not None
+                else 0.0
+            )
+            return {
+                "target_fps": self.target_fps,
+                "achieved_fps": recent_fps,
+                "mean_fps": (self.frames - 1) / elapsed if elapsed > 0 else 0.0,
+                "frames": self.frames,
+                "late_frames": self.late_frames,
+                "skipped_frames": self.skipped_frames,
+                "mean_jitter_ms": (
+                    self._jitter_sum_ms / self.frames if self.frames else 0.0
+                ),
+                "max_jitter_ms": self.max_jitter_ms,
+                "jitter_edges_ms": list(self.jitter_edges_ms),
+                "jitter_hist": list(self.jitter_hist),
+            }
+
+
+class FrameScheduler:
+    """Pace a loop at ``fps`` against absolute deadlines on a monotonic clock.
+
+    Each frame has the deadline ``start + n * period``. Sleeping to the
+    deadline rather than for ``period - elapsed`` keeps rounding error from
+    accumulating. When a frame overruns by one or more periods the missed
+    deadlines are skipped so the schedule does not shift.
+    """
+
+    def __init__(
+        self,
+        fps: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        stats: Optional[TimingStats] = None,
+    ) -> None:
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.period = 1.0 / fps
+        self._clock = clock
+        self._sleep = sleep
+        self._deadline: Optional[float] = None
+        self.stats = stats or TimingStats(fps)
+
+    def wait(self) -> int:
+        """Block until the next frame is due; return the deadlines skipped."""
+        now = self._clock()
+        if self._deadline is None:
+            self._deadline = now
+            self.stats.record(now, 0.0, 0)
+            return 0
+
+        self._deadline += self.period
+        skipped = 0
+        late = now - self._deadline
+        if late >= self.period:
+            skipped = int(late // self.period)
+            self._deadline += skipped * self.period
+        elif late < 0:
+            self._sleep(-late)
+            now = self._clock()
+        self.stats.record(now, now - self._deadline, skipped)
+        return skipped
+
+
+__all__ = ["DEFAULT_JITTER_EDGES_MS", "FrameScheduler", "TimingStats"]
@@ -0,0 +1,241 @@
+"""Bounded multi-threaded frame writer used by the capture loop."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:  # pragma: no cover - optional dependency
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - executed when OpenCV unavailable
+    cv2 = None
+
+try:  # pragma: no cover - optional dependency
+    from PIL import Image
+except Exception:  # pragma: no cover - executed when Pillow unavailable
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ENCODERS: Dict[str, str] = {"jpeg": ".jpg", "png": ".png", "npy": ".npy"}
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+WriteCallback = Callable[[Path], None]
+
+
+def encode_frame(
+    frame: np.ndarray,
+    path: Path,
+    encoder: str = "jpeg",
+    *,
+    jpeg_quality: int = 90,
+    png_level: int = 3,
+) -> None:
+    """Write ``frame`` to ``path`` with the given encoder."""
+    if encoder == "npy":
+        with open(path, "wb") as fh:
+            np.save(fh, frame)
+    elif cv2 is not None:
+        if encoder == "png":
+            params = [cv2.IMWRITE_PNG_COMPRESSION, int(png_level)]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        # imwrite reports failure (missing dir, full disk) by returning False
+        if not cv2.imwrite(str(path), frame, params):
+            raise OSError(f"Failed to write frame to {path}")
+    elif Image is not None:
+        fmt = "PNG" if encoder == "png" else "JPEG"
+        Image.fromarray(frame[:, :, ::-1]).save(path, format=fmt)
+    else:  # pragma: no cover - executed only if no writer available
+        raise RuntimeError("No image writer available")
+
+
+@dataclass
+class WriterStats:
+    """Counters exposed by :class:`FrameWriter`."""
+
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    submitted: int = 0
+    written: int = 0
+    dropped: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+# (sequence number, frame, path, callback)
+_Item = Tuple[int, np.ndarray, Path, Optional[WriteCallback]]
+
+
+class FrameWriter:
+    """Encode and write frames on a pool of worker threads.
+
+    Frames are queued by the capture thread and written by ``workers``
+    threads, so disk latency never lands in the capture cadence. When the
+    queue is full the ``policy`` decides what happens:
+
+    * ``block`` – wait for space (no frame is lost),
+    * ``drop_oldest`` – discard the oldest queued frame,
+    * ``drop_newest`` – discard the frame being submitted.
+
+    Completion callbacks run in submission order even though workers finish
+    out of order; callbacks of dropped or failed frames are skipped. They run
+    outside the writer's lock, and one that raises is logged without taking
+    its worker down.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        maxsize: int = 64,
+        encoder: str = "jpeg",
+        jpeg_quality: int = 90,
+        png_level: int = 3,
+        policy: str = "drop_oldest",
+    ) -> None:
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder: {encoder}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.encoder = encoder
+        self.jpeg_quality = jpeg_quality
+        self.png_level = png_level
+        self.policy = policy
+        self._q: "queue.Queue[Optional[_Item]]" = queue.Queue(maxsize=max(1, maxsize))
+        self._stats = WriterStats()
+        self._lock = threading.Lock()
+        # serializes callback delivery so it stays in submission order
+        self._release_lock = threading.Lock()
+        self._next_seq = 0
+        self._release_seq = 0
+        self._done: Dict[int, Tuple[Path, Optional[WriteCallback], bool]] = {}
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._run, daemon=True)
+            for _ in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def suffix(self) -> str:
+        """File extension produced by the configured encoder."""
+        return ENCODERS[self.encoder]
+
+    def submit(
+        self,
+        frame: np.ndarray,
+        path: Path,
+        on_done: Optional[WriteCallback] = None,
+    ) -> bool:
+        """Queue ``frame`` for writing to ``path``.
+
+        ``frame`` must not be modified by the caller afterwards. Returns
+        ``False`` if the frame was dropped by the backpressure policy.
+        """
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._stats.submitted += 1
+        item: _Item = (seq, frame, path, on_done)
+
+        if self.policy == "block":
+            self._q.put(item)
+        elif self.policy == "drop_newest":
+            try:
+                self._q.put_nowait(item)
+            except queue.Full:
+                self._finish(seq, path, on_done, ok=False, dropped=True)
+                return False
+        else:
+            while True:
+                try:
+                    self._q.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        old = self._q.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if old is not None:
+                        self._finish(old[0], old[2], old[3], ok=False, dropped=True)
+        with self._lock:
+            depth = self._q.qsize()
+            self._stats.max_queue_depth = max(self._stats.max_queue_depth, depth)
+        return True
+
+    def stats(self) -> WriterStats:
+        """Return a snapshot of the writer counters."""
+        with self._lock:
+            snap = WriterStats(**self._stats.to_dict())
+        snap.queue_depth = self._q.qsize()
+        return snap
+
+    def close(self) -> None:
+        """Write all queued frames and stop the workers."""
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is None:
+                break
+            seq, frame, path, on_done = item
+            try:
+                encode_frame(
+                    frame,
+                    path,
+                    self.encoder,
+                    jpeg_quality=self.jpeg_quality,
+                    png_level=self.png_level,
+                )
+            except Exception:
+                self._finish(seq, path, on_done, ok=False)
+            else:
+                self._finish(seq, path, on_done, ok=True)
+
+    def _finish(
+        self,
+        seq: int,
+        path: Path,
+        on_done: Optional[WriteCallback],
+        *,
+        ok: bool,
+        dropped: bool = False,
+    ) -> None:
+        with self._lock:
+            if ok:
+                self._stats.written += 1
+            elif dropped:
+                self._stats.dropped += 1
+            else:
+                self._stats.errors += 1
+            self._done[seq] = (path, on_done, ok)
+        # release callbacks strictly in submission order
+        with self._release_lock:
+            ready: List[Tuple[Path, WriteCallback]] = []
+            with self._lock:
+                while self._release_seq in self._done:
+                    p, cb, success = self._done.pop(self._release_seq)
+                    self._release_seq += 1
+                    if success and cb is not None:
+                        ready.append((p, cb))
+            for p, cb in ready:
+                try:
+                    cb(p)
+                except Exception:
+                    logger.exception("Write callback for %s failed", p)
+
+
+__all__ = ["ENCODERS", "POLICIES", "FrameWriter", "WriterStats", "encode_frame"]
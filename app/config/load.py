@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import yaml
 
@@ -14,6 +14,55 @@ class ClipSettings:
 
     pre: int = 2
     post: int = 2
+    # clips waiting for the background encoder (more are dropped) and
+    # decoded frames it keeps for overlapping clips
+    queue: int = 32
+    cache_frames: int = 16
+
+
+@dataclass
+class CaptureSettings:
+    """Control how captured frames reach the detectors and the disk."""
+
+    in_memory: bool = False
+    persist_every: int = 1
+    # names of ``regions`` entries captured as independent streams
+    streams: List[str] = field(default_factory=lambda: ["full"])
+    encoder: str = "jpeg"
+    jpeg_quality: int = 90
+    png_level: int = 3
+    writer_workers: int = 2
+    writer_queue: int = 64
+    writer_policy: str = "drop_oldest"
+    # rolling buffer backing event clips: files (paths of written frames) |
+    # encoded (JPEGs in a fixed in-memory ring of buffer_frame_kb per frame) |
+    # mmap (raw frames in a ring file per stream under buffer_dir)
+    buffer: str = "files"
+    buffer_frame_kb: int = 256
+    buffer_dir: str = "data/ring"
+
+
+@dataclass
+class RuntimeSettings:
+    """Queue sizing and backpressure for the in-process worker (``app.main``)."""
+
+    frame_queue: int = 64
+    event_queue: int = 256
+    queue_policy: str = "drop_oldest"
+    detect_workers: int = 2
+    detect_executor: str = "thread"
+    detect_inflight: int = 8
+    persist_batch: int = 32
+    persist_interval: float = 0.5
+    # a failed commit is retried this many times, waiting persist_backoff
+    # seconds and doubling the wait after each attempt
+    persist_retries: int = 3
+    persist_backoff: float = 0.5
+    artifact_backlog: int = 8
+    # detections of one type merge into an interval while <= gap seconds
+    # apart (0 disables merging); intervals are cut after segment_max seconds
+    segment_gap: float = 2.0
+    segment_max: float = 60.0
 
 
 @dataclass
@@ -22,18 +71,44 @@ class BlankConfig:
     sat_thresh: int = 15
     pct: float = 0.95
     frames: int = 3
+    scale: float = 1.0
+    # analyse only these ``regions`` entries (empty = whole frame)
+    regions: List[str] = field(default_factory=list)
 
 
 @dataclass
 class FreezeConfig:
     mad: float = 1.0
     frames: int = 3
+    scale: float = 1.0
+    mode: str = "bgr"
+    hash_max_dist: int = -1
+    ssim_thresh: float = 0.0
+    regions: List[str] = field(default_factory=list)
 
 
 @dataclass
 class FlickerConfig:
     window: int = 8
     ratio_thresh: float = 0.6
+    tile_rows: int = 0
+    tile_cols: int = 0
+    regions: List[str] = field(default_factory=list)
+
+
+@dataclass
+class HudGlitchConfig:
+    # names of ``regions`` entries holding HUD elements
+    regions: List[str] = field(default_factory=list)
+    # directory of reference images (<region>.png or <region>/*.png);
+    # empty learns references from the first ``warmup`` frames instead
+    template_dir: str = ""
+    template_size: int = 32
+    dist_thresh: float = 0.2
+    frames: int = 3
+    warmup: int = 30
+    max_templates: int = 16
+    magenta_pct: float = 0.2
 
 
 @dataclass
@@ -41,6 +116,9 @@ class DetectorConfigs:
     blank: BlankConfig = field(default_factory=BlankConfig)
     freeze: FreezeConfig = field(default_factory=FreezeConfig)
     flicker: FlickerConfig = field(default_factory=FlickerConfig)
+    hud_glitch: HudGlitchConfig = field(default_factory=HudGlitchConfig)
+    # raw sections of detectors without a config class here (plugins)
+    extra: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
 
 @dataclass
@@ -48,10 +126,14 @@ class Settings:
     fps: int = 5
     buffer_seconds: int = 5
     clip: ClipSettings = field(default_factory=ClipSettings)
+    capture: CaptureSettings = field(default_factory=CaptureSettings)
+    runtime: RuntimeSettings = field(default_factory=RuntimeSettings)
     detectors: DetectorConfigs = field(default_factory=DetectorConfigs)
     regions: Dict[str, Dict[str, int]] = field(default_factory=dict)
 
 
+_DETECTOR_SECTIONS = {"blank", "freeze", "flicker", "hud_glitch"}
+
 _DEFAULT_PATH = Path(__file__).resolve().with_name("settings.yaml")
 
 
@@ -67,9 +149,18 @@ def _parse_env(val: str) -> Any:
         return val
 
 
+def _as_list(val: Any) -> List[str]:
+    """Accept a YAML list or a comma separated string (env overrides)."""
+    if isinstance(val, str):
+        return [v.strip() for v in val.split(",") if v.strip()]
+    return [str(v) for v in val]
+
+
 def _apply_env_overrides(cfg: Dict[str, Any]) -> None:
     detectors = cfg.setdefault("detectors", {})
     clip = cfg.setdefault("clip", {})
+    capture = cfg.setdefault("capture", {})
+    runtime = cfg.setdefault("runtime", {})
     for env_key, env_val in os.environ.items():
         key = env_key.lower()
         parts = key.split("_")
@@ -80,6 +171,15 @@ def _apply_env_overrides(cfg: Dict[str, Any]) -> None:
         elif parts[0] == "clip" and len(parts) > 1:
             subkey = "_".join(parts[1:])
             clip[subkey] = _parse_env(env_val)
+        elif parts[0] == "capture" and len(parts) > 1:
+            subkey = "_".join(parts[1:])
+            capture[subkey] = _parse_env(env_val)
+        elif parts[0] == "runtime" and len(parts) > 1:
+            subkey = "_".join(parts[1:])
+            runtime[subkey] = _parse_env(env_val)
+        elif key.startswith("hud_glitch_"):
+            det = detectors.setdefault("hud_glitch", {})
+            det[key[len("hud_glitch_") :]] = _parse_env(env_val)
         elif parts[0] in {"blank", "freeze", "flicker"} and len(parts) > 1:
             det = detectors.setdefault(parts[0], {})
             subkey = "_".join(parts[1:])
@@ -99,7 +199,10 @@ def load_settings(path: Path | None = None) -> Settings:
     _apply_env_overrides(data)
 
     clip_cfg = data.get("clip", {})
+    cap_cfg = data.get("capture", {})
+    rt_cfg = data.get("runtime", {})
     det_cfg = data.get("detectors", {})
+    hud_cfg = det_cfg.get("hud_glitch", {})
 
     settings = Settings(
         fps=int(data.get("fps", 5)),
@@ -107,6 +210,37 @@ def load_settings(path: Path | None = None) -> Settings:
         clip=ClipSettings(
             pre=int(clip_cfg.get("pre", 2)),
             post=int(clip_cfg.get("post", 2)),
+            queue=int(clip_cfg.get("queue", 32)),
+            cache_frames=int(clip_cfg.get("cache_frames", 16)),
+        ),
+        capture=CaptureSettings(
+            in_memory=bool(cap_cfg.get("in_memory", False)),
+            persist_every=int(cap_cfg.get("persist_every", 1)),
+            streams=_as_list(cap_cfg.get("streams", ["full"])),
+            encoder=str(cap_cfg.get("encoder", "jpeg")),
+            jpeg_quality=int(cap_cfg.get("jpeg_quality", 90)),
+            png_level=int(cap_cfg.get("png_level", 3)),
+            writer_workers=int(cap_cfg.get("writer_workers", 2)),
+            writer_queue=int(cap_cfg.get("writer_queue", 64)),
+            writer_policy=str(cap_cfg.get("writer_policy", "drop_oldest")),
+            buffer=str(cap_cfg.get("buffer", "files")),
+            buffer_frame_kb=int(cap_cfg.get("buffer_frame_kb", 256)),
+            buffer_dir=str(cap_cfg.get("buffer_dir", "data/ring")),
+        ),
+        runtime=RuntimeSettings(
+            frame_queue=int(rt_cfg.get("frame_queue", 64)),
+            event_queue=int(rt_cfg.get("event_queue", 256)),
+            queue_policy=str(rt_cfg.get("queue_policy", "drop_oldest")),
+            detect_workers=int(rt_cfg.get("detect_workers", 2)),
+            detect_executor=str(rt_cfg.get("detect_executor", "thread")),
+            detect_inflight=int(rt_cfg.get("detect_inflight", 8)),
+            persist_batch=int(rt_cfg.get("persist_batch", 32)),
+            persist_interval=float(rt_cfg.get("persist_interval", 0.5)),
+            persist_retries=int(rt_cfg.get("persist_retries", 3)),
+            persist_backoff=float(rt_cfg.get("persist_backoff", 0.5)),
+            artifact_backlog=int(rt_cfg.get("artifact_backlog", 8)),
+            segment_gap=float(rt_cfg.get("segment_gap", 2.0)),
+            segment_max=float(rt_cfg.get("segment_max", 60.0)),
         ),
         detectors=DetectorConfigs(
             blank=BlankConfig(
@@ -114,15 +248,40 @@ def load_settings(path: Path | None = None) -> Settings:
                 sat_thresh=int(det_cfg.get("blank", {}).get("sat_thresh", 15)),
                 pct=float(det_cfg.get("blank", {}).get("pct", 0.95)),
                 frames=int(det_cfg.get("blank", {}).get("frames", 3)),
+                scale=float(det_cfg.get("blank", {}).get("scale", 1.0)),
+                regions=_as_list(det_cfg.get("blank", {}).get("regions", [])),
             ),
             freeze=FreezeConfig(
                 mad=float(det_cfg.get("freeze", {}).get("mad", 1.0)),
                 frames=int(det_cfg.get("freeze", {}).get("frames", 3)),
+                scale=float(det_cfg.get("freeze", {}).get("scale", 1.0)),
+                mode=str(det_cfg.get("freeze", {}).get("mode", "bgr")),
+                hash_max_dist=int(det_cfg.get("freeze", {}).get("hash_max_dist", -1)),
+                ssim_thresh=float(det_cfg.get("freeze", {}).get("ssim_thresh", 0.0)),
+                regions=_as_list(det_cfg.get("freeze", {}).get("regions", [])),
             ),
             flicker=FlickerConfig(
                 window=int(det_cfg.get("flicker", {}).get("window", 8)),
                 ratio_thresh=float(det_cfg.get("flicker", {}).get("ratio_thresh", 0.6)),
+                tile_rows=int(det_cfg.get("flicker", {}).get("tile_rows", 0)),
+                tile_cols=int(det_cfg.get("flicker", {}).get("tile_cols", 0)),
+                regions=_as_list(det_cfg.get("flicker", {}).get("regions", [])),
+            ),
+            hud_glitch=HudGlitchConfig(
+                regions=_as_list(hud_cfg.get("regions", [])),
+                template_dir=str(hud_cfg.get("template_dir", "") or ""),
+                template_size=int(hud_cfg.get("template_size", 32)),
+                dist_thresh=float(hud_cfg.get("dist_thresh", 0.2)),
+                frames=int(hud_cfg.get("frames", 3)),
+                warmup=int(hud_cfg.get("warmup", 30)),
+                max_templates=int(hud_cfg.get("max_templates", 16)),
+                magenta_pct=float(hud_cfg.get("magenta_pct", 0.2)),
             ),
+            extra={
+                name: dict(section or {})
+                for name, section in det_cfg.items()
+                if name not in _DETECTOR_SECTIONS
+            },
         ),
         regions=data.get("regions", {}),
     )
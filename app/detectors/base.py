@@ -1,19 +1,83 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Optional, Sequence
+
+import numpy as np
 
 from app.schemas.models import AnomalyEvent, FramePacket
 
+from .frame import FrameContext
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.config.load import Settings
+
+# Per-stream detector state. The pipeline sets ``elapsed_frames`` to the
+# number of stream frames since the detector last ran, so detectors that are
+# sampled sparsely can count runs in frames rather than calls.
 DetectorState = Dict[str, Any]
 
 
 class Detector(ABC):
-    """Base interface for frame anomaly detectors."""
+    """Base interface for frame anomaly detectors.
+
+    Detectors are looked up by name in :mod:`app.detectors.registry` and
+    built with :meth:`from_config` from the config dataclass they declare in
+    ``config_class``.
+    """
+
+    # dataclass holding this detector's ``settings.detectors.<name>`` section
+    config_class: ClassVar[Optional[type]] = None
+    # True if the detector interprets ``cfg.regions`` itself instead of being
+    # wrapped in a RegionDetector
+    region_aware: ClassVar[bool] = False
+
+    @classmethod
+    def from_config(cls, cfg: Any, settings: "Settings") -> "Detector":
+        """Build the detector from its config section (``None`` if absent)."""
+        return cls()
 
     @abstractmethod
-    def process(self, pkt: FramePacket, state: DetectorState) -> Optional[AnomalyEvent]:
-        """Process a frame packet and return an anomaly event if detected."""
+    def process(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        ctx: Optional[FrameContext] = None,
+    ) -> Optional[AnomalyEvent]:
+        """Process a frame packet and return an anomaly event if detected.
+
+        ``ctx`` is the shared decode context built by the pipeline. When it is
+        omitted the detector decodes ``pkt`` itself.
+        """
+
+    def suspicious(self, state: DetectorState) -> bool:
+        """Whether ``state`` shows a run in progress that may become an event.
+
+        The pipeline uses this to sample other detectors more densely.
+        """
+        return False
+
+    def process_batch(
+        self,
+        frames: np.ndarray,
+        pkts: Sequence[FramePacket],
+        state: DetectorState,
+    ) -> List[AnomalyEvent]:
+        """Process a whole clip of ``(T, H, W, 3)`` BGR ``frames`` at once.
+
+        ``pkts[i]`` describes ``frames[i]``. For a sparsely sampled detector
+        these are the frames it is due on and ``state["elapsed_frames"]``
+        is the spacing between them. The result, and ``state`` afterwards,
+        must match calling :meth:`process` on every frame in order. This default does exactly that; detectors override it with
+        vectorized versions.
+        """
+        events: List[AnomalyEvent] = []
+        for frame, pkt in zip(frames, pkts):
+            ctx = FrameContext(pkt.frame_id, frame, pkt.stream_id)
+            evt = self.process(pkt, state, ctx)
+            if evt is not None:
+                events.append(evt)
+        return events
 
 
 __all__ = ["Detector", "DetectorState"]
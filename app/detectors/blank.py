@@ -2,42 +2,101 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Sequence
 
 import cv2
+import numpy as np
 
+from app.config.load import BlankConfig, Settings
 from app.schemas.models import AnomalyEvent, FramePacket
 from app.schemas.types import AnomalyType, Severity
 
 from .base import Detector, DetectorState
+from .frame import FrameContext, batch_view
 
 
 @dataclass
 class BlankDetector(Detector):
-    """Detect long sequences of nearly black frames."""
+    """Detect long sequences of nearly black frames.
+
+    The dark and desaturated fractions are thresholded pixel counts on the
+    shared HSV view (``cv2.inRange`` + ``cv2.countNonZero``), optionally at a
+    reduced ``scale``. The saturation count is skipped when the luma check
+    already fails.
+    """
 
     luma_thresh: int = 10
     sat_thresh: int = 15
     pct: float = 0.95
     min_frames: int = 3
+    scale: float = 1.0
+
+    config_class = BlankConfig
+
+    @classmethod
+    def from_config(cls, cfg: BlankConfig, settings: Settings) -> "BlankDetector":
+        return cls(
+            luma_thresh=cfg.luma_thresh,
+            sat_thresh=cfg.sat_thresh,
+            pct=cfg.pct,
+            min_frames=cfg.frames,
+            scale=cfg.scale,
+        )
 
-    def process(self, pkt: FramePacket, state: DetectorState) -> Optional[AnomalyEvent]:
-        img = cv2.imread(str(pkt.path))
-        if img is None:
+    def process(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        ctx: Optional[FrameContext] = None,
+    ) -> Optional[AnomalyEvent]:
+        ctx = ctx or FrameContext.from_packet(pkt)
+        if ctx is None:
             return None
 
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        sat = hsv[:, :, 1]
-        luma = hsv[:, :, 2]
+        hsv = ctx.view(self.scale, "hsv")
+        total = hsv.shape[0] * hsv.shape[1]
+
+        dark = cv2.inRange(hsv, (0, 0, 0), (255, 255, self.luma_thresh))
+        l_ratio = cv2.countNonZero(dark) / total
+        s_ratio = 0.0
+        if l_ratio >= self.pct:
+            grey = cv2.inRange(hsv, (0, 0, 0), (255, self.sat_thresh, 255))
+            s_ratio = cv2.countNonZero(grey) / total
+        return self._step(pkt, state, l_ratio, s_ratio)
+
+    def process_batch(
+        self,
+        frames: np.ndarray,
+        pkts: Sequence[FramePacket],
+        state: DetectorState,
+    ) -> List[AnomalyEvent]:
+        hsv = batch_view(frames, self.scale, "hsv")
+        t, h, w = hsv.shape[:3]
+        tall = hsv.reshape(t * h, w, 3)
+        dark = cv2.inRange(tall, (0, 0, 0), (255, 255, self.luma_thresh))
+        grey = cv2.inRange(tall, (0, 0, 0), (255, self.sat_thresh, 255))
+        l_ratios = np.count_nonzero(dark.reshape(t, -1), axis=1) / (h * w)
+        s_ratios = np.count_nonzero(grey.reshape(t, -1), axis=1) / (h * w)
+        s_ratios[l_ratios < self.pct] = 0.0
 
-        l_hist = cv2.calcHist([luma], [0], None, [256], [0, 256])
-        s_hist = cv2.calcHist([sat], [0], None, [256], [0, 256])
+        events: List[AnomalyEvent] = []
+        for pkt, l_ratio, s_ratio in zip(pkts, l_ratios, s_ratios):
+            evt = self._step(pkt, state, float(l_ratio), float(s_ratio))
+            if evt is not None:
+                events.append(evt)
+        return events
 
-        l_ratio = float(l_hist[: self.luma_thresh + 1].sum() / l_hist.sum())
-        s_ratio = float(s_hist[: self.sat_thresh + 1].sum() / s_hist.sum())
+    def suspicious(self, state: DetectorState) -> bool:
+        return state.get("blank_run", 0) > 0
 
+    def _step(
+        self, pkt: FramePacket, state: DetectorState, l_ratio: float, s_ratio: float
+    ) -> Optional[AnomalyEvent]:
         if l_ratio >= self.pct and s_ratio >= self.pct:
-            state["blank_run"] = state.get("blank_run", 0) + 1
+            # a sparse sample stands for the frames since the previous one
+            # only if that sample was positive too
+            run = state.get("blank_run", 0)
+            state["blank_run"] = run + state.get("elapsed_frames", 1) if run else 1
         else:
             state["blank_run"] = 0
 
@@ -2,58 +2,241 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Sequence
 
 import cv2
 import numpy as np
 
+from app.config.load import FlickerConfig, Settings
 from app.schemas.models import AnomalyEvent, FramePacket
 from app.schemas.types import AnomalyType, Severity
 
 from .base import Detector, DetectorState
+from .frame import FrameContext, batch_view
+
+
+def _high_freq_ratio(bins: np.ndarray, axis: int = 0) -> np.ndarray:
+    """Energy above the fundamental over all AC energy of rfft ``bins``."""
+    power = bins.real**2 + bins.imag**2
+    ac = np.take(power, np.arange(1, power.shape[axis]), axis=axis)
+    total = ac.sum(axis=axis)
+    high = total - np.take(ac, 0, axis=axis)
+    return np.where(total > 1e-6, high / np.maximum(total, 1e-12), 0.0)
+
+
+class SlidingSpectrum:
+    """Sliding DFT over the last ``window`` samples of one or more signals.
+
+    Samples live in a fixed ``(window, channels)`` ring. Each :meth:`push`
+    updates the ``window // 2 + 1`` non-negative frequency bins in place
+    (``X_k <- (X_k + x_new - x_old) * e^{2πik/N}``), costing O(bins) per
+    channel instead of a fresh FFT. The bins are recomputed exactly every
+    ``resync`` pushes to stop floating-point drift.
+    """
+
+    def __init__(self, window: int, channels: int = 1, resync: int = 1024) -> None:
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self.channels = channels
+        self.resync = max(window, resync)
+        bins = window // 2 + 1
+        self._ring = np.zeros((window, channels), dtype=np.float64)
+        self._bins = np.zeros((bins, channels), dtype=np.complex128)
+        self._twiddle = np.exp(2j * np.pi * np.arange(bins) / window)[:, None]
+        self._delta = np.zeros(channels, dtype=np.float64)
+        self._pos = 0
+        self._since_resync = 0
+        self.count = 0
+
+    @property
+    def ready(self) -> bool:
+        """Whether a full window of samples has been pushed."""
+        return self.count >= self.window
+
+    def push(self, sample: "np.ndarray | float") -> None:
+        """Add one sample per channel, replacing the oldest one."""
+        np.subtract(sample, self._ring[self._pos], out=self._delta)
+        self._ring[self._pos] = sample
+        self._pos = (self._pos + 1) % self.window
+        self.count += 1
+        self._since_resync += 1
+        if self._since_resync >= self.resync:
+            self._bins[:] = np.fft.rfft(self.history(), axis=0)
+            self._since_resync = 0
+            return
+        np.add(self._bins, self._delta, out=self._bins)
+        np.multiply(self._bins, self._twiddle, out=self._bins)
+
+    def high_freq_ratio(self) -> np.ndarray:
+        """Per channel, energy above the fundamental over all AC energy.
+
+        The DC bin is ignored, which is equivalent to removing the window
+        mean before the transform.
+        """
+        return _high_freq_ratio(self._bins)
+
+    def history(self) -> np.ndarray:
+        """The last ``window`` samples, oldest first."""
+        return np.roll(self._ring, -self._pos, axis=0)
+
+    def load(self, samples: np.ndarray, count: int) -> None:
+        """Replace the ring with ``window`` ordered ``samples``.
+
+        ``count`` is the number of samples pushed since the last reset; the
+        bins are recomputed exactly.
+        """
+        self._ring[:] = samples
+        self._bins[:] = np.fft.rfft(self._ring, axis=0)
+        self._pos = 0
+        self._since_resync = 0
+        self.count = count
+
+    def reset(self) -> None:
+        self._ring.fill(0.0)
+        self._bins.fill(0.0)
+        self._pos = 0
+        self._since_resync = 0
+        self.count = 0
 
 
 @dataclass
 class FlickerDetector(Detector):
-    """Detect rapid luminance oscillations using a temporal FFT."""
+    """Detect rapid luminance oscillations using a temporal FFT.
+
+    By default the whole frame is reduced to one mean luma value. With
+    ``tile_rows`` and ``tile_cols`` set, the frame is split into a grid whose
+    per-tile means come from one area downsample, and the spectrum runs over
+    all tiles at once so localised flicker (a HUD widget) is not averaged
+    away. Events then list the tiles that flickered.
+    """
 
     window: int = 8
     ratio_thresh: float = 0.6
+    tile_rows: int = 0
+    tile_cols: int = 0
+
+    config_class = FlickerConfig
+
+    @classmethod
+    def from_config(cls, cfg: FlickerConfig, settings: Settings) -> "FlickerDetector":
+        return cls(
+            window=cfg.window,
+            ratio_thresh=cfg.ratio_thresh,
+            tile_rows=cfg.tile_rows,
+            tile_cols=cfg.tile_cols,
+        )
 
-    def process(self, pkt: FramePacket, state: DetectorState) -> Optional[AnomalyEvent]:
-        img = cv2.imread(str(pkt.path))
-        if img is None:
+    @property
+    def tiled(self) -> bool:
+        return self.tile_rows > 0 and self.tile_cols > 0
+
+    def _sample(self, ctx: FrameContext) -> np.ndarray:
+        luma = ctx.luma
+        if not self.tiled:
+            return np.array([np.mean(luma)])
+        # INTER_AREA averages every source pixel into its tile in one pass
+        tiles = cv2.resize(
+            luma, (self.tile_cols, self.tile_rows), interpolation=cv2.INTER_AREA
+        )
+        return tiles.reshape(-1).astype(np.float64)
+
+    def process(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        ctx: Optional[FrameContext] = None,
+    ) -> Optional[AnomalyEvent]:
+        ctx = ctx or FrameContext.from_packet(pkt)
+        if ctx is None:
             return None
 
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        luma = hsv[:, :, 2]
-        mean_luma = float(np.mean(luma))
-
-        lumas = state.setdefault("luma_window", [])
-        lumas.append(mean_luma)
-        if len(lumas) > self.window:
-            lumas.pop(0)
+        sample = self._sample(ctx)
+        spectrum = self._spectrum(state, sample.size)
+        spectrum.push(sample)
 
-        if len(lumas) < self.window:
+        if not spectrum.ready:
             return None
 
-        arr = np.array(lumas, dtype=np.float32)
-        arr -= np.mean(arr)
-
-        fft = np.fft.rfft(arr)
-        mags = np.abs(fft) ** 2
-        total = float(np.sum(mags))
-        if total <= 1e-6:
-            ratio = 0.0
+        evt = self._emit(pkt, state, spectrum.high_freq_ratio())
+        if evt is not None:
+            spectrum.reset()
+        return evt
+
+    def process_batch(
+        self,
+        frames: np.ndarray,
+        pkts: Sequence[FramePacket],
+        state: DetectorState,
+    ) -> List[AnomalyEvent]:
+        """Score every window of the clip with one batched FFT.
+
+        After a reset a fresh window holds exactly the last ``window``
+        samples, so each frame's ratio only depends on its trailing window;
+        resets just gate which frames may fire.
+        """
+        if len(frames) == 0:
+            return []
+        luma = batch_view(frames, 1.0, "hsv")[..., 2]
+        if self.tiled:
+            size = (self.tile_cols, self.tile_rows)
+            samples = np.stack(
+                [cv2.resize(f, size, interpolation=cv2.INTER_AREA) for f in luma]
+            ).reshape(len(frames), -1)
         else:
-            ratio = float(np.sum(mags[2:]) / total)
+            samples = luma.reshape(len(frames), -1).mean(axis=1)[:, None]
+        samples = samples.astype(np.float64)
 
+        spectrum = self._spectrum(state, samples.shape[1])
+        series = np.concatenate([spectrum.history(), samples])
+        windows = np.lib.stride_tricks.sliding_window_view(
+            series[1:], self.window, axis=0
+        )
+        ratios = _high_freq_ratio(np.fft.rfft(windows, axis=-1), axis=-1)
+
+        events: List[AnomalyEvent] = []
+        count = spectrum.count
+        for pkt, frame_ratios in zip(pkts, ratios):
+            count += 1
+            if count < self.window:
+                continue
+            evt = self._emit(pkt, state, frame_ratios)
+            if evt is not None:
+                events.append(evt)
+                count = 0
+        if count == 0:
+            spectrum.reset()
+        else:
+            spectrum.load(series[-self.window :], count)
+        return events
+
+    def _spectrum(self, state: DetectorState, channels: int) -> SlidingSpectrum:
+        spectrum = state.get("spectrum")
+        if (
+            spectrum is None
+            or spectrum.window != self.window
+            or spectrum.channels != channels
+        ):
+            spectrum = state["spectrum"] = SlidingSpectrum(self.window, channels)
+        return spectrum
+
+    def _emit(
+        self, pkt: FramePacket, state: DetectorState, ratios: np.ndarray
+    ) -> Optional[AnomalyEvent]:
+        ratio = float(ratios.max())
         if ratio < self.ratio_thresh:
             return None
 
+        metrics: dict[str, object] = {"high_freq_ratio": ratio}
+        if self.tiled:
+            hot = np.flatnonzero(ratios >= self.ratio_thresh)
+            metrics["tile_grid"] = [self.tile_rows, self.tile_cols]
+            metrics["flicker_tiles"] = [
+                [int(i // self.tile_cols), int(i % self.tile_cols)] for i in hot
+            ]
+
         event_id = state.get("next_event_id", 1)
         state["next_event_id"] = event_id + 1
-        state["luma_window"] = []
 
         return AnomalyEvent(
             event_id=event_id,
@@ -61,6 +244,6 @@ class FlickerDetector(Detector):
             severity=Severity.LOW,
             frame=pkt,
             confidence=max(0.0, min(1.0, ratio)),
-            metrics={"high_freq_ratio": ratio},
+            metrics=metrics,
             created_at=datetime.utcnow(),
         )
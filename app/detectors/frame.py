@@ -0,0 +1,237 @@
+"""Per-frame decode context shared by all detectors of a pipeline."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.schemas.models import FramePacket
+
+from .utils import dhash
+
+_SPACES = ("bgr", "hsv", "gray")
+
+# (x, y, width, height) in frame pixels
+Rect = Tuple[int, int, int, int]
+
+
+def region_rects(
+    regions: Mapping[str, Mapping[str, int]],
+    names: Iterable[str],
+    origin: str = "full",
+) -> Dict[str, Rect]:
+    """Convert ``settings.regions`` entries to rectangles in frame pixels.
+
+    Regions are configured in screen coordinates; frames of a stream start
+    at the ``origin`` region's top-left corner.
+    """
+    base = regions.get(origin, {})
+    ox, oy = int(base.get("left", 0)), int(base.get("top", 0))
+    rects: Dict[str, Rect] = {}
+    for name in names:
+        region = regions.get(name)
+        if region is None:
+            raise ValueError(f"Unknown region: {name}")
+        rects[name] = (
+            int(region.get("left", 0)) - ox,
+            int(region.get("top", 0)) - oy,
+            int(region["width"]),
+            int(region["height"]),
+        )
+    return rects
+
+
+def stream_region_rects(
+    regions: Mapping[str, Mapping[str, int]],
+    names: Iterable[str],
+    streams: Iterable[str],
+) -> Dict[str, Dict[str, Rect]]:
+    """:func:`region_rects` per capture stream, keyed by stream id.
+
+    A stream is named after the ``regions`` entry it captures, so its frames
+    start at that entry's corner rather than at ``full``'s.
+    """
+    names = list(names)
+    return {
+        stream: region_rects(regions, names, origin=stream)
+        for stream in streams
+        if stream in regions
+    }
+
+
+def crop(img: np.ndarray, rect: Rect) -> np.ndarray:
+    """Zero-copy view of ``rect`` clipped to the bounds of ``img``."""
+    x, y, w, h = rect
+    return img[max(0, y) : max(0, y + h), max(0, x) : max(0, x + w)]
+
+
+class FrameContext:
+    """Decoded frame plus lazily derived colour-space and scaled views.
+
+    The BGR array is decoded once; HSV, grayscale and downscaled variants are
+    computed on first access and cached so every detector looking at the same
+    frame shares the work.
+    """
+
+    def __init__(
+        self, frame_id: int, bgr: np.ndarray, stream_id: str = "default"
+    ) -> None:
+        self.frame_id = frame_id
+        self.stream_id = stream_id
+        self.bgr = bgr
+        self._views: Dict[Tuple[float, str], np.ndarray] = {(1.0, "bgr"): bgr}
+        self._dhash: Optional[int] = None
+        self._regions: Dict[Rect, "FrameContext"] = {}
+
+    @classmethod
+    def from_packet(cls, pkt: FramePacket) -> Optional["FrameContext"]:
+        """Wrap ``pkt.image`` or decode ``pkt.path``; ``None`` if unreadable."""
+        if pkt.image is not None:
+            return cls(pkt.frame_id, pkt.image, pkt.stream_id)
+        if pkt.path.suffix == ".npy":
+            try:
+                img = np.load(pkt.path)
+            except (OSError, ValueError):
+                img = None
+        else:
+            img = cv2.imread(str(pkt.path))
+        if img is None:
+            return None
+        return cls(pkt.frame_id, img, pkt.stream_id)
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self.view(1.0, "hsv")
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.view(1.0, "gray")
+
+    @property
+    def luma(self) -> np.ndarray:
+        """Value channel of the HSV view (used as luminance by detectors)."""
+        return self.hsv[:, :, 2]
+
+    @property
+    def dhash(self) -> int:
+        """64-bit difference hash of the frame (see :func:`utils.dhash`)."""
+        if self._dhash is None:
+            self._dhash = dhash(self.bgr)
+        return self._dhash
+
+    def region(self, rect: Rect) -> "FrameContext":
+        """Context over a zero-copy crop of the frame (cached per ``rect``)."""
+        sub = self._regions.get(rect)
+        if sub is None:
+            sub = FrameContext(self.frame_id, crop(self.bgr, rect), self.stream_id)
+            self._regions[rect] = sub
+        return sub
+
+    def view(self, scale: float = 1.0, space: str = "bgr") -> np.ndarray:
+        """Return the frame at ``scale`` in colour ``space`` (cached).
+
+        Args:
+            scale: Resize factor applied to both dimensions (``1.0`` keeps the
+                decoded resolution). Downscaling uses area interpolation.
+            space: One of ``"bgr"``, ``"hsv"`` or ``"gray"``.
+        """
+        if space not in _SPACES:
+            raise ValueError(f"Unknown colour space: {space}")
+        key = (float(scale), space)
+        cached = self._views.get(key)
+        if cached is not None:
+            return cached
+
+        if space == "bgr":
+            h, w = self.bgr.shape[:2]
+            size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+            out = cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA)
+        elif space == "hsv":
+            out = cv2.cvtColor(self.view(scale, "bgr"), cv2.COLOR_BGR2HSV)
+        else:
+            out = cv2.cvtColor(self.view(scale, "bgr"), cv2.COLOR_BGR2GRAY)
+        self._views[key] = out
+        return out
+
+
+def batch_view(
+    frames: np.ndarray, scale: float = 1.0, space: str = "bgr"
+) -> np.ndarray:
+    """Stack of :meth:`FrameContext.view` results for a ``(T, H, W, 3)`` clip.
+
+    Colour conversions are per-pixel, so they run as one OpenCV call over
+    the clip reshaped to a single tall image; only resizing loops per frame.
+    The output matches calling ``view`` frame by frame.
+    """
+    if space not in _SPACES:
+        raise ValueError(f"Unknown colour space: {space}")
+    if float(scale) != 1.0:
+        h, w = frames.shape[1:3]
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        frames = np.stack(
+            [cv2.resize(f, size, interpolation=cv2.INTER_AREA) for f in frames]
+        )
+    if space == "bgr":
+        return frames
+    t, h, w = frames.shape[:3]
+    tall = np.ascontiguousarray(frames).reshape(t * h, w, 3)
+    code = cv2.COLOR_BGR2HSV if space == "hsv" else cv2.COLOR_BGR2GRAY
+    out = cv2.cvtColor(tall, code)
+    return out.reshape((t, h, w) + out.shape[2:])
+
+
+class FrameCache:
+    """Small thread-safe LRU of :class:`FrameContext` objects.
+
+    Entries are keyed by ``(stream_id, frame_id)``. Detectors that need to
+    look back at recent frames can fetch them here instead of decoding the
+    file again.
+    """
+
+    def __init__(self, capacity: int = 8) -> None:
+        self.capacity = max(1, capacity)
+        self._items: "OrderedDict[Tuple[str, int], FrameContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frame_id: int, stream_id: str = "default") -> Optional[FrameContext]:
+        key = (stream_id, frame_id)
+        with self._lock:
+            ctx = self._items.get(key)
+            if ctx is not None:
+                self._items.move_to_end(key)
+        return ctx
+
+    def put(self, ctx: FrameContext) -> None:
+        key = (ctx.stream_id, ctx.frame_id)
+        with self._lock:
+            self._items[key] = ctx
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def load(self, pkt: FramePacket) -> Optional[FrameContext]:
+        """Return the cached context for ``pkt``, decoding it on a miss."""
+        ctx = self.get(pkt.frame_id, pkt.stream_id)
+        if ctx is None:
+            ctx = FrameContext.from_packet(pkt)
+            if ctx is not None:
+                self.put(ctx)
+        return ctx
+
+    def __len__(self) -> int:  # pragma: no cover - trivial
+        return len(self._items)
+
+
+__all__ = [
+    "FrameContext",
+    "FrameCache",
+    "Rect",
+    "batch_view",
+    "crop",
+    "region_rects",
+    "stream_region_rects",
+]
@@ -2,40 +2,157 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
 
 import cv2
+import numpy as np
 
+from app.config.load import FreezeConfig, Settings
 from app.schemas.models import AnomalyEvent, FramePacket
 from app.schemas.types import AnomalyType, Severity
 
 from .base import Detector, DetectorState
-from .utils import mad
+from .frame import FrameContext, batch_view
+from .utils import hamming, mad_bounded, ssim
+
+MODES = ("bgr", "gray")
 
 
 @dataclass
 class FreezeDetector(Detector):
-    """Detect long sequences of nearly identical frames."""
+    """Detect long sequences of nearly identical frames.
+
+    Frames are compared at ``scale`` in ``mode`` (``"bgr"`` or ``"gray"``);
+    a 1/8-scale grayscale comparison touches ~200x fewer values than the
+    full-resolution BGR default. The previous frame lives in one buffer per
+    stream that is overwritten in place, and the comparison stops as soon as
+    the difference is known to exceed ``mad_thresh``.
+
+    Two optional stages tighten the decision on low-motion content. With
+    ``hash_max_dist >= 0`` a frame only counts as frozen when its 64-bit
+    difference hash is within that Hamming distance of the previous one
+    (the hash is cached on the frame context, where the pipeline reuses it
+    as the frame checksum). With ``ssim_thresh > 0`` frames passing the cheap
+    checks are confirmed with SSIM, so the costly comparison only runs on
+    candidate freezes.
+    """
 
     mad_thresh: float = 1.0
     min_frames: int = 3
+    scale: float = 1.0
+    mode: str = "bgr"
+    hash_max_dist: int = -1
+    ssim_thresh: float = 0.0
+
+    config_class = FreezeConfig
 
-    def process(self, pkt: FramePacket, state: DetectorState) -> Optional[AnomalyEvent]:
-        img = cv2.imread(str(pkt.path))
-        if img is None:
+    @classmethod
+    def from_config(cls, cfg: FreezeConfig, settings: Settings) -> "FreezeDetector":
+        return cls(
+            mad_thresh=cfg.mad,
+            min_frames=cfg.frames,
+            scale=cfg.scale,
+            mode=cfg.mode,
+            hash_max_dist=cfg.hash_max_dist,
+            ssim_thresh=cfg.ssim_thresh,
+        )
+
+    def __post_init__(self) -> None:
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown freeze mode: {self.mode}")
+        if not 0 < self.scale <= 1:
+            raise ValueError("scale must be in (0, 1]")
+
+    def process(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        ctx: Optional[FrameContext] = None,
+    ) -> Optional[AnomalyEvent]:
+        ctx = ctx or FrameContext.from_packet(pkt)
+        if ctx is None:
             return None
 
+        img = ctx.view(self.scale, self.mode)
         prev = state.get("prev_frame")
-        state["prev_frame"] = img
 
-        if prev is None:
+        prev_hash = state.get("prev_hash")
+        cur_hash: Optional[int] = None
+        if self.hash_max_dist >= 0:
+            cur_hash = state["prev_hash"] = ctx.dhash
+
+        if prev is None or prev.shape != img.shape:
+            state["prev_frame"] = img.copy()
             state["freeze_run"] = 0
             return None
 
-        diff = mad(prev, img)
+        metrics: Dict[str, float] = {}
+        frozen = True
+        if cur_hash is not None and prev_hash is not None:
+            dist = hamming(prev_hash, cur_hash)
+            metrics["hash_dist"] = float(dist)
+            frozen = dist <= self.hash_max_dist
+
+        diff = self.mad_thresh
+        if frozen:
+            diff = mad_bounded(prev, img, self.mad_thresh)
+            frozen = diff < self.mad_thresh
+        if frozen and self.ssim_thresh > 0:
+            score = ssim(prev, img)
+            metrics["ssim"] = score
+            frozen = score >= self.ssim_thresh
+        np.copyto(prev, img)
+        return self._step(pkt, state, frozen, diff, metrics)
+
+    def process_batch(
+        self,
+        frames: np.ndarray,
+        pkts: Sequence[FramePacket],
+        state: DetectorState,
+    ) -> List[AnomalyEvent]:
+        # hash and SSIM stages are per-frame; replay those configurations
+        if self.hash_max_dist >= 0 or self.ssim_thresh > 0 or len(frames) == 0:
+            return super().process_batch(frames, pkts, state)
+
+        views = batch_view(frames, self.scale, self.mode)
+        prev = state.get("prev_frame")
+        events: List[AnomalyEvent] = []
+        if prev is None or prev.shape != views.shape[1:]:
+            state["prev_frame"] = prev = views[0].copy()
+            state["freeze_run"] = 0
+            views, pkts = views[1:], pkts[1:]
+        if len(views) == 0:
+            return events
+
+        n = len(views)
+        stack = np.concatenate([prev[None], views]).reshape(n + 1, -1)
+        diffs = cv2.absdiff(stack[1:], stack[:-1])
+        mads = diffs.sum(axis=1, dtype=np.uint64) / stack.shape[1]
+        np.copyto(prev, views[-1])
+
+        for pkt, diff in zip(pkts, mads):
+            diff = float(diff)
+            evt = self._step(pkt, state, diff < self.mad_thresh, diff, {})
+            if evt is not None:
+                events.append(evt)
+        return events
+
+    def suspicious(self, state: DetectorState) -> bool:
+        return state.get("freeze_run", 0) > 0
 
-        if diff < self.mad_thresh:
-            state["freeze_run"] = state.get("freeze_run", 0) + 1
+    def _step(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        frozen: bool,
+        diff: float,
+        metrics: Dict[str, float],
+    ) -> Optional[AnomalyEvent]:
+        if frozen:
+            # a sparse sample stands for the frames since the previous one
+            # only if that sample was positive too
+            run = state.get("freeze_run", 0)
+            state["freeze_run"] = run + state.get("elapsed_frames", 1) if run else 1
         else:
             state["freeze_run"] = 0
 
@@ -53,6 +170,6 @@ class FreezeDetector(Detector):
             severity=Severity.LOW,
             frame=pkt,
             confidence=confidence,
-            metrics={"mad": diff},
+            metrics={"mad": diff, **metrics},
             created_at=datetime.utcnow(),
         )
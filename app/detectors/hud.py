@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config.load import HudGlitchConfig, Settings
+from app.schemas.models import AnomalyEvent, FramePacket
+from app.schemas.types import AnomalyType, Severity
+
+from .base import Detector, DetectorState
+from .frame import FrameContext, Rect, crop, region_rects, stream_region_rects
+
+# BGR bounds of the magenta placeholder colour engines draw for missing textures
+_MAGENTA_LO = (200, 0, 200)
+_MAGENTA_HI = (255, 60, 255)
+
+
+@dataclass
+class HudGlitchDetector(Detector):
+    """Detect corrupted HUD elements by matching regions against references.
+
+    Only the configured ``regions`` (frame-pixel rectangles) are touched:
+    each is cropped as a view, area-downsampled to at most
+    ``template_size`` pixels on its longest side and compared in grayscale
+    with every reference of that region in one vectorized mean-absolute
+    distance. References come from ``template_dir`` (``<region>.png`` or
+    ``<region>/*.png``) or, without one, are learned per stream from the
+    first ``warmup`` frames. A region glitches when its nearest reference is
+    further than ``dist_thresh`` (0-1 scale) for ``min_frames`` frames in a
+    row, or at once when ``magenta_pct`` of it is debug magenta.
+
+    As with :class:`RegionDetector`, ``stream_regions`` overrides the
+    rectangles for streams captured from another origin than ``full``.
+    """
+
+    regions: Dict[str, Rect] = field(default_factory=dict)
+    template_dir: Optional[Path] = None
+    template_size: int = 32
+    dist_thresh: float = 0.2
+    min_frames: int = 3
+    warmup: int = 30
+    max_templates: int = 16
+    magenta_pct: float = 0.2
+    stream_regions: Dict[str, Dict[str, Rect]] = field(default_factory=dict)
+    _files: Dict[str, np.ndarray] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    config_class = HudGlitchConfig
+    region_aware = True
+
+    @classmethod
+    def from_config(
+        cls, cfg: HudGlitchConfig, settings: Settings
+    ) -> "HudGlitchDetector":
+        return cls(
+            regions=region_rects(settings.regions, cfg.regions),
+            stream_regions=stream_region_rects(
+                settings.regions, cfg.regions, settings.capture.streams
+            ),
+            template_dir=Path(cfg.template_dir) if cfg.template_dir else None,
+            template_size=cfg.template_size,
+            dist_thresh=cfg.dist_thresh,
+            min_frames=cfg.frames,
+            warmup=cfg.warmup,
+            max_templates=cfg.max_templates,
+            magenta_pct=cfg.magenta_pct,
+        )
+
+    def __post_init__(self) -> None:
+        if self.template_dir is not None:
+            self.template_dir = Path(self.template_dir)
+            for name in self.regions:
+                refs = self._load_templates(name)
+                if refs is not None:
+                    self._files[name] = refs
+
+    def _size(self, name: str) -> Tuple[int, int]:
+        _, _, w, h = self.regions[name]
+        scale = min(1.0, self.template_size / max(w, h, 1))
+        return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+    def _vector(self, name: str, roi: np.ndarray) -> np.ndarray:
+        small = cv2.resize(roi, self._size(name), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.reshape(-1).astype(np.float32) / 255.0
+
+    def _load_templates(self, name: str) -> Optional[np.ndarray]:
+        assert self.template_dir is not None
+        paths = sorted((self.template_dir / name).glob("*.png"))
+        single = self.template_dir / f"{name}.png"
+        if single.exists():
+            paths.insert(0, single)
+        vectors = []
+        for path in paths:
+            img = cv2.imread(str(path))
+            if img is not None:
+                vectors.append(self._vector(name, img))
+        return np.stack(vectors) if vectors else None
+
+    def process(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        ctx: Optional[FrameContext] = None,
+    ) -> Optional[AnomalyEvent]:
+        if not self.regions:
+            return None
+        ctx = ctx or FrameContext.from_packet(pkt)
+        if ctx is None:
+            return None
+
+        elapsed = state.get("elapsed_frames", 1)
+        seen = state["hud_frames"] = state.get("hud_frames", 0) + elapsed
+        learned: Dict[str, List[np.ndarray]] = state.setdefault("hud_templates", {})
+        runs: Dict[str, int] = state.setdefault("hud_runs", {})
+
+        fired: List[str] = []
+        distance: Dict[str, float] = {}
+        magenta: Dict[str, float] = {}
+        rects = self.stream_regions.get(pkt.stream_id, self.regions)
+        for name, rect in rects.items():
+            roi = crop(ctx.bgr, rect)
+            if roi.size == 0:
+                continue
+            mask = cv2.inRange(roi, _MAGENTA_LO, _MAGENTA_HI)
+            magenta[name] = cv2.countNonZero(mask) / (roi.shape[0] * roi.shape[1])
+            vec = self._vector(name, roi)
+
+            refs = self._files.get(name)
+            if refs is None:
+                refs_list = learned.setdefault(name, [])
+                if seen <= self.warmup:
+                    self._learn(refs_list, vec)
+                refs = np.stack(refs_list) if refs_list else None
+
+            glitch = magenta[name] >= self.magenta_pct
+            if refs is not None and (name in self._files or seen > self.warmup):
+                distance[name] = float(np.abs(refs - vec).mean(axis=1).min())
+                glitch = glitch or distance[name] > self.dist_thresh
+
+            if not glitch:
+                runs[name] = 0
+                continue
+            if magenta[name] >= self.magenta_pct:
+                runs[name] = self.min_frames
+            else:
+                run = runs.get(name, 0)
+                runs[name] = run + elapsed if run else 1
+            if runs[name] >= self.min_frames:
+                fired.append(name)
+
+        if not fired:
+            return None
+        for name in fired:
+            runs[name] = 0
+
+        event_id = state.get("next_event_id", 1)
+        state["next_event_id"] = event_id + 1
+
+        worst_dist = max((distance.get(n, 0.0) for n in fired), default=0.0)
+        worst_magenta = max(magenta.get(n, 0.0) for n in fired)
+        confidence = max(worst_dist / (2 * self.dist_thresh), worst_magenta)
+        return AnomalyEvent(
+            event_id=event_id,
+            type=AnomalyType.HUD_GLITCH,
+            severity=Severity.MEDIUM,
+            frame=pkt,
+            confidence=max(0.0, min(1.0, confidence)),
+            metrics={
+                "regions": fired,
+                "distance": worst_dist,
+                "magenta_ratio": worst_magenta,
+            },
+            created_at=datetime.utcnow(),
+        )
+
+    def suspicious(self, state: DetectorState) -> bool:
+        return any(run > 0 for run in state.get("hud_runs", {}).values())
+
+    def _learn(self, refs: List[np.ndarray], vec: np.ndarray) -> None:
+        """Keep ``vec`` as a reference unless one within half the threshold exists."""
+        if len(refs) >= self.max_templates:
+            return
+        if refs:
+            nearest = float(np.abs(np.stack(refs) - vec).mean(axis=1).min())
+            if nearest <= self.dist_thresh / 2:
+                return
+        refs.append(vec)
@@ -2,42 +2,208 @@
 
 from __future__ import annotations
 
+import threading
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Sequence, Set, Tuple, Type
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 
+import numpy as np
 import yaml
 
 from app.config.load import Settings, load_settings
 from app.schemas.models import AnomalyEvent, FramePacket
 
 from .base import Detector, DetectorState
-from .blank import BlankDetector
-from .flicker import FlickerDetector
-from .freeze import FreezeDetector
+from .frame import FrameCache, FrameContext, region_rects, stream_region_rects
+from .regions import RegionDetector
+from .registry import registry
+from .utils import dhash
 
 DetectorFactory = Type[Detector]
 
-NAME_MAP: Dict[str, DetectorFactory] = {
-    "blank": BlankDetector,
-    "freeze": FreezeDetector,
-    "flicker": FlickerDetector,
-}
+# lazy: detector modules are imported on first lookup of their name
+NAME_MAP: Mapping[str, DetectorFactory] = registry
+
+
+@dataclass(frozen=True)
+class Sampling:
+    """How often a detector runs on the frames of a stream.
+
+    ``every`` runs the detector on every Nth frame. ``boost`` switches it to
+    every frame for the next N frames whenever another detector reports a
+    suspicious run (see :meth:`Detector.suspicious`), so cheap detectors can
+    pull expensive ones in densely when something starts to go wrong.
+    """
+
+    every: int = 1
+    boost: int = 0
+
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any], fps: float) -> "Sampling":
+        """Parse the ``every``/``hz``/``boost_frames`` keys of a YAML entry."""
+        every = int(entry.get("every", 1))
+        if "hz" in entry:
+            every = int(round(fps / float(entry["hz"])))
+        return cls(every=max(1, every), boost=max(0, int(entry.get("boost_frames", 0))))
+
+
+class _StreamClock:
+    """Per-stream frame counter deciding which detectors run on a frame."""
+
+    def __init__(self, sampling: Sequence[Sampling]) -> None:
+        self.sampling = list(sampling)
+        self.tick = 0
+        self.last: List[Optional[int]] = [None] * len(self.sampling)
+        self.boost_until = [0] * len(self.sampling)
+
+    def due(self, i: int) -> bool:
+        last = self.last[i]
+        return (
+            last is None
+            or self.tick - last >= self.sampling[i].every
+            or self.tick <= self.boost_until[i]
+        )
+
+    def mark(self, i: int) -> int:
+        """Record a run of detector ``i``; return the frames elapsed since the last."""
+        last = self.last[i]
+        self.last[i] = self.tick
+        return 1 if last is None else self.tick - last
+
+    def boost(self) -> None:
+        for i, spec in enumerate(self.sampling):
+            if spec.boost:
+                self.boost_until[i] = self.tick + spec.boost
+
+
+def _may_boost(det: Detector) -> bool:
+    """Whether ``det`` can report suspicious runs that boost other detectors."""
+    if isinstance(det, RegionDetector):
+        det = det.detector
+    return type(det).suspicious is not Detector.suspicious
+
+
+class DedupWindow:
+    """Set of emitted ``(anomaly_type, frame_id)`` keys for recent frames only.
+
+    Frame ids of a stream increase monotonically, so keys are evicted once
+    they fall more than ``window`` frames behind the newest frame seen. Memory
+    stays bounded in long-running sessions while duplicates emitted for the
+    same frame are still caught.
+    """
+
+    def __init__(self, window: int = 256) -> None:
+        self.window = max(1, window)
+        self._keys: Set[Tuple[str, int]] = set()
+        self._order: Deque[Tuple[str, int]] = deque()
+        self._watermark: Optional[int] = None
+
+    def advance(self, frame_id: int) -> None:
+        """Move the watermark to ``frame_id`` and evict keys outside the window."""
+        if self._watermark is None or frame_id > self._watermark:
+            self._watermark = frame_id
+        cutoff = self._watermark - self.window
+        while self._order and self._order[0][1] <= cutoff:
+            self._keys.discard(self._order.popleft())
+
+    def add(self, key: Tuple[str, int]) -> bool:
+        """Record ``key``; return ``False`` if it was already present."""
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
 
 
 class DetectorPipeline:
-    """Manage a sequence of detectors and deduplicate emitted events."""
+    """Manage a sequence of detectors and deduplicate emitted events.
 
-    def __init__(self, detectors: Sequence[Detector]) -> None:
+    Detector state and deduplication are kept per ``FramePacket.stream_id``,
+    so frames of several capture sources can be interleaved. Frames of one
+    stream must be processed in order; different streams may be processed
+    concurrently from several threads.
+
+    ``sampling`` optionally gives each detector a :class:`Sampling` rate.
+    Sparsely sampled detectors are told how many frames elapsed since their
+    previous run (``state["elapsed_frames"]``), so ``min_frames`` keeps
+    meaning a duration in frames rather than a number of calls.
+    """
+
+    def __init__(
+        self,
+        detectors: Sequence[Detector],
+        *,
+        cache_size: int = 8,
+        dedup_window: int = 256,
+        sampling: Optional[Sequence[Sampling]] = None,
+    ) -> None:
         self.detectors = list(detectors)
-        self._states: List[DetectorState] = [{} for _ in self.detectors]
-        # track (anomaly_type, frame_id) to avoid duplicate events
-        self._seen: Set[Tuple[str, int]] = set()
+        self.sampling = list(sampling or [Sampling() for _ in self.detectors])
+        if len(self.sampling) != len(self.detectors):
+            raise ValueError("sampling must have one entry per detector")
+        self._clocks: Dict[str, _StreamClock] = {}
+        self._states: Dict[str, List[DetectorState]] = {}
+        # decoded frames shared by all detectors; also serves look-back reads
+        self.cache = FrameCache(cache_size)
+        # per stream, track recent (anomaly_type, frame_id) to avoid duplicates
+        self.dedup_window = dedup_window
+        self._seen: Dict[str, DedupWindow] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def streams(self) -> List[str]:
+        """Stream ids that have been seen so far."""
+        return list(self._states)
+
+    @property
+    def dedup_size(self) -> int:
+        """Number of keys currently held for deduplication, across streams."""
+        return sum(len(seen) for seen in list(self._seen.values()))
+
+    @property
+    def dense(self) -> bool:
+        """Whether every detector runs on every frame."""
+        return all(s.every == 1 for s in self.sampling)
+
+    def _stream(
+        self, stream_id: str
+    ) -> Tuple[List[DetectorState], DedupWindow, _StreamClock]:
+        states = self._states.get(stream_id)
+        if states is None:
+            with self._lock:
+                self._seen.setdefault(stream_id, DedupWindow(self.dedup_window))
+                self._clocks.setdefault(stream_id, _StreamClock(self.sampling))
+                states = self._states.setdefault(
+                    stream_id, [{} for _ in self.detectors]
+                )
+        return states, self._seen[stream_id], self._clocks[stream_id]
 
     @classmethod
     def from_yaml(
         cls, path: Path | None = None, *, settings: Settings | None = None
     ) -> "DetectorPipeline":
-        """Instantiate detectors based on a YAML configuration."""
+        """Instantiate detectors based on a YAML configuration.
+
+        Only the detectors listed in the file are imported. Each is built with
+        its ``from_config`` from ``settings.detectors.<name>`` (plugin
+        sections not known to the settings loader come from
+        ``settings.detectors.extra``).
+        """
         if path is None:
             path = Path(__file__).resolve().parent.parent / "config" / "detectors.yaml"
         if path.exists():
@@ -48,50 +214,156 @@ class DetectorPipeline:
             order = list(NAME_MAP.keys())
 
         settings = settings or load_settings()
-        det_cfg = settings.detectors
 
         detectors: List[Detector] = []
-        for name in order:
+        sampling: List[Sampling] = []
+        for entry in order:
+            # entries are a bare name or a mapping with sampling options
+            entry = entry if isinstance(entry, dict) else {"name": entry}
+            name = entry.get("name")
             factory = NAME_MAP.get(name)
             if factory is None:
                 continue
-            if name == "freeze":
-                cfg_obj = det_cfg.freeze
-                detectors.append(
-                    factory(mad_thresh=cfg_obj.mad, min_frames=cfg_obj.frames)
-                )
-            elif name == "blank":
-                cfg_obj = det_cfg.blank
-                detectors.append(
-                    factory(
-                        luma_thresh=cfg_obj.luma_thresh,
-                        sat_thresh=cfg_obj.sat_thresh,
-                        pct=cfg_obj.pct,
-                        min_frames=cfg_obj.frames,
-                    )
+            sampling.append(Sampling.from_entry(entry, settings.fps))
+            cfg_obj = getattr(settings.detectors, name, None)
+            if cfg_obj is None and factory.config_class is not None:
+                section = settings.detectors.extra.get(name, {})
+                cfg_obj = factory.config_class(**section)
+            det = factory.from_config(cfg_obj, settings)
+            rois = getattr(cfg_obj, "regions", None)
+            if rois and not factory.region_aware:
+                det = RegionDetector(
+                    det,
+                    region_rects(settings.regions, rois),
+                    stream_region_rects(
+                        settings.regions, rois, settings.capture.streams
+                    ),
                 )
-            elif name == "flicker":
-                cfg_obj = det_cfg.flicker
-                detectors.append(
-                    factory(window=cfg_obj.window, ratio_thresh=cfg_obj.ratio_thresh)
-                )
-            else:
-                detectors.append(factory())
-        return cls(detectors)
+            detectors.append(det)
+        return cls(detectors, sampling=sampling)
 
     def process(self, pkt: FramePacket) -> List[AnomalyEvent]:
-        """Run all detectors over a frame packet and return new events."""
+        """Run all detectors over a frame packet and return new events.
+
+        When an event is raised and ``pkt`` has no checksum yet, it is set to
+        the difference hash of the full frame so the stored frame can be
+        matched later.
+        """
         events: List[AnomalyEvent] = []
-        for det, state in zip(self.detectors, self._states):
-            evt = det.process(pkt, state)
+        ctx = self.cache.load(pkt)
+        if ctx is None:
+            return events
+        states, seen, clock = self._stream(pkt.stream_id)
+        seen.advance(pkt.frame_id)
+        clock.tick += 1
+        for i, (det, state) in enumerate(zip(self.detectors, states)):
+            if not clock.due(i):
+                continue
+            state["elapsed_frames"] = clock.mark(i)
+            evt = det.process(pkt, state, ctx)
             if evt is None:
                 continue
-            key = (evt.type.value, evt.frame.frame_id)
-            if key in self._seen:
+            if not seen.add((evt.type.value, evt.frame.frame_id)):
                 continue
-            self._seen.add(key)
             events.append(evt)
+        if events and pkt.checksum is None:
+            pkt.checksum = f"{ctx.dhash:016x}"
+        if any(det.suspicious(s) for det, s in zip(self.detectors, states)):
+            clock.boost()
+        return events
+
+    def process_clip(
+        self, pkts: Sequence[FramePacket], frames: Optional[np.ndarray] = None
+    ) -> List[AnomalyEvent]:
+        """Run all detectors over a whole clip of one stream at once.
+
+        ``frames`` is the ``(T, H, W, 3)`` BGR stack for ``pkts``; when omitted
+        the packets are decoded. Detectors whose schedule is fixed get the
+        frames they are due on through :meth:`Detector.process_batch`: the
+        whole clip when they run on every frame, every Nth frame (with
+        ``elapsed_frames`` set to N) when sampled sparsely. Detectors whose
+        schedule depends on suspicion, because they can be boosted or can
+        boost others, are replayed frame by frame. Events are then
+        deduplicated in frame order, so the result matches calling
+        :meth:`process` on every packet. Clips with mixed frame sizes fall
+        back to that loop.
+        """
+        if not pkts:
+            return []
+        if len({pkt.stream_id for pkt in pkts}) > 1:
+            raise ValueError("process_clip expects frames of a single stream")
+        if frames is None:
+            ctxs = [FrameContext.from_packet(pkt) for pkt in pkts]
+            pkts = [pkt for pkt, ctx in zip(pkts, ctxs) if ctx is not None]
+            images = [ctx.bgr for ctx in ctxs if ctx is not None]
+            if len({img.shape for img in images}) != 1:
+                return [evt for pkt in pkts for evt in self.process(pkt)]
+            frames = np.stack(images)
+        elif len(frames) != len(pkts):
+            raise ValueError("frames and pkts must have the same length")
+
+        states, seen, clock = self._stream(pkts[0].stream_id)
+        boosting = any(s.boost for s in self.sampling) and any(
+            _may_boost(det) for det in self.detectors
+        )
+        batched = [
+            i
+            for i, (det, spec) in enumerate(zip(self.detectors, self.sampling))
+            if not (boosting and ((spec.boost and spec.every > 1) or _may_boost(det)))
+        ]
+        replayed = [i for i in range(len(self.detectors)) if i not in batched]
+
+        # (detector index, event) per frame, so events keep process() order
+        by_frame: List[List[Tuple[int, AnomalyEvent]]] = [[] for _ in pkts]
+        # frames each batched detector is due on, grouped by elapsed frames
+        runs: Dict[int, List[Tuple[int, List[int]]]] = {i: [] for i in batched}
+        for t, (pkt, frame) in enumerate(zip(pkts, frames)):
+            clock.tick += 1
+            for i in batched:
+                if clock.due(i):
+                    elapsed = clock.mark(i)
+                    if not runs[i] or runs[i][-1][0] != elapsed:
+                        runs[i].append((elapsed, []))
+                    runs[i][-1][1].append(t)
+            if not replayed:
+                continue
+            ctx = FrameContext(pkt.frame_id, frame, pkt.stream_id)
+            self.cache.put(ctx)
+            for i in replayed:
+                if not clock.due(i):
+                    continue
+                states[i]["elapsed_frames"] = clock.mark(i)
+                evt = self.detectors[i].process(pkt, states[i], ctx)
+                if evt is not None:
+                    by_frame[t].append((i, evt))
+            if boosting and any(
+                self.detectors[i].suspicious(states[i]) for i in replayed
+            ):
+                clock.boost()
+
+        slot = {id(pkt): t for t, pkt in enumerate(pkts)}
+        for i in batched:
+            for elapsed, due in runs[i]:
+                # after its first frame, a group is due every ``elapsed`` frames
+                stride = slice(due[0], due[-1] + 1, elapsed)
+                states[i]["elapsed_frames"] = elapsed
+                for evt in self.detectors[i].process_batch(
+                    frames[stride], pkts[stride], states[i]
+                ):
+                    by_frame[slot[id(evt.frame)]].append((i, evt))
+
+        events: List[AnomalyEvent] = []
+        for pkt, frame, frame_events in zip(pkts, frames, by_frame):
+            seen.advance(pkt.frame_id)
+            fresh = [
+                evt
+                for _, evt in sorted(frame_events, key=lambda item: item[0])
+                if seen.add((evt.type.value, evt.frame.frame_id))
+            ]
+            if fresh and pkt.checksum is None:
+                pkt.checksum = f"{dhash(frame):016x}"
+            events += fresh
         return events
 
 
-__all__ = ["DetectorPipeline"]
+__all__ = ["DedupWindow", "DetectorPipeline", "Sampling"]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.schemas.models import AnomalyEvent, FramePacket
+
+from .base import Detector, DetectorState
+from .frame import FrameContext, Rect
+
+
+@dataclass
+class RegionDetector(Detector):
+    """Run ``detector`` on named regions of the frame instead of all of it.
+
+    Each region is a zero-copy view of the decoded frame (shared between
+    detectors through :meth:`FrameContext.region`) with its own detector
+    state, so runs and windows never mix across regions. When regions fire
+    on the same frame their events are merged into one: metrics are
+    prefixed with the region name (``"hud.mad"``) and ``metrics["regions"]``
+    lists the regions that fired.
+
+    ``regions`` are rectangles in ``full``-stream pixels; streams captured
+    from another origin use their entry in ``stream_regions`` instead.
+    """
+
+    detector: Detector
+    regions: Dict[str, Rect]
+    stream_regions: Dict[str, Dict[str, Rect]] = field(default_factory=dict)
+
+    def rects(self, stream_id: str) -> Dict[str, Rect]:
+        """Region rectangles in the frame coordinates of ``stream_id``."""
+        return self.stream_regions.get(stream_id, self.regions)
+
+    def _states(self, state: DetectorState) -> Dict[str, DetectorState]:
+        states = state.setdefault("regions", {})
+        for name in self.regions:
+            states.setdefault(name, {})
+        return states
+
+    def process(
+        self,
+        pkt: FramePacket,
+        state: DetectorState,
+        ctx: Optional[FrameContext] = None,
+    ) -> Optional[AnomalyEvent]:
+        ctx = ctx or FrameContext.from_packet(pkt)
+        if ctx is None:
+            return None
+        states = self._states(state)
+        fired: Dict[str, AnomalyEvent] = {}
+        for name, rect in self.rects(pkt.stream_id).items():
+            states[name]["elapsed_frames"] = state.get("elapsed_frames", 1)
+            sub = ctx.region(rect)
+            if sub.bgr.size == 0:
+                continue
+            evt = self.detector.process(pkt, states[name], sub)
+            if evt is not None:
+                fired[name] = evt
+        return self._merge(state, fired)
+
+    def suspicious(self, state: DetectorState) -> bool:
+        states = state.get("regions", {})
+        return any(self.detector.suspicious(s) for s in states.values())
+
+    def process_batch(
+        self,
+        frames: np.ndarray,
+        pkts: Sequence[FramePacket],
+        state: DetectorState,
+    ) -> List[AnomalyEvent]:
+        states = self._states(state)
+        slot = {id(pkt): i for i, pkt in enumerate(pkts)}
+        by_frame: List[Dict[str, AnomalyEvent]] = [{} for _ in pkts]
+        for name, (x, y, w, h) in self.rects(pkts[0].stream_id).items():
+            clip = frames[:, max(0, y) : max(0, y + h), max(0, x) : max(0, x + w)]
+            if clip.size == 0:
+                continue
+            states[name]["elapsed_frames"] = state.get("elapsed_frames", 1)
+            for evt in self.detector.process_batch(clip, pkts, states[name]):
+                by_frame[slot[id(evt.frame)]][name] = evt
+
+        events: List[AnomalyEvent] = []
+        for fired in by_frame:
+            evt = self._merge(state, fired)
+            if evt is not None:
+                events.append(evt)
+        return events
+
+    def _merge(
+        self, state: DetectorState, fired: Dict[str, AnomalyEvent]
+    ) -> Optional[AnomalyEvent]:
+        if not fired:
+            return None
+        metrics: Dict[str, object] = {"regions": list(fired)}
+        for name, evt in fired.items():
+            for key, value in evt.metrics.items():
+                metrics[f"{name}.{key}"] = value
+        top = max(fired.values(), key=lambda evt: evt.confidence)
+
+        event_id = state.get("next_event_id", 1)
+        state["next_event_id"] = event_id + 1
+        return top.model_copy(update={"event_id": event_id, "metrics": metrics})
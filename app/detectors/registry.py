@@ -0,0 +1,100 @@
+"""Lazy registry mapping detector names to detector classes."""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from importlib.metadata import entry_points
+from typing import Dict, Iterator, List, Mapping, Type, Union
+
+from .base import Detector
+
+# entry-point group third-party packages use to ship detectors, e.g.
+#   [project.entry-points."fc25_bugbot.detectors"]
+#   minimap = "my_pkg.minimap:MinimapDetector"
+ENTRY_POINT_GROUP = "fc25_bugbot.detectors"
+
+BUILTINS: Dict[str, str] = {
+    "blank": "app.detectors.blank:BlankDetector",
+    "freeze": "app.detectors.freeze:FreezeDetector",
+    "flicker": "app.detectors.flicker:FlickerDetector",
+    "hud_glitch": "app.detectors.hud:HudGlitchDetector",
+}
+
+Target = Union[str, Type[Detector]]
+
+
+class DetectorRegistry(Mapping[str, Type[Detector]]):
+    """Name -> detector class mapping that imports a module only on lookup.
+
+    Targets are ``"module:Class"`` strings (or classes). Built-ins are known
+    up front; packages installed with an ``fc25_bugbot.detectors`` entry
+    point are discovered the first time a name is missing or the registry is
+    iterated. Importing this module therefore pulls in no detector code, and
+    a pipeline only pays for the detectors ``detectors.yaml`` enables.
+    """
+
+    def __init__(
+        self,
+        builtins: Mapping[str, Target] = BUILTINS,
+        group: str = ENTRY_POINT_GROUP,
+    ) -> None:
+        self._targets: Dict[str, Target] = dict(builtins)
+        self._classes: Dict[str, Type[Detector]] = {}
+        self._group = group
+        self._discovered = False
+        self._lock = threading.Lock()
+
+    def register(self, name: str, target: Target) -> None:
+        """Add or replace the detector registered under ``name``."""
+        with self._lock:
+            self._targets[name] = target
+            self._classes.pop(name, None)
+
+    def _discover(self) -> None:
+        if self._discovered:
+            return
+        with self._lock:
+            if not self._discovered:
+                for ep in entry_points(group=self._group):
+                    self._targets.setdefault(ep.name, ep.value)
+                self._discovered = True
+
+    def __getitem__(self, name: str) -> Type[Detector]:
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        if name not in self._targets:
+            self._discover()
+        target = self._targets[name]
+        if isinstance(target, str):
+            module, _, attr = target.partition(":")
+            cls = getattr(importlib.import_module(module), attr)
+        else:
+            cls = target
+        if not (isinstance(cls, type) and issubclass(cls, Detector)):
+            raise TypeError(f"{target!r} is not a Detector subclass")
+        self._classes[name] = cls
+        return cls
+
+    def __contains__(self, name: object) -> bool:
+        if name not in self._targets:
+            self._discover()
+        return name in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        self._discover()
+        return iter(list(self._targets))
+
+    def __len__(self) -> int:
+        self._discover()
+        return len(self._targets)
+
+    def loaded(self) -> List[str]:
+        """Names whose detector class has been imported so far."""
+        return list(self._classes)
+
+
+registry = DetectorRegistry()
+
+__all__ = ["BUILTINS", "ENTRY_POINT_GROUP", "DetectorRegistry", "registry"]
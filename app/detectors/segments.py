@@ -0,0 +1,118 @@
+"""Merge runs of detections into one event per anomaly interval."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.schemas.models import AnomalyEvent, FramePacket
+
+
+@dataclass
+class Segment:
+    """Open interval of detections of one type on one stream."""
+
+    first: AnomalyEvent
+    last: AnomalyEvent
+    peak: AnomalyEvent
+    detections: int = 1
+
+    def extend(self, evt: AnomalyEvent) -> None:
+        self.last = evt
+        self.detections += 1
+        if evt.confidence > self.peak.confidence:
+            self.peak = evt
+
+    @property
+    def start(self) -> datetime:
+        return self.first.frame.timestamp
+
+    @property
+    def end(self) -> datetime:
+        return self.last.frame.timestamp
+
+
+class EventSegmenter:
+    """Turn per-frame detections into one event per anomaly interval.
+
+    Detectors re-arm after each event, so a long black screen yields an
+    event every ``min_frames``. Detections of the same type on the same
+    stream are merged while they are at most ``gap`` seconds apart; the
+    interval closes once a frame arrives more than ``gap`` seconds after its
+    last detection, or when it has lasted ``max_length`` seconds. The closed
+    interval is reported once, on its first frame, with the metrics of its
+    most confident detection plus ``segment_*`` bounds, so storage and
+    artifacts are produced per incident rather than per detection.
+
+    ``on_open`` is called with the first detection of each new interval,
+    for work that cannot wait until the interval is reported (such as
+    cutting a clip around that frame while it is still buffered).
+
+    Not thread-safe; feed it from a single consumer.
+    """
+
+    def __init__(
+        self,
+        gap: float = 2.0,
+        max_length: float = 60.0,
+        on_open: Optional[Callable[[AnomalyEvent], None]] = None,
+    ) -> None:
+        self.gap = gap
+        self.max_length = max_length
+        self.on_open = on_open
+        self._open: Dict[Tuple[str, str], Segment] = {}
+
+    @property
+    def open_segments(self) -> int:
+        return len(self._open)
+
+    def feed(self, pkt: FramePacket, events: List[AnomalyEvent]) -> List[AnomalyEvent]:
+        """Add the detections raised on ``pkt``; return intervals that closed."""
+        closed: List[AnomalyEvent] = []
+        for key, seg in list(self._open.items()):
+            if key[0] != pkt.stream_id:
+                continue
+            idle = (pkt.timestamp - seg.end).total_seconds()
+            if idle > self.gap:
+                closed.append(self._close(key))
+
+        for evt in events:
+            key = (evt.frame.stream_id, evt.type.value)
+            seg = self._open.get(key)
+            if seg is None:
+                self._open[key] = Segment(first=evt, last=evt, peak=evt)
+                if self.on_open is not None:
+                    self.on_open(evt)
+                continue
+            seg.extend(evt)
+            if (seg.end - seg.start).total_seconds() >= self.max_length:
+                closed.append(self._close(key))
+        return closed
+
+    def flush(self) -> List[AnomalyEvent]:
+        """Close every open interval (e.g. on shutdown)."""
+        return [self._close(key) for key in list(self._open)]
+
+    def _close(self, key: Tuple[str, str]) -> AnomalyEvent:
+        seg = self._open.pop(key)
+        metrics = dict(seg.peak.metrics)
+        metrics.update(
+            segment_start_frame=seg.first.frame.frame_id,
+            segment_end_frame=seg.last.frame.frame_id,
+            segment_peak_frame=seg.peak.frame.frame_id,
+            segment_start=seg.start.isoformat(),
+            segment_end=seg.end.isoformat(),
+            segment_duration_s=(seg.end - seg.start).total_seconds(),
+            segment_detections=seg.detections,
+        )
+        return seg.first.model_copy(
+            update={
+                "confidence": seg.peak.confidence,
+                "severity": seg.peak.severity,
+                "metrics": metrics,
+            }
+        )
+
+
+__all__ = ["EventSegmenter", "Segment"]
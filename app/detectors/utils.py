@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import cv2
 import numpy as np
-from skimage.metrics import structural_similarity
 
 
 def mad(a: np.ndarray, b: np.ndarray) -> float:
@@ -11,12 +10,65 @@ def mad(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.mean(diff))
 
 
+def mad_bounded(
+    a: np.ndarray, b: np.ndarray, limit: float, chunk: int = 1 << 16
+) -> float:
+    """Mean absolute difference that stops early once it must exceed ``limit``.
+
+    Rows are compared in blocks of about ``chunk`` elements. As soon as the
+    running sum guarantees a mean above ``limit`` the partial mean is
+    returned; it is a lower bound on the true MAD and is still ``> limit``.
+    Identical or near-identical images are scanned fully and give the exact
+    result of :func:`mad`.
+    """
+    total = a.size
+    if total == 0:
+        return 0.0
+    budget = limit * total
+    row_elems = max(1, total // max(1, a.shape[0]))
+    step = max(1, chunk // row_elems)
+    acc = 0.0
+    for start in range(0, a.shape[0], step):
+        block = cv2.absdiff(a[start : start + step], b[start : start + step])
+        acc += float(np.sum(block, dtype=np.uint64))
+        if acc > budget:
+            return acc / total
+    return acc / total
+
+
+def dhash(img: np.ndarray) -> int:
+    """Return the 64-bit difference hash of ``img`` (BGR or grayscale).
+
+    The image is area-downsampled to 9x8 and each bit records whether a
+    pixel is brighter than its right-hand neighbour, so the hash survives
+    noise, scaling and small brightness shifts.
+    """
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).reshape(-1)
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
 def ssim(a: np.ndarray, b: np.ndarray) -> float:
     """Return the structural similarity index between two images."""
     a_gray = cv2.cvtColor(a, cv2.COLOR_BGR2GRAY) if a.ndim == 3 else a
     b_gray = cv2.cvtColor(b, cv2.COLOR_BGR2GRAY) if b.ndim == 3 else b
-    score, _ = structural_similarity(a_gray, b_gray, full=True)
-    return float(score)
+    # the default 7x7 window does not fit heavily downscaled frames
+    win = min(7, *a_gray.shape)
+    if win % 2 == 0:
+        win -= 1
+    if win < 3:
+        return 1.0 if np.array_equal(a_gray, b_gray) else 0.0
+    # scikit-image is heavy to import and only needed once SSIM is enabled
+    from skimage.metrics import structural_similarity
+
+    return float(structural_similarity(a_gray, b_gray, win_size=win, data_range=255))
 
 
-__all__ = ["mad", "ssim"]
+__all__ = ["dhash", "hamming", "mad", "mad_bounded", "ssim"]
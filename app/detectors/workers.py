@@ -0,0 +1,123 @@
+"""Worker pool running detector pipelines off the asyncio event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import zlib
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from app.schemas.models import AnomalyEvent, FramePacket
+
+from .pipeline import DetectorPipeline
+
+PipelineFactory = Callable[[], DetectorPipeline]
+
+EXECUTORS = ("thread", "process")
+
+# pipeline owned by a process-pool worker (set by ``_init_worker``)
+_WORKER_PIPELINE: Optional[DetectorPipeline] = None
+
+
+def _init_worker(factory: PipelineFactory) -> None:
+    global _WORKER_PIPELINE
+    _WORKER_PIPELINE = factory()
+
+
+def _process_in_worker(pkt: FramePacket) -> List[AnomalyEvent]:
+    assert _WORKER_PIPELINE is not None
+    events = _WORKER_PIPELINE.process(pkt)
+    # the caller still holds the frame; don't ship pixels back across processes
+    for evt in events:
+        evt.frame.image = None
+    return events
+
+
+class DetectionPool:
+    """Run :class:`DetectorPipeline` instances on a pool of workers.
+
+    Detector state depends on frame order, so the pool is made of
+    ``workers`` single-worker shards. Every frame of a stream goes to the
+    same shard, which processes it strictly in submission order; different
+    streams spread over the shards and run in parallel. OpenCV and numpy
+    release the GIL, so the ``thread`` executor already scales across cores
+    and all its shards share one pipeline (state is kept per stream);
+    ``process`` isolates each shard, with its own pipeline, in a separate
+    interpreter.
+    """
+
+    def __init__(
+        self,
+        factory: PipelineFactory,
+        *,
+        workers: int = 2,
+        kind: str = "thread",
+    ) -> None:
+        if kind not in EXECUTORS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self._factory = factory
+        n = max(1, workers)
+        self._shards: List[Executor]
+        if kind == "process":
+            self._shards = [
+                ProcessPoolExecutor(
+                    max_workers=1, initializer=_init_worker, initargs=(factory,)
+                )
+                for _ in range(n)
+            ]
+        else:
+            self._shards = [ThreadPoolExecutor(max_workers=1) for _ in range(n)]
+        self._pipeline: Optional[DetectorPipeline] = None
+        self._lock = threading.Lock()
+
+    def _shard_for(self, stream: str) -> int:
+        return zlib.crc32(stream.encode("utf-8")) % len(self._shards)
+
+    def _process_in_thread(self, pkt: FramePacket) -> List[AnomalyEvent]:
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    self._pipeline = self._factory()
+        return self._pipeline.process(pkt)
+
+    def submit(
+        self, pkt: FramePacket, stream: Optional[str] = None
+    ) -> "Future[List[AnomalyEvent]]":
+        """Queue ``pkt`` on the shard owning ``stream`` (``pkt.stream_id``)."""
+        shard = self._shard_for(stream or pkt.stream_id)
+        if self.kind == "process":
+            return self._shards[shard].submit(_process_in_worker, pkt)
+        return self._shards[shard].submit(self._process_in_thread, pkt)
+
+    async def process(
+        self, pkt: FramePacket, stream: Optional[str] = None
+    ) -> List[AnomalyEvent]:
+        """Awaitable wrapper around :meth:`submit`."""
+        return await self.wrap(pkt, self.submit(pkt, stream))
+
+    @staticmethod
+    async def wrap(
+        pkt: FramePacket, fut: "Future[List[AnomalyEvent]]"
+    ) -> List[AnomalyEvent]:
+        """Await ``fut`` and re-attach ``pkt`` to events raised on it."""
+        events = await asyncio.wrap_future(fut)
+        for evt in events:
+            if evt.frame.frame_id == pkt.frame_id and evt.frame.image is None:
+                # keep the checksum a process worker computed on its copy
+                if pkt.checksum is None:
+                    pkt.checksum = evt.frame.checksum
+                evt.frame = pkt
+        return events
+
+    def dedup_size(self) -> int:
+        """Dedup keys held by the shared pipeline (thread executor only)."""
+        return self._pipeline.dedup_size if self._pipeline is not None else 0
+
+    def shutdown(self, wait: bool = True) -> None:
+        for ex in self._shards:
+            ex.shutdown(wait=wait)
+
+
+__all__ = ["EXECUTORS", "DetectionPool"]
@@ -3,57 +3,561 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
+import itertools
+import json
+import logging
+import threading
 from asyncio import Queue
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
+from app.capture import capture
+from app.capture.buffer import BufferedFrame, CaptureBuffer, RawFrame
+from app.capture.scheduler import FrameScheduler, TimingStats
+from app.config.load import ClipSettings, RuntimeSettings, Settings, load_settings
 from app.detectors.pipeline import DetectorPipeline
+from app.detectors.segments import EventSegmenter
+from app.detectors.workers import DetectionPool
 from app.schemas.models import AnomalyEvent, FramePacket
-from app.storage import artifacts, repo
-from app.storage.db import session_scope
+from app.storage import artifacts
+from app.storage.batch import (
+    CommitStats,
+    next_event_id,
+    next_frame_id,
+    persist_events,
+)
+from app.storage.clips import ClipEncoder
 
+logger = logging.getLogger(__name__)
 
-async def capture_loop(frame_q: Queue[FramePacket]) -> None:
-    """Placeholder for frame capture logic.
+STATS_PATH = Path("data") / "runtime_stats.json"
 
-    This mock loop currently does nothing but is structured to put
-    :class:`FramePacket` objects onto ``frame_q`` in a real implementation.
+
+@dataclass
+class RuntimeStats:
+    """Live counters for the in-process capture → detect → persist chain."""
+
+    queues: Dict[str, "Queue[Any]"] = field(default_factory=dict)
+    dropped: Dict[str, int] = field(default_factory=dict)
+    capture: Dict[str, TimingStats] = field(default_factory=dict)
+    commits: CommitStats = field(default_factory=CommitStats)
+    # named callables sampled on every snapshot (e.g. structure sizes)
+    gauges: Dict[str, Callable[[], float]] = field(default_factory=dict)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "queue_depth": {name: q.qsize() for name, q in self.queues.items()},
+            "queue_maxsize": {name: q.maxsize for name, q in self.queues.items()},
+            "dropped": dict(self.dropped),
+            "capture": {name: t.snapshot() for name, t in self.capture.items()},
+            "commits": self.commits.snapshot(),
+            "gauges": {name: fn() for name, fn in self.gauges.items()},
+        }
+
+
+def offer_nowait(
+    q: "Queue[Any]", item: Any, policy: str, stats: RuntimeStats, name: str
+) -> bool:
+    """Put ``item`` without waiting, applying a drop policy when ``q`` is full.
+
+    Returns ``False`` when ``item`` itself was dropped.
+    """
+    if not q.full():
+        q.put_nowait(item)
+        return True
+    stats.dropped[name] = stats.dropped.get(name, 0) + 1
+    if policy == "drop_newest":
+        return False
+    q.get_nowait()  # drop_oldest
+    q.put_nowait(item)
+    return True
+
+
+async def put_with_policy(
+    q: "Queue[Any]", item: Any, policy: str, stats: RuntimeStats, name: str
+) -> bool:
+    """Put ``item`` on ``q`` honouring the configured backpressure policy."""
+    if policy == "block":
+        await q.put(item)
+        return True
+    return offer_nowait(q, item, policy, stats, name)
+
+
+def offer_threadsafe(
+    loop: asyncio.AbstractEventLoop,
+    q: "Queue[Any]",
+    item: Any,
+    policy: str,
+    stats: RuntimeStats,
+    name: str,
+    stop: threading.Event,
+) -> None:
+    """Hand ``item`` from a worker thread to ``q`` on ``loop``.
+
+    With the ``block`` policy the calling thread waits for space (until
+    ``stop`` is set), which pushes backpressure into the capture scheduler.
+    """
+    if policy != "block":
+        loop.call_soon_threadsafe(offer_nowait, q, item, policy, stats, name)
+        return
+    fut = asyncio.run_coroutine_threadsafe(q.put(item), loop)
+    while not stop.is_set():
+        try:
+            fut.result(timeout=0.5)
+            return
+        except concurrent.futures.TimeoutError:
+            continue
+    fut.cancel()
+
+
+async def capture_loop(
+    frame_q: Queue[FramePacket],
+    *,
+    settings: Settings | None = None,
+    stats: RuntimeStats | None = None,
+    buffers: Dict[str, CaptureBuffer] | None = None,
+    frame_ids: Iterator[int] | None = None,
+) -> None:
+    """Run one grabber thread per ``capture.streams`` entry feeding ``frame_q``.
+
+    The grabbers get a private thread pool, so any number of streams leaves
+    the loop's default executor free for :func:`asyncio.to_thread` work.
+
+    Frame ids come from a shared counter (``frame_ids``, by default counting
+    from 1) so they stay unique across streams.
+    Written frames of each stream go to its entry in ``buffers`` (see
+    :func:`make_buffers`), where :func:`event_loop` cuts clips from.
     """
 
-    while True:  # pragma: no cover - loop body is placeholder
-        await asyncio.sleep(1)
+    settings = settings or load_settings()
+    stats = stats or RuntimeStats()
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    policy = settings.runtime.queue_policy
+    frame_ids = frame_ids or itertools.count(1)
+
+    def sink(pkt: FramePacket) -> None:
+        offer_threadsafe(loop, frame_q, pkt, policy, stats, "frame", stop)
+
+    streams = settings.capture.streams
+    # grabbers run for the whole session; keep them off the default executor
+    # that to_thread calls (commits, id lookups) depend on
+    pool = ThreadPoolExecutor(max_workers=max(1, len(streams)))
+
+    def run(stream: str) -> Awaitable[None]:
+        scheduler = FrameScheduler(settings.fps)
+        stats.capture[stream] = scheduler.stats
+        return loop.run_in_executor(
+            pool,
+            partial(
+                capture.capture_loop,
+                sink,
+                settings=settings,
+                scheduler=scheduler,
+                stop=stop,
+                stream=stream,
+                frame_ids=frame_ids,
+                buffer=(buffers or {}).get(stream),
+            ),
+        )
+
+    try:
+        await asyncio.gather(*(run(s) for s in streams))
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
+
+
+def make_buffers(settings: Settings) -> Dict[str, CaptureBuffer]:
+    """One rolling buffer of ``buffer_seconds`` per capture stream."""
+    return {
+        stream: capture.make_buffer(settings, stream)
+        for stream in settings.capture.streams
+    }
+
+
+def make_detection_pool(settings: Settings) -> DetectionPool:
+    """Build the detector worker pool described by ``settings.runtime``."""
+    rt = settings.runtime
+    return DetectionPool(
+        partial(DetectorPipeline.from_yaml, settings=settings),
+        workers=rt.detect_workers,
+        kind=rt.detect_executor,
+    )
 
 
 async def detect_loop(
-    frame_q: Queue[FramePacket], event_q: Queue[AnomalyEvent]
+    frame_q: Queue[FramePacket],
+    event_q: Queue[AnomalyEvent],
+    *,
+    settings: Settings | None = None,
+    stats: RuntimeStats | None = None,
+    pool: DetectionPool | None = None,
+    on_open: Callable[[AnomalyEvent], None] | None = None,
 ) -> None:
-    """Consume frames, run detectors and emit events."""
+    """Consume frames, run detectors on a worker pool and emit events.
 
-    pipeline = DetectorPipeline.from_yaml()
-    while True:
-        pkt = await frame_q.get()
-        events = pipeline.process(pkt)
-        for evt in events:
-            await event_q.put(evt)
+    Up to ``runtime.detect_inflight`` frames are in flight at once; results
+    are delivered in submission order so events keep their frame order.
+    With ``runtime.segment_gap`` set, detections are merged by
+    :class:`EventSegmenter` and one event is emitted per closed interval;
+    ``on_open`` is its hook for intervals that just opened (see
+    :class:`SegmentClips`).
+    """
 
+    settings = settings or load_settings()
+    stats = stats or RuntimeStats()
+    policy = settings.runtime.queue_policy
+    own_pool = pool is None
+    pool = pool or make_detection_pool(settings)
+    pending: "Queue[Tuple[FramePacket, Awaitable[List[AnomalyEvent]]]]" = asyncio.Queue(
+        maxsize=max(1, settings.runtime.detect_inflight)
+    )
+    segmenter: Optional[EventSegmenter] = None
+    if settings.runtime.segment_gap > 0:
+        segmenter = EventSegmenter(
+            gap=settings.runtime.segment_gap,
+            max_length=settings.runtime.segment_max,
+            on_open=on_open,
+        )
+        stats.gauges.setdefault(
+            "open_segments", partial(getattr, segmenter, "open_segments")
+        )
+    stats.queues.setdefault("detect", pending)
+    stats.gauges.setdefault("dedup_size", pool.dedup_size)
 
-async def event_loop(event_q: Queue[AnomalyEvent]) -> None:
-    """Persist events and associated artifacts."""
+    async def submit() -> None:
+        while True:
+            pkt = await frame_q.get()
+            fut = asyncio.ensure_future(
+                DetectionPool.wrap(pkt, pool.submit(pkt, pkt.stream_id))
+            )
+            await pending.put((pkt, fut))
 
-    with session_scope() as session:
+    async def deliver() -> None:
         while True:
-            evt = await event_q.get()
-            repo.save_event(session, evt)
-            artifacts.save_event_artifacts(evt)
+            pkt, fut = await pending.get()
+            events = await fut
+            if segmenter is not None:
+                events = segmenter.feed(pkt, events)
+            for evt in events:
+                await put_with_policy(event_q, evt, policy, stats, "event")
+
+    try:
+        await asyncio.gather(submit(), deliver())
+    finally:
+        if segmenter is not None:
+            # report incidents still open at shutdown
+            for evt in segmenter.flush():
+                await put_with_policy(event_q, evt, policy, stats, "event")
+        if own_pool:
+            pool.shutdown(wait=False)
+
+
+async def next_batch(q: "Queue[Any]", max_size: int, max_wait: float) -> List[Any]:
+    """Wait for one item, then collect more until ``max_size`` or ``max_wait``."""
+    loop = asyncio.get_running_loop()
+    batch = [await q.get()]
+    deadline = loop.time() + max_wait
+    while len(batch) < max_size:
+        if not q.empty():
+            batch.append(q.get_nowait())
+            continue
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(q.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+def _epoch(ts: datetime) -> float:
+    """Capture timestamps are naive UTC; buffers index them as epoch seconds."""
+    return ts.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _save_artifacts(
+    events: List[AnomalyEvent],
+    fps: int = 5,
+    clip: List[BufferedFrame] | None = None,
+    clips: ClipEncoder | None = None,
+) -> None:
+    for evt in events:
+        pre: List[BufferedFrame] = []
+        post: List[BufferedFrame] = []
+        if clip:
+            ts = _epoch(evt.frame.timestamp)
+            # the event's own frame is added by save_event_artifacts
+            fid = evt.frame.frame_id
+            rest = [ref for ref in clip if ref.frame_id is None or ref.frame_id != fid]
+            pre = [ref for ref in rest if ref.ts < ts]
+            post = [ref for ref in rest if ref.ts >= ts]
+        try:
+            artifacts.save_event_artifacts(evt, pre, post, fps=fps, clips=clips)
+        except Exception:
+            logger.exception("Failed to save artifacts for event %s", evt.event_id)
+
+
+# stream, anomaly type and first frame of a merged interval
+_SegmentKey = Tuple[str, str, int]
+
+
+def _segment_key(evt: AnomalyEvent) -> _SegmentKey:
+    return (evt.frame.stream_id, evt.type.value, evt.frame.frame_id)
+
+
+class SegmentClips:
+    """Clip windows cut when an incident opens and claimed when it closes.
+
+    With segmentation on, an event is reported once its interval closes, up
+    to ``runtime.segment_max`` seconds after the first frame its clip is
+    centred on, when the capture buffer has long dropped those frames.
+    :meth:`open` is the :class:`EventSegmenter` ``on_open`` hook and defers
+    the window of the interval's first detection right away; :meth:`claim`
+    hands it to the closed event. Raw ring frames are copied once the
+    window is cut, as their slots are reused before a long incident ends.
+    Windows whose event never arrives (dropped on a full queue or a failed
+    commit) are discarded beyond the newest ``limit``.
+    """
+
+    def __init__(
+        self,
+        buffers: Dict[str, CaptureBuffer],
+        clip: ClipSettings,
+        limit: int = 16,
+    ) -> None:
+        self.buffers = buffers
+        self.clip = clip
+        self.limit = max(1, limit)
+        self._windows: OrderedDict[_SegmentKey, Future[List[BufferedFrame]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def open(self, evt: AnomalyEvent) -> None:
+        """Start cutting the clip window of ``evt``, an interval's first detection."""
+        buffer = self.buffers.get(evt.frame.stream_id)
+        if buffer is None:
+            return
+        window: Future[List[BufferedFrame]] = Future()
+        with self._lock:
+            self._windows[_segment_key(evt)] = window
+            while len(self._windows) > self.limit:
+                self._windows.popitem(last=False)
+        ts = _epoch(evt.frame.timestamp)
+        buffer.defer(ts, self.clip.pre, self.clip.post, partial(self._pin, window))
+
+    def claim(self, evt: AnomalyEvent) -> Future[List[BufferedFrame]] | None:
+        """The window opened for ``evt``'s interval, if any."""
+        with self._lock:
+            return self._windows.pop(_segment_key(evt), None)
+
+    @staticmethod
+    def _pin(window: Future[List[BufferedFrame]], frames: List[BufferedFrame]) -> None:
+        pinned: List[BufferedFrame] = []
+        for frame in frames:
+            if isinstance(frame, RawFrame):
+                image = frame.load()
+                if image is None:  # slot already reused
+                    continue
+                frame = RawFrame(image, frame.ts, frame.frame_id)
+            pinned.append(frame)
+        window.set_result(pinned)
+
+
+def _defer_artifacts(
+    events: List[AnomalyEvent],
+    buffers: Dict[str, CaptureBuffer],
+    settings: Settings,
+    pool: ThreadPoolExecutor,
+    clips: ClipEncoder | None = None,
+    segments: SegmentClips | None = None,
+) -> None:
+    """Save each event's artifacts once its stream buffered the post frames.
+
+    Events of intervals opened through ``segments`` use the window cut when
+    the interval opened.
+    """
+
+    def finalize(evt: AnomalyEvent, frames: List[BufferedFrame]) -> None:
+        # runs on the capture writer thread; only hand the clip off
+        try:
+            pool.submit(_save_artifacts, [evt], settings.fps, frames, clips)
+        except RuntimeError:  # pool already shut down
+            logger.warning("Dropping clip of event %s at shutdown", evt.event_id)
+
+    def claimed(evt: AnomalyEvent, window: Future[List[BufferedFrame]]) -> None:
+        finalize(evt, window.result())
+
+    clip = settings.clip
+    for evt in events:
+        window = segments.claim(evt) if segments is not None else None
+        if window is not None:
+            window.add_done_callback(partial(claimed, evt))
+            continue
+        buffer = buffers.get(evt.frame.stream_id)
+        if buffer is None:
+            _save_artifacts([evt], settings.fps, clips=clips)
+            continue
+        ts = _epoch(evt.frame.timestamp)
+        buffer.defer(ts, clip.pre, clip.post, partial(finalize, evt))
+
+
+async def _commit_with_retry(
+    batch: List[AnomalyEvent], rt: RuntimeSettings, stats: RuntimeStats
+) -> bool:
+    """Commit ``batch``, retrying with exponential backoff; ``False`` if dropped."""
+    delay = rt.persist_backoff
+    for attempt in range(max(0, rt.persist_retries) + 1):
+        try:
+            await asyncio.to_thread(persist_events, batch, stats.commits)
+            return True
+        except Exception:
+            if attempt >= rt.persist_retries:
+                logger.exception(
+                    "Dropping %d events after %d failed commits",
+                    len(batch),
+                    attempt + 1,
+                )
+                return False
+            logger.warning(
+                "Commit of %d events failed, retrying in %.2fs",
+                len(batch),
+                delay,
+                exc_info=True,
+            )
+            await asyncio.sleep(delay)
+            delay *= 2
+    return False
+
+
+async def event_loop(
+    event_q: Queue[AnomalyEvent],
+    *,
+    settings: Settings | None = None,
+    stats: RuntimeStats | None = None,
+    buffers: Dict[str, CaptureBuffer] | None = None,
+    segments: SegmentClips | None = None,
+) -> None:
+    """Persist events in micro-batches and write their artifacts.
+
+    Each batch (``runtime.persist_batch`` events or ``runtime.persist_interval``
+    seconds, whichever comes first) is committed in its own transaction on a
+    worker thread, after each event gets the next free database id; a
+    failed commit is retried ``runtime.persist_retries`` times with
+    exponential backoff before the batch is dropped. Artifacts are written
+    afterwards on a separate thread so they never delay the next commit; at
+    most ``runtime.artifact_backlog`` batches may wait for artifact writing.
+    Clips are handed to a background :class:`ClipEncoder`. With
+    ``buffers``, an event's clip spans ``clip.pre`` to ``clip.post`` seconds
+    around its frame and is queued once its stream's buffer holds the
+    post-event frames; events of intervals opened through ``segments`` get
+    the window cut when their interval opened.
+    """
+
+    settings = settings or load_settings()
+    stats = stats or RuntimeStats()
+    rt = settings.runtime
+    loop = asyncio.get_running_loop()
+    # one thread: artifact writers share metrics.json
+    artifact_pool = ThreadPoolExecutor(max_workers=1)
+    backlog = asyncio.Semaphore(max(1, rt.artifact_backlog))
+    clips = ClipEncoder(
+        maxsize=settings.clip.queue, cache_frames=settings.clip.cache_frames
+    )
+    stats.gauges["clip_queue"] = lambda: clips.stats().queue_depth
+    # detectors number events per stream; ids must be unique in the database
+    # and the artifact tree, so they are reassigned here
+    event_ids = itertools.count(await asyncio.to_thread(next_event_id))
+
+    try:
+        while True:
+            batch = await next_batch(
+                event_q, max(1, rt.persist_batch), rt.persist_interval
+            )
+            for evt in batch:
+                evt.event_id = next(event_ids)
+            if not await _commit_with_retry(batch, rt, stats):
+                continue
+
+            await backlog.acquire()
+            if buffers:
+                fut = loop.run_in_executor(
+                    artifact_pool,
+                    _defer_artifacts,
+                    batch,
+                    buffers,
+                    settings,
+                    artifact_pool,
+                    clips,
+                    segments,
+                )
+            else:
+                fut = loop.run_in_executor(
+                    artifact_pool, _save_artifacts, batch, settings.fps, None, clips
+                )
+            fut.add_done_callback(lambda _: backlog.release())
+    finally:
+        # write clips still waiting for post-event frames with what we have
+        for buffer in (buffers or {}).values():
+            buffer.flush()
+        artifact_pool.shutdown(wait=True)
+        clips.close()
+
+
+async def stats_loop(
+    stats: RuntimeStats, path: Path = STATS_PATH, interval: float = 5.0
+) -> None:
+    """Periodically write a JSON snapshot of ``stats`` for external readers."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        await asyncio.sleep(interval)
+        path.write_text(json.dumps(stats.snapshot()))
 
 
 async def main() -> None:
     """Run capture, detection and storage concurrently."""
 
-    frame_q: Queue[FramePacket] = asyncio.Queue()
-    event_q: Queue[AnomalyEvent] = asyncio.Queue()
+    settings = load_settings()
+    stats = RuntimeStats()
+    frame_q: Queue[FramePacket] = asyncio.Queue(maxsize=settings.runtime.frame_queue)
+    event_q: Queue[AnomalyEvent] = asyncio.Queue(maxsize=settings.runtime.event_queue)
+    stats.queues = {"frame": frame_q, "event": event_q}
+    buffers = make_buffers(settings)
+    stats.gauges["pending_clips"] = lambda: sum(b.pending for b in buffers.values())
+    # clips of merged incidents are cut when they open, not when reported
+    segments = SegmentClips(buffers, settings.clip)
+    # frames are upserted by id; continue after the stored ones so a restart
+    # doesn't overwrite the frames older events point to
+    frame_ids = itertools.count(await asyncio.to_thread(next_frame_id))
     await asyncio.gather(
-        capture_loop(frame_q),
-        detect_loop(frame_q, event_q),
-        event_loop(event_q),
+        capture_loop(
+            frame_q,
+            settings=settings,
+            stats=stats,
+            buffers=buffers,
+            frame_ids=frame_ids,
+        ),
+        detect_loop(
+            frame_q, event_q, settings=settings, stats=stats, on_open=segments.open
+        ),
+        event_loop(
+            event_q,
+            settings=settings,
+            stats=stats,
+            buffers=buffers,
+            segments=segments,
+        ),
+        stats_loop(stats),
     )
 
 
@@ -15,12 +15,21 @@ from .types import AnomalyType, Severity
 
 
 class FramePacket(BaseModel):
-    """Metadata about a captured frame saved on disk."""
+    """Metadata about a captured frame saved on disk.
+
+    In-memory capture additionally attaches the decoded BGR ``image`` so
+    detectors can skip the disk round trip; ``path`` then names where the
+    frame is persisted if it is sampled for storage. ``image`` is never
+    serialised. ``stream_id`` names the capture source (region, console)
+    the frame came from so several streams can share one pipeline.
+    """
 
     frame_id: int
     timestamp: datetime
     path: Path
     checksum: Optional[str] = None
+    stream_id: str = "default"
+    image: Optional[Any] = Field(default=None, exclude=True, repr=False)
 
 
 class AnomalyEvent(BaseModel):
@@ -3,36 +3,55 @@
 from __future__ import annotations
 
 import json
+from datetime import timezone
 from pathlib import Path
-from typing import Sequence
+from typing import Optional, Protocol, Sequence, Union
 
 from shutil import copyfile
 
+import numpy as np
+
 try:  # pragma: no cover - optional dependency
     import cv2  # type: ignore
 except Exception:  # pragma: no cover - executed when OpenCV unavailable
     cv2 = None
 
+from app.capture.buffer import BufferedFrame, FrameRef, RawFrame
 from app.schemas.models import AnomalyEvent
 
+from .clips import ClipEncoder
+
+
+class LoadableFrame(Protocol):
+    """Buffered frame that decodes itself, e.g. a frame from an in-memory ring."""
+
+    def load(self) -> Optional[np.ndarray]: ...
+
+
+# clip frames are files on disk or buffered frames decoded on demand
+ClipFrame = Union[Path, LoadableFrame]
+
 
 def save_event_artifacts(
     event: AnomalyEvent,
-    pre: Sequence[Path] | None = None,
-    post: Sequence[Path] | None = None,
+    pre: Sequence[ClipFrame] | None = None,
+    post: Sequence[ClipFrame] | None = None,
     events_dir: Path | None = None,
     artifacts_dir: Path | None = None,
     fps: int = 5,
+    clips: ClipEncoder | None = None,
 ) -> Path:
     """Persist screenshot, metrics and a short clip for an event.
 
     Args:
         event: The anomaly event being stored.
-        pre: Paths to frames before the event.
-        post: Paths to frames after the event.
+        pre: Frames before the event (paths or buffered frames).
+        post: Frames after the event (paths or buffered frames).
         events_dir: Root directory for per-event folders.
         artifacts_dir: Directory for global artifact files.
         fps: Frame rate for the stitched clip.
+        clips: Background encoder to hand the clip to instead of writing it
+            here; ``pre`` and ``post`` must then be buffered frames.
 
     Returns:
         The directory where event artifacts were saved.
@@ -48,10 +67,12 @@ def save_event_artifacts(
     event_dir = events_root / str(event.event_id)
     event_dir.mkdir(parents=True, exist_ok=True)
 
-    # screenshot
+    # screenshot; in-memory packets carry the frame so no disk read is needed
     screenshot = event_dir / "screenshot.png"
     if cv2 is not None:
-        img = cv2.imread(str(event.frame.path))
+        img = event.frame.image
+        if img is None:
+            img = cv2.imread(str(event.frame.path))
         if img is not None:
             cv2.imwrite(str(screenshot), img)
     else:  # pragma: no cover - executed if OpenCV missing
@@ -69,9 +90,33 @@ def save_event_artifacts(
     metrics_path.write_text(json.dumps(metrics))
 
     # clip
+    if clips is not None:
+        frame = event.frame
+        ts = frame.timestamp.replace(tzinfo=timezone.utc).timestamp()
+        center: BufferedFrame = (
+            RawFrame(frame.image, ts, frame.frame_id)
+            if frame.image is not None
+            else FrameRef(frame.path, ts, frame.frame_id)
+        )
+        clips.submit(
+            event_dir / "clip.mp4",
+            [*pre_paths, center, *post_paths],  # type: ignore[list-item]
+            stream=frame.stream_id,
+            fps=fps,
+        )
+        return event_dir
+
     clip_frames = pre_paths + [event.frame.path] + post_paths
     if cv2 is not None and clip_frames:
-        first = cv2.imread(str(clip_frames[0]))
+
+        def _read(item: ClipFrame):
+            if not isinstance(item, Path):
+                return item.load()
+            if item == event.frame.path and event.frame.image is not None:
+                return event.frame.image
+            return cv2.imread(str(item))
+
+        first = _read(clip_frames[0])
         if first is not None:
             height, width, _ = first.shape
             clip_path = event_dir / "clip.mp4"
@@ -81,8 +126,8 @@ def save_event_artifacts(
                 fps,
                 (width, height),
             )
-            for path in clip_frames:
-                frame = cv2.imread(str(path))
+            for item in clip_frames:
+                frame = _read(item)
                 if frame is not None:
                     writer.write(frame)
             writer.release()
@@ -90,4 +135,4 @@ def save_event_artifacts(
     return event_dir
 
 
-__all__ = ["save_event_artifacts"]
+__all__ = ["ClipFrame", "LoadableFrame", "save_event_artifacts"]
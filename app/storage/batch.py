@@ -0,0 +1,87 @@
+"""Batched, transactional persistence of anomaly events."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Sequence
+
+from app.schemas.models import AnomalyEvent
+
+from . import repo
+from .db import session_scope
+
+
+@dataclass
+class CommitStats:
+    """Thread-safe commit counters and latency (milliseconds)."""
+
+    batches: int = 0
+    events: int = 0
+    failures: int = 0
+    last_ms: float = 0.0
+    max_ms: float = 0.0
+    total_ms: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, size: int, latency_ms: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.events += size
+            self.last_ms = latency_ms
+            self.max_ms = max(self.max_ms, latency_ms)
+            self.total_ms += latency_ms
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "events": self.events,
+                "failures": self.failures,
+                "last_ms": self.last_ms,
+                "max_ms": self.max_ms,
+                "mean_ms": self.total_ms / self.batches if self.batches else 0.0,
+            }
+
+
+def persist_events(
+    events: Sequence[AnomalyEvent], stats: CommitStats | None = None
+) -> float:
+    """Save ``events`` in a single transaction and return the latency in ms.
+
+    The batch is committed atomically: if any event fails, none of the batch
+    is stored and the exception propagates.
+    """
+    start = time.perf_counter()
+    try:
+        with session_scope() as session:
+            for evt in events:
+                repo.save_event(session, evt)
+    except Exception:
+        if stats is not None:
+            stats.record_failure()
+        raise
+    latency_ms = (time.perf_counter() - start) * 1000.0
+    if stats is not None:
+        stats.record(len(events), latency_ms)
+    return latency_ms
+
+
+def next_event_id() -> int:
+    """First event id not yet used in the database."""
+    with session_scope() as session:
+        return repo.next_event_id(session)
+
+
+def next_frame_id() -> int:
+    """First frame id not yet used in the database."""
+    with session_scope() as session:
+        return repo.next_frame_id(session)
+
+
+__all__ = ["CommitStats", "next_event_id", "next_frame_id", "persist_events"]
@@ -0,0 +1,213 @@
+"""Background encoder turning buffered frames into event clips."""
+
+from __future__ import annotations
+
+import heapq
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:  # pragma: no cover - optional dependency
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - executed when OpenCV unavailable
+    cv2 = None
+
+from app.capture.buffer import BufferedFrame, RawFrame
+
+
+@dataclass
+class ClipStats:
+    """Counters exposed by :class:`ClipEncoder`."""
+
+    queue_depth: int = 0
+    submitted: int = 0
+    written: int = 0
+    dropped: int = 0
+    errors: int = 0
+    decoded: int = 0
+    cache_hits: int = 0
+    stale: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+@dataclass
+class _Job:
+    path: Path
+    frames: List[BufferedFrame]
+    stream: str
+    fps: int
+    future: "Future[Optional[Path]]"
+    writer: Any = field(default=None, repr=False)
+    size: Tuple[int, int] = (0, 0)
+    written: int = 0
+
+
+class ClipEncoder:
+    """Encode event clips on a background thread.
+
+    :meth:`submit` only queues a clip, so the event path never waits for
+    decoding or encoding. Clips are built from buffered frames
+    (:class:`~app.capture.buffer.FrameRef`, ``EncodedFrame`` or
+    ``RawFrame``), not re-read paths. The worker takes every clip queued
+    so far as one batch and walks their frames merged in capture order, so
+    a frame shared by overlapping clips is loaded (read, decoded or viewed)
+    once and written to each clip's ``cv2.VideoWriter`` in turn. Loaded
+    frames are also kept in an LRU of ``cache_frames`` keyed by stream and
+    timestamp, which serves overlapping clips of consecutive batches.
+    ``RawFrame`` views are copied out of their ring slot when written;
+    frames whose slot was reused since :meth:`submit` are skipped and
+    counted as ``stale``. When ``maxsize`` clips are waiting, new ones are
+    dropped.
+    """
+
+    def __init__(
+        self, *, maxsize: int = 32, cache_frames: int = 16, fourcc: str = "mp4v"
+    ) -> None:
+        self.cache_frames = cache_frames
+        self.fourcc = fourcc
+        self._q: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=max(1, maxsize))
+        self._cache: "OrderedDict[Tuple[str, float], np.ndarray]" = OrderedDict()
+        self._stats = ClipStats()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        path: Path,
+        frames: Sequence[BufferedFrame],
+        *,
+        stream: str = "full",
+        fps: int = 5,
+    ) -> "Future[Optional[Path]]":
+        """Queue a clip of ``frames`` (oldest first) to be written to ``path``.
+
+        The returned future resolves to ``path``, or to ``None`` if the clip
+        was dropped or no frame could be loaded.
+        """
+        if self._closed:
+            raise RuntimeError("ClipEncoder is closed")
+        fut: "Future[Optional[Path]]" = Future()
+        with self._lock:
+            self._stats.submitted += 1
+        try:
+            self._q.put_nowait(_Job(Path(path), list(frames), stream, fps, fut))
+        except queue.Full:
+            with self._lock:
+                self._stats.dropped += 1
+            fut.set_result(None)
+        return fut
+
+    def stats(self) -> ClipStats:
+        """Return a snapshot of the encoder counters."""
+        with self._lock:
+            snap = ClipStats(**self._stats.to_dict())
+        snap.queue_depth = self._q.qsize()
+        return snap
+
+    def close(self) -> None:
+        """Write all queued clips and stop the worker."""
+        if not self._closed:
+            self._closed = True
+            self._q.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._q.get()
+            if job is None:
+                return
+            batch = [job]
+            while True:
+                try:
+                    job = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._encode(batch)
+                    return
+                batch.append(job)
+            self._encode(batch)
+
+    def _load(self, stream: str, frame: BufferedFrame) -> Optional[np.ndarray]:
+        if isinstance(frame, RawFrame):  # already pixels; nothing to decode
+            raw = frame.load()
+            if raw is None:
+                with self._lock:
+                    self._stats.stale += 1
+            return raw
+        key = (stream, frame.ts)
+        img = self._cache.get(key)
+        if img is not None:
+            self._cache.move_to_end(key)
+            with self._lock:
+                self._stats.cache_hits += 1
+            return img
+        img = frame.load()
+        with self._lock:
+            self._stats.decoded += 1
+        if img is not None and self.cache_frames > 0:
+            self._cache[key] = img
+            while len(self._cache) > self.cache_frames:
+                self._cache.popitem(last=False)
+        return img
+
+    def _write(self, job: _Job, img: np.ndarray) -> None:
+        if job.writer is None:
+            job.path.parent.mkdir(parents=True, exist_ok=True)
+            job.size = (img.shape[1], img.shape[0])
+            fourcc = cv2.VideoWriter_fourcc(*self.fourcc)
+            job.writer = cv2.VideoWriter(str(job.path), fourcc, job.fps, job.size)
+        elif (img.shape[1], img.shape[0]) != job.size:
+            img = cv2.resize(img, job.size)
+        job.writer.write(img)
+        job.written += 1
+
+    def _encode(self, batch: List[_Job]) -> None:
+        runs = (
+            [(frame.ts, i, frame) for frame in job.frames]
+            for i, job in enumerate(batch)
+        )
+        if cv2 is not None:
+            # clips sharing a frame reach it one after another in the merge
+            last: Optional[Tuple[str, float]] = None
+            img: Optional[np.ndarray] = None
+            for _, i, frame in heapq.merge(*runs, key=lambda run: run[:2]):
+                job = batch[i]
+                if job.future.done():  # failed earlier in the batch
+                    continue
+                try:
+                    if (job.stream, frame.ts) == last:
+                        with self._lock:
+                            self._stats.cache_hits += 1
+                    else:
+                        last = None
+                        img = self._load(job.stream, frame)
+                        last = (job.stream, frame.ts)
+                    if img is not None:
+                        self._write(job, img)
+                except Exception as exc:
+                    job.future.set_exception(exc)
+        for job in batch:
+            if job.writer is not None:
+                job.writer.release()
+            ok = not job.future.done()
+            with self._lock:
+                if ok and job.written:
+                    self._stats.written += 1
+                elif not ok:
+                    self._stats.errors += 1
+            if ok:
+                job.future.set_result(job.path if job.written else None)
+
+
+__all__ = ["ClipEncoder", "ClipStats"]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.schemas.models import AnomalyEvent, BugDraft, FramePacket
@@ -73,9 +74,26 @@ def save_draft(session: Session, draft: BugDraft) -> models.Draft:
     return db_draft
 
 
+def next_event_id(session: Session) -> int:
+    """Return one past the highest stored event id."""
+    return int(session.query(func.max(models.Event.id)).scalar() or 0) + 1
+
+
+def next_frame_id(session: Session) -> int:
+    """Return one past the highest stored frame id."""
+    return int(session.query(func.max(models.Frame.id)).scalar() or 0) + 1
+
+
 def list_events(session: Session) -> list[models.Event]:
     """Return all stored events ordered by creation time."""
     return session.query(models.Event).order_by(models.Event.created_at).all()
 
 
-__all__ = ["save_frame", "save_event", "save_draft", "list_events"]
+__all__ = [
+    "save_frame",
+    "save_event",
+    "save_draft",
+    "next_event_id",
+    "next_frame_id",
+    "list_events",
+]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+"""Benchmark screen grabs per second: per-call ``grab()`` vs ``Grabber``.
+
+Usage:
+  poetry run python scripts/bench_grab.py [--seconds 5] [--region W H]
+
+Requires a display reachable by ``mss``. Prints grabs/sec for the legacy
+function (new session + three allocations per frame), for the persistent
+grabber writing into its pre-allocated buffer, and for the capture loop's
+path: a grab into a frame leased from a :class:`FramePool` and returned
+once its consumers are done.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, Optional
+
+from app.capture.capture import FramePool, Grabber, grab
+
+
+def _rate(fn: Callable[[], object], seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def run_bench(
+    seconds: float, region: Optional[Dict[str, int]] = None
+) -> Dict[str, float]:
+    """Return grabs/sec for each capture path."""
+    before = _rate(lambda: grab(region), seconds)
+    with Grabber(region) as grabber:
+        after = _rate(grabber.grab_into, seconds)
+        pool = FramePool(grabber.shape)
+
+        def pooled() -> None:
+            lease = pool.acquire()
+            grabber.grab_into(lease.frame)
+            lease.release()
+
+        leased = _rate(pooled, seconds)
+    return {"grab": before, "grabber": after, "pooled": leased}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark screen grabbing")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--region",
+        type=int,
+        nargs=2,
+        metavar=("WIDTH", "HEIGHT"),
+        help="Capture a top-left region instead of the primary monitor",
+    )
+    args = parser.parse_args()
+    region = None
+    if args.region:
+        region = {
+            "top": 0,
+            "left": 0,
+            "width": args.region[0],
+            "height": args.region[1],
+        }
+
+    rates = run_bench(args.seconds, region)
+    print(f"grab():            {rates['grab']:8.1f} grabs/sec")
+    print(f"Grabber.grab_into: {rates['grabber']:8.1f} grabs/sec")
+    print(f"pooled (capture):  {rates['pooled']:8.1f} grabs/sec")
+    print(f"speedup:           {rates['grabber'] / max(rates['grab'], 1e-9):8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -120,38 +120,38 @@ def run_demo(
         for item in truth["clips"]:
             video = Path(item["file"]).resolve()
             frames = _extract_frames(video, out_dir / f"frames_{video.stem}")
-            for pkt in _packets(frames, start_id=next_frame_id):
-                next_frame_id = pkt.frame_id + 1
-                for evt in pipeline.process(pkt):
-                    if not all_events:
-                        if evt.type in seen:
-                            continue
-                    evt_u = _copy_with_event_id(evt, next_event_id)
-                    next_event_id += 1
-
-                    repo.save_event(session, evt_u)
-                    # Save artifacts (screenshot + small clip)
-                    evt_dir = art.save_event_artifacts(evt_u)
-                    attachments = [str(evt_dir / "screenshot.png")]
-                    clip_path = evt_dir / "clip.mp4"
-                    if clip_path.exists():
-                        attachments.append(str(clip_path))
-
-                    draft: BugDraft = summarizer.summarize(evt_u)
-                    draft.attachments.extend(attachments)
-                    repo.save_draft(session, draft)
-
-                    # Export
-                    from app.reporter import exporter
-
-                    exporter.submit(draft, write_csv=export_csv, write_json=export_json)
-
-                    saved_eids.append(evt_u.event_id)
-                    seen.add(evt_u.type)
-                    if not all_events and seen == target_types:
-                        break
+            pkts = _packets(frames, start_id=next_frame_id)
+            next_frame_id += len(pkts)
+            for evt in pipeline.process_clip(pkts):
+                if not all_events:
+                    if evt.type in seen:
+                        continue
+                evt_u = _copy_with_event_id(evt, next_event_id)
+                next_event_id += 1
+
+                repo.save_event(session, evt_u)
+                # Save artifacts (screenshot + small clip)
+                evt_dir = art.save_event_artifacts(evt_u)
+                attachments = [str(evt_dir / "screenshot.png")]
+                clip_path = evt_dir / "clip.mp4"
+                if clip_path.exists():
+                    attachments.append(str(clip_path))
+
+                draft: BugDraft = summarizer.summarize(evt_u)
+                draft.attachments.extend(attachments)
+                repo.save_draft(session, draft)
+
+                # Export
+                from app.reporter import exporter
+
+                exporter.submit(draft, write_csv=export_csv, write_json=export_json)
+
+                saved_eids.append(evt_u.event_id)
+                seen.add(evt_u.type)
                 if not all_events and seen == target_types:
                     break
+            if not all_events and seen == target_types:
+                break
 
     # 5) Summary
     data_dir = Path("data")
@@ -36,3 +36,30 @@ def test_blank_detector_low_fp_on_dark_frames(tmp_path):
     for i in range(5):
         pkt = make_packet(dark, tmp_path, i)
         assert det.process(pkt, state) is None
+
+
+def _hist_ratios(img: np.ndarray, luma_thresh: int, sat_thresh: int):
+    # reference: the original calcHist implementation
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    l_hist = cv2.calcHist([hsv[:, :, 2]], [0], None, [256], [0, 256])
+    s_hist = cv2.calcHist([hsv[:, :, 1]], [0], None, [256], [0, 256])
+    return (
+        float(l_hist[: luma_thresh + 1].sum() / l_hist.sum()),
+        float(s_hist[: sat_thresh + 1].sum() / s_hist.sum()),
+    )
+
+
+def test_blank_counts_match_histogram_reference(tmp_path):
+    rng = np.random.default_rng(0)
+    det = BlankDetector(min_frames=1, pct=0.9)
+    for i in range(20):
+        high = int(rng.integers(8, 256))
+        img = rng.integers(0, high, (48, 64, 3), dtype=np.uint8)
+        img[: int(rng.integers(0, 48))] = 0
+        l_ref, s_ref = _hist_ratios(img, det.luma_thresh, det.sat_thresh)
+
+        evt = det.process(make_packet(img, tmp_path, i), {})
+        assert (evt is not None) == (l_ref >= det.pct and s_ref >= det.pct)
+        if evt is not None:
+            assert abs(evt.metrics["luma_ratio"] - l_ref) < 1e-6
+            assert abs(evt.metrics["sat_ratio"] - s_ref) < 1e-6
@@ -1,6 +1,15 @@
 from pathlib import Path
 
-from app.capture.buffer import RollingBuffer
+import numpy as np
+import pytest
+
+from app.capture.buffer import (
+    EncodedRingBuffer,
+    FrameRing,
+    MmapRingBuffer,
+    PixelRing,
+    RollingBuffer,
+)
 
 
 def test_buffer_drops_oldest_and_retains_duration():
@@ -22,3 +31,148 @@ def test_buffer_drops_oldest_and_retains_duration():
     duration = items[-1].ts - items[0].ts
     assert duration <= seconds
     assert duration >= seconds - (1 / fps)
+
+
+def _filled(n: int, fps: int = 5, seconds: int = 2) -> RollingBuffer:
+    buffer = RollingBuffer(fps=fps, seconds=seconds)
+    for i in range(n):
+        buffer.append(Path(f"frame_{i}.jpg"), i * 0.2, frame_id=i)
+    return buffer
+
+
+def test_lookups_by_timestamp_and_frame_id_after_wraparound():
+    buffer = _filled(23)  # ring wrapped twice; frames 13..22 remain
+
+    assert buffer.at(3.0).frame_id == 15
+    assert buffer.at(3.1).frame_id == 15
+    assert buffer.at(2.0) is None  # older than the buffer
+    assert buffer.find(20).ts == 4.0
+    assert buffer.find(5) is None
+    assert [ref.frame_id for ref in buffer.window(3.0, 0.4, 0.2)] == [13, 14, 15, 16]
+
+
+def test_defer_fires_once_post_frames_arrive():
+    buffer = _filled(5)
+    got = []
+    buffer.defer(0.4, 0.2, 0.6, got.append)
+    assert got == [] and buffer.pending == 1
+
+    buffer.append(Path("frame_5.jpg"), 1.0, frame_id=5)
+    assert got == []  # 1.0 is still inside the window
+    buffer.append(Path("frame_6.jpg"), 1.2, frame_id=6)
+    assert [[ref.frame_id for ref in frames] for frames in got] == [[1, 2, 3, 4, 5]]
+    assert buffer.pending == 0
+
+    # a window that is already complete is delivered immediately
+    buffer.defer(0.4, 0.0, 0.0, got.append)
+    assert [ref.frame_id for ref in got[-1]] == [2]
+
+
+def test_flush_delivers_incomplete_windows():
+    buffer = _filled(5)
+    got = []
+    buffer.defer(0.6, 0.2, 5.0, got.append)
+    buffer.flush()
+    assert [ref.frame_id for ref in got[0]] == [2, 3, 4]
+    assert buffer.pending == 0
+
+
+def test_rings_declare_their_append_interface(tmp_path):
+    with pytest.raises(TypeError):
+        FrameRing(4)  # type: ignore[abstract]
+    assert not isinstance(RollingBuffer(fps=1, seconds=1), PixelRing)
+    assert isinstance(EncodedRingBuffer(fps=1, seconds=1), PixelRing)
+    assert isinstance(MmapRingBuffer(tmp_path / "r.ring", fps=1, seconds=1), PixelRing)
+
+
+def test_encoded_ring_wraps_bytes_and_evicts_overwritten_frames():
+    buffer = EncodedRingBuffer(fps=5, seconds=2, frame_bytes=10)  # 100 bytes
+    rng = np.random.default_rng(0)
+    sent = {}
+    for i in range(60):
+        data = rng.integers(0, 256, int(rng.integers(5, 30)), dtype=np.uint8)
+        sent[i] = data.tobytes()
+        buffer.append(sent[i], i * 0.2, frame_id=i)
+
+        frames = buffer.to_list()
+        assert frames[-1].frame_id == i
+        ids = [f.frame_id for f in frames]
+        assert ids == list(range(ids[0], i + 1))  # contiguous, newest kept
+        assert all(f.data == sent[f.frame_id] for f in frames)
+        assert sum(len(f.data) for f in frames) <= len(buffer.data)
+
+    assert buffer.find(59).ts == pytest.approx(11.8)
+    with pytest.raises(ValueError):
+        buffer.append(bytes(101), 12.0)
+
+
+def test_encoded_ring_cuts_decodable_windows():
+    pytest.importorskip("cv2")
+    buffer = EncodedRingBuffer(fps=5, seconds=2, frame_bytes=4096)
+    for i in range(12):
+        frame = np.full((16, 16, 3), i * 20, dtype=np.uint8)
+        buffer.append_frame(frame, i / 5, frame_id=i)
+
+    window = buffer.window(1.0, 0.2, 0.2)
+    assert [f.frame_id for f in window] == [4, 5, 6]
+    img = window[1].load()
+    assert img.shape == (16, 16, 3)
+    assert abs(int(img.mean()) - 100) <= 2
+    assert len(buffer) == 10
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_mmap_ring_returns_zero_copy_views(tmp_path):
+    buffer = MmapRingBuffer(tmp_path / "full.ring", fps=5, seconds=2)
+    for i in range(13):
+        buffer.append_frame(_frame(i), i / 5, frame_id=i)
+
+    window = buffer.window(2.0, 0.2, 0.2)
+    assert [f.frame_id for f in window] == [9, 10, 11]
+    assert [int(f.load().mean()) for f in window] == [9, 10, 11]
+    assert np.shares_memory(window[0].image, buffer.find(9).image)
+    assert not window[0].image.flags.writeable
+    assert buffer.at(0.5) is None  # frames 0..2 were overwritten
+
+
+def test_mmap_ring_views_detect_reused_slots(tmp_path):
+    buffer = MmapRingBuffer(tmp_path / "full.ring", fps=5, seconds=2)
+    for i in range(10):
+        buffer.append_frame(_frame(i), i / 5, frame_id=i)
+    kept, reused = buffer.find(9), buffer.find(0)
+    buffer.append_frame(_frame(10), 2.0, frame_id=10)  # takes frame 0's slot
+
+    assert int(reused.image.mean()) == 10  # the view shows the new frame
+    assert reused.load() is None
+    copy = kept.load()
+    assert int(copy.mean()) == 9 and not np.shares_memory(copy, kept.image)
+
+
+def test_mmap_ring_resumes_after_restart(tmp_path):
+    path = tmp_path / "full.ring"
+    buffer = MmapRingBuffer(path, fps=5, seconds=2)
+    for i in range(13):
+        buffer.append_frame(_frame(i), i / 5, frame_id=i)
+    del buffer
+
+    reopened = MmapRingBuffer(path, fps=5, seconds=2)
+    assert reopened.shape == (4, 6, 3)
+    frames = reopened.to_list()
+    assert [f.ts for f in frames] == [i / 5 for i in range(3, 13)]
+    assert [int(f.image.mean()) for f in frames] == list(range(3, 13))
+    assert {f.frame_id for f in frames} == {None}  # ids restart per process
+
+    reopened.append_frame(_frame(99), 3.0, frame_id=1)
+    assert reopened.find(1).ts == 3.0
+    assert reopened.at(1.0).frame_id is None
+
+    # another capacity or frame shape starts a fresh ring
+    assert len(MmapRingBuffer(path, fps=5, seconds=3)) == 0
+    resized = MmapRingBuffer(path, fps=5, seconds=2)
+    old = resized.to_list()[0].image
+    resized.append_frame(np.zeros((2, 2, 3), np.uint8), 4.0)
+    assert len(resized) == 1 and resized.shape == (2, 2, 3)
+    assert int(old.mean()) == 4  # old views stay readable
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.capture import capture
+
+
+class _FakeSct:
+    monitors = [{}, {"top": 0, "left": 0, "width": 6, "height": 4}]
+
+    def __init__(self) -> None:
+        self.grabs = 0
+        self.closed = False
+
+    def grab(self, monitor):
+        self.grabs += 1
+        h, w = monitor["height"], monitor["width"]
+        bgra = np.zeros((h, w, 4), dtype=np.uint8)
+        bgra[..., 0] = 10
+        bgra[..., 1] = 20
+        bgra[..., 2] = self.grabs
+        bgra[..., 3] = 255
+        return SimpleNamespace(raw=bytearray(bgra.tobytes()), width=w, height=h)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_grabber_reuses_session_and_buffer(monkeypatch):
+    sessions = []
+
+    def fake_mss():
+        sessions.append(_FakeSct())
+        return sessions[-1]
+
+    monkeypatch.setattr(capture, "mss", SimpleNamespace(mss=fake_mss))
+
+    with capture.Grabber() as grabber:
+        first = grabber.grab_into()
+        second = grabber.grab_into()
+        assert first is second
+        assert second.shape == (4, 6, 3)
+        assert second[0, 0].tolist() == [10, 20, 2]
+
+        dst = np.empty(grabber.shape, dtype=np.uint8)
+        assert grabber.grab_into(dst) is dst
+
+    assert len(sessions) == 1
+    assert sessions[0].grabs == 3 and sessions[0].closed
+
+
+def test_frame_pool_recycles_released_frames():
+    pool = capture.FramePool((4, 6, 3), size=1)
+    lease = pool.acquire()
+    lease.retain()  # e.g. queued for writing
+    lease.release()
+    assert pool.acquire().frame is not lease.frame  # still held
+    lease.release()
+    assert pool.acquire().frame is lease.frame
+
+    a, b = pool.acquire(), pool.acquire()
+    a.release()
+    b.release()  # pool is full; b's frame is left to the GC
+    assert pool.acquire().frame is a.frame
+    assert pool.acquire().frame is not b.frame
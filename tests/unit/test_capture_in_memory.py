@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.capture import capture
+from app.capture.buffer import EncodedRingBuffer, MmapRingBuffer
+from app.config.load import CaptureSettings, Settings
+from app.detectors.pipeline import DetectorPipeline
+from app.schemas.models import FramePacket
+from app.schemas.types import AnomalyType
+
+
+def test_pipeline_uses_in_memory_image_without_file(tmp_path: Path):
+    pipeline = DetectorPipeline.from_yaml()
+    black = np.zeros((32, 32, 3), dtype=np.uint8)
+    types = set()
+    for i in range(4):
+        pkt = FramePacket(
+            frame_id=i,
+            timestamp=datetime.utcnow(),
+            path=tmp_path / "missing.jpg",
+            image=black,
+        )
+        types.update(evt.type for evt in pipeline.process(pkt))
+    assert AnomalyType.BLANK in types
+    assert "image" not in pkt.model_dump()
+
+
+def test_capture_loop_in_memory_persists_sampled_frames(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    class FakeGrabber:
+        shape = (8, 8, 3)
+
+        def __init__(self, region=None) -> None:
+            pass
+
+        def grab_into(self, dst=None):
+            dst[:] = 128
+            return dst
+
+        def close(self) -> None:
+            pass
+
+    monkeypatch.setattr(capture, "Grabber", FakeGrabber)
+
+    packets = []
+
+    def sink(pkt: FramePacket) -> None:
+        packets.append(pkt)
+        if len(packets) == 4:
+            raise KeyboardInterrupt
+
+    settings = Settings(
+        fps=1000, capture=CaptureSettings(in_memory=True, persist_every=2)
+    )
+    capture.capture_loop(sink, settings=settings)
+
+    assert [p.frame_id for p in packets] == [1, 2, 3, 4]
+    images = [p.image for p in packets]
+    assert all(img is not None and img.mean() == 128 for img in images)
+    assert len({id(img) for img in images}) == 4  # each packet owns its frame
+    written = sorted((tmp_path / "data" / "media").rglob("*.jpg"))
+    assert [p.name for p in written] == [packets[1].path.name, packets[3].path.name]
+
+
+def test_capture_loop_fills_encoded_ring_without_files(tmp_path, monkeypatch):
+    pytest.importorskip("cv2")
+    monkeypatch.chdir(tmp_path)
+
+    class FakeGrabber:
+        shape = (8, 8, 3)
+
+        def __init__(self, region=None) -> None:
+            self.n = 0
+
+        def grab_into(self, dst=None):
+            self.n += 1
+            dst[:] = self.n * 40
+            return dst
+
+        def close(self) -> None:
+            pass
+
+    monkeypatch.setattr(capture, "Grabber", FakeGrabber)
+
+    packets = []
+
+    def sink(pkt: FramePacket) -> None:
+        packets.append(pkt)
+        if len(packets) == 4:
+            raise KeyboardInterrupt
+
+    settings = Settings(
+        fps=1000,
+        buffer_seconds=1,
+        capture=CaptureSettings(in_memory=True, persist_every=0, buffer="encoded"),
+    )
+    buffer = capture.make_buffer(settings)
+    assert isinstance(buffer, EncodedRingBuffer)
+    capture.capture_loop(sink, settings=settings, buffer=buffer)
+
+    frames = buffer.to_list()
+    assert [f.frame_id for f in frames] == [1, 2, 3, 4]
+    assert [round(float(f.load().mean()) / 40) for f in frames] == [1, 2, 3, 4]
+    assert not list((tmp_path / "data" / "media").rglob("*.jpg"))
+
+
+def test_capture_loop_recycles_written_frames(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    delivered = threading.Event()
+    delivered.set()
+    arrays = []
+
+    class FakeGrabber:
+        shape = (8, 8, 3)
+
+        def __init__(self, region=None) -> None:
+            pass
+
+        def grab_into(self, dst=None):
+            arrays.append(id(dst))
+            dst[:] = len(arrays)
+            return dst
+
+        def close(self) -> None:
+            pass
+
+    class OneAtATime:
+        """Pace grabs so each starts after the previous frame was delivered."""
+
+        def wait(self) -> None:
+            assert delivered.wait(5)
+            delivered.clear()
+
+    monkeypatch.setattr(capture, "Grabber", FakeGrabber)
+    packets = []
+    stop = threading.Event()
+
+    def sink(pkt: FramePacket) -> None:
+        packets.append(pkt)
+        if len(packets) == 5:
+            stop.set()
+        delivered.set()
+
+    settings = Settings(capture=CaptureSettings(encoder="npy"))
+    capture.capture_loop(sink, settings=settings, scheduler=OneAtATime(), stop=stop)
+
+    assert len(set(arrays)) == 1  # one array served every grab
+    assert [int(np.load(p.path)[0, 0, 0]) for p in packets[:5]] == [1, 2, 3, 4, 5]
+
+
+def test_make_buffer_puts_mmap_rings_under_buffer_dir(tmp_path):
+    cap = CaptureSettings(buffer="mmap", buffer_dir=str(tmp_path))
+    buffer = capture.make_buffer(Settings(capture=cap), "left")
+    assert isinstance(buffer, MmapRingBuffer)
+    buffer.append_frame(np.zeros((8, 8, 3), np.uint8), 1.0, 1)
+    assert (tmp_path / "left.ring").exists()
+
+
+def test_make_buffer_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        capture.make_buffer(Settings(capture=CaptureSettings(buffer="tape")))
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from app.capture.scheduler import FrameScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_scheduler_keeps_absolute_deadlines_without_drift():
+    clock = FakeClock()
+    sched = FrameScheduler(10, clock=clock, sleep=clock.sleep)
+    sched.wait()
+    for _ in range(50):
+        clock.now += 0.037  # work per frame
+        assert sched.wait() == 0
+
+    # 50 periods after the first deadline, regardless of per-frame work
+    assert clock.now == pytest.approx(100.0 + 50 * 0.1)
+    snap = sched.stats.snapshot()
+    assert snap["frames"] == 51
+    assert snap["late_frames"] == 0
+    assert snap["achieved_fps"] == pytest.approx(10.0)
+    assert snap["jitter_hist"][0] == 51
+
+
+def test_scheduler_skips_missed_deadlines_on_overrun():
+    clock = FakeClock()
+    sched = FrameScheduler(10, clock=clock, sleep=clock.sleep)
+    sched.wait()
+    clock.now += 0.35  # overran by 2.5 periods
+    assert sched.wait() == 2
+    clock.now += 0.01
+    assert sched.wait() == 0
+    # back on the original grid: start + 4 periods
+    assert clock.now == pytest.approx(100.4)
+
+    snap = sched.stats.snapshot()
+    assert snap["late_frames"] == 1
+    assert snap["skipped_frames"] == 2
+    assert snap["max_jitter_ms"] == pytest.approx(50.0)
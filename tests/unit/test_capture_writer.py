@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.capture import writer as writer_mod
+from app.capture.writer import FrameWriter
+
+
+def _frame(val: int = 0) -> np.ndarray:
+    return np.full((8, 8, 3), val, dtype=np.uint8)
+
+
+def _blocking_encoder(monkeypatch) -> threading.Event:
+    release = threading.Event()
+    real = writer_mod.encode_frame
+
+    def slow(frame, path, encoder="jpeg", **kw):
+        release.wait(5)
+        real(frame, path, encoder, **kw)
+
+    monkeypatch.setattr(writer_mod, "encode_frame", slow)
+    return release
+
+
+@pytest.mark.parametrize(
+    "policy,kept",
+    [("drop_newest", {0, 1, 2}), ("drop_oldest", {0, 3, 4})],
+)
+def test_writer_backpressure_policies(tmp_path: Path, monkeypatch, policy, kept):
+    release = _blocking_encoder(monkeypatch)
+    w = FrameWriter(workers=1, maxsize=2, encoder="npy", policy=policy)
+    done: list[Path] = []
+    w.submit(_frame(), tmp_path / "0.npy", done.append)
+    # wait until the worker holds frame 0 so the queue is empty
+    while w.stats().queue_depth:
+        time.sleep(0.001)
+    for i in range(1, 5):
+        w.submit(_frame(), tmp_path / f"{i}.npy", done.append)
+
+    stats = w.stats()
+    assert stats.dropped == 2
+    assert stats.queue_depth == 2
+    release.set()
+    w.close()
+
+    assert {int(p.stem) for p in done} == kept
+    assert [int(p.stem) for p in done] == sorted(int(p.stem) for p in done)
+    assert w.stats().written == 3
+
+
+def test_writer_encoders_and_ordered_callbacks(tmp_path: Path):
+    w = FrameWriter(workers=4, maxsize=16, encoder="npy", policy="block")
+    done: list[Path] = []
+    for i in range(10):
+        w.submit(_frame(i), tmp_path / f"{i}{w.suffix}", done.append)
+    w.close()
+
+    assert [int(p.stem) for p in done] == list(range(10))
+    assert np.load(tmp_path / "7.npy")[0, 0, 0] == 7
+
+    png = FrameWriter(workers=1, encoder="png", png_level=1)
+    png.submit(_frame(9), tmp_path / "a.png")
+    png.close()
+    assert (tmp_path / "a.png").stat().st_size > 0
+
+
+def test_writer_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        FrameWriter(policy="sometimes")
+
+
+def test_writer_counts_failed_imwrite_as_error(tmp_path: Path):
+    w = FrameWriter(workers=1, encoder="jpeg")
+    done: list[Path] = []
+    w.submit(_frame(), tmp_path / "missing" / "a.jpg", done.append)
+    w.close()
+    stats = w.stats()
+    assert (stats.written, stats.errors) == (0, 1)
+    assert done == []
+
+
+def test_raising_callback_does_not_kill_workers(tmp_path: Path):
+    w = FrameWriter(workers=1, maxsize=1, encoder="npy", policy="block")
+    done: list[Path] = []
+
+    def boom(path: Path) -> None:
+        raise RuntimeError("sink closed")
+
+    w.submit(_frame(), tmp_path / "0.npy", boom)
+    for i in range(1, 4):  # would hang on a full queue if the worker died
+        w.submit(_frame(), tmp_path / f"{i}.npy", done.append)
+    w.close()
+
+    assert [int(p.stem) for p in done] == [1, 2, 3]
+    assert w.stats().written == 4
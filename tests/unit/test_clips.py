@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.capture.buffer import EncodedFrame, MmapRingBuffer, RawFrame
+from app.schemas.models import AnomalyEvent, FramePacket
+from app.schemas.types import AnomalyType, Severity
+from app.storage import artifacts
+from app.storage.clips import ClipEncoder
+
+cv2 = pytest.importorskip("cv2")
+
+
+def _encoded(i: int) -> EncodedFrame:
+    img = np.full((16, 16, 3), i * 10, dtype=np.uint8)
+    return EncodedFrame(cv2.imencode(".jpg", img)[1].tobytes(), i / 5, i)
+
+
+def _frame_count(path: Path) -> int:
+    cap = cv2.VideoCapture(str(path))
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return n
+
+
+class GatedFrame:
+    """Frame whose load blocks until ``gate`` is set, holding the worker."""
+
+    def __init__(self, gate: threading.Event) -> None:
+        self.gate = gate
+        self.loading = threading.Event()
+        self.ts = -1.0
+
+    def load(self):
+        self.loading.set()
+        self.gate.wait(5)
+        return np.zeros((16, 16, 3), dtype=np.uint8)
+
+
+def test_overlapping_clips_in_a_batch_decode_shared_frames_once(tmp_path):
+    frames = [_encoded(i) for i in range(8)]
+    gate = threading.Event()
+    gated = GatedFrame(gate)
+    enc = ClipEncoder(cache_frames=0)
+    first = enc.submit(tmp_path / "0.mp4", [gated], stream="a")
+    assert gated.loading.wait(5)  # a and b queue up behind the first batch
+    a = enc.submit(tmp_path / "a.mp4", frames[0:5], stream="full")
+    b = enc.submit(tmp_path / "b.mp4", frames[3:8], stream="full")
+    gate.set()
+    enc.close()
+
+    assert first.result() == tmp_path / "0.mp4"
+    assert a.result() == tmp_path / "a.mp4" and b.result() == tmp_path / "b.mp4"
+    assert _frame_count(a.result()) == 5 and _frame_count(b.result()) == 5
+    stats = enc.stats()
+    assert stats.written == 3
+    # frames 3 and 4 were decoded once and written to both clips
+    assert (stats.decoded, stats.cache_hits) == (1 + 8, 2)
+
+
+def test_cache_serves_clips_of_later_batches(tmp_path):
+    frames = [_encoded(i) for i in range(6)]
+    enc = ClipEncoder(cache_frames=16)
+    enc.submit(tmp_path / "a.mp4", frames[0:4]).result(timeout=5)
+    enc.submit(tmp_path / "b.mp4", frames[2:6]).result(timeout=5)
+    # raw slots are used as they are, never decoded or cached
+    raw = RawFrame(np.zeros((16, 16, 3), dtype=np.uint8), 9.0)
+    enc.submit(tmp_path / "c.mp4", [raw]).result(timeout=5)
+    enc.close()
+
+    stats = enc.stats()
+    assert (stats.decoded, stats.cache_hits, stats.written) == (6, 2, 3)
+
+
+def test_ring_slots_reused_before_encoding_are_skipped(tmp_path):
+    ring = MmapRingBuffer(tmp_path / "full.ring", fps=2, seconds=2)
+    for i in range(4):
+        ring.append_frame(np.full((16, 16, 3), i, dtype=np.uint8), float(i), i)
+    gate = threading.Event()
+    gated = GatedFrame(gate)
+    enc = ClipEncoder()
+    enc.submit(tmp_path / "0.mp4", [gated])
+    assert gated.loading.wait(5)  # hold the worker until the ring moved on
+    clip = enc.submit(tmp_path / "a.mp4", ring.to_list())
+    for i in range(4, 6):
+        ring.append_frame(np.full((16, 16, 3), i, dtype=np.uint8), float(i), i)
+    gate.set()
+    enc.close()
+
+    assert _frame_count(clip.result()) == 2  # frames 2 and 3 survived
+    assert enc.stats().stale == 2
+
+
+def test_full_queue_drops_clips(tmp_path):
+    gate = threading.Event()
+    gated = GatedFrame(gate)
+    enc = ClipEncoder(maxsize=1)
+    enc.submit(tmp_path / "0.mp4", [gated])
+    assert gated.loading.wait(5)  # the worker is busy with the first clip
+    queued = enc.submit(tmp_path / "1.mp4", [_encoded(1)])
+    dropped = enc.submit(tmp_path / "2.mp4", [_encoded(2)])
+    assert dropped.result(timeout=0) is None
+    gate.set()
+    enc.close()
+
+    assert queued.result() == tmp_path / "1.mp4"
+    assert enc.stats().dropped == 1
+    with pytest.raises(RuntimeError):
+        enc.submit(tmp_path / "late.mp4", [])
+
+
+def test_save_event_artifacts_hands_clip_to_encoder(tmp_path):
+    image = np.full((16, 16, 3), 200, dtype=np.uint8)
+    frame = FramePacket(
+        frame_id=3,
+        timestamp=datetime.utcfromtimestamp(0.6),
+        path=tmp_path / "missing.jpg",
+        image=image,
+    )
+    evt = AnomalyEvent(
+        event_id=7,
+        type=AnomalyType.BLANK,
+        severity=Severity.LOW,
+        frame=frame,
+        confidence=1.0,
+        metrics={},
+    )
+    enc = ClipEncoder()
+    out = artifacts.save_event_artifacts(
+        evt,
+        [_encoded(1), _encoded(2)],
+        [_encoded(4)],
+        events_dir=tmp_path / "events",
+        artifacts_dir=tmp_path / "artifacts",
+        clips=enc,
+    )
+    enc.close()
+
+    assert (out / "screenshot.png").exists()
+    assert _frame_count(out / "clip.mp4") == 4
+    assert enc.stats().decoded == 3  # the event frame was already in memory
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app import main as main_mod
+from app.config.load import RuntimeSettings, Settings
+from app.detectors.blank import BlankDetector
+from app.detectors.pipeline import DetectorPipeline
+from app.detectors.utils import dhash
+from app.detectors.workers import DetectionPool
+from app.schemas.models import FramePacket
+from app.schemas.types import AnomalyType
+
+
+def _blank_pipeline() -> DetectorPipeline:
+    return DetectorPipeline([BlankDetector(min_frames=2, pct=0.99)])
+
+
+def _packets(n: int):
+    black = np.zeros((16, 16, 3), dtype=np.uint8)
+    return [
+        FramePacket(frame_id=i, timestamp=datetime.utcnow(), path="x.png", image=black)
+        for i in range(1, n + 1)
+    ]
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_pool_matches_inline_pipeline(kind):
+    pkts = _packets(6)
+    inline = _blank_pipeline()
+    expected = [evt.frame.frame_id for pkt in pkts for evt in inline.process(pkt)]
+
+    pool = DetectionPool(_blank_pipeline, workers=2, kind=kind)
+
+    async def run():
+        futs = [pool.submit(pkt) for pkt in pkts]
+        results = [await DetectionPool.wrap(p, f) for p, f in zip(pkts, futs)]
+        return [evt for evts in results for evt in evts]
+
+    try:
+        events = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert [evt.frame.frame_id for evt in events] == expected == [2, 4, 6]
+    # events reference the caller's packet, pixels and checksum included
+    assert all(evt.frame.image is not None for evt in events)
+    checksum = f"{dhash(pkts[0].image):016x}"
+    assert all(evt.frame.checksum == checksum for evt in events)
+
+
+def test_detect_loop_delivers_events_in_frame_order():
+    # segment_gap=0 reports every detection rather than one per interval
+    settings = Settings(runtime=RuntimeSettings(segment_gap=0))
+    pool = DetectionPool(_blank_pipeline, workers=3)
+
+    async def run():
+        frame_q: asyncio.Queue = asyncio.Queue()
+        event_q: asyncio.Queue = asyncio.Queue()
+        for pkt in _packets(10):
+            frame_q.put_nowait(pkt)
+        task = asyncio.create_task(
+            main_mod.detect_loop(frame_q, event_q, settings=settings, pool=pool)
+        )
+        events = [await event_q.get() for _ in range(5)]
+        task.cancel()
+        return events
+
+    try:
+        events = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert [e.frame.frame_id for e in events] == [2, 4, 6, 8, 10]
+    assert all(e.type == AnomalyType.BLANK for e in events)
+
+
+def test_detect_loop_merges_detections_and_flushes_on_cancel():
+    settings = Settings(runtime=RuntimeSettings(segment_gap=5.0))
+    pool = DetectionPool(_blank_pipeline, workers=2)
+
+    async def run():
+        frame_q: asyncio.Queue = asyncio.Queue()
+        event_q: asyncio.Queue = asyncio.Queue()
+        for pkt in _packets(10):
+            frame_q.put_nowait(pkt)
+        task = asyncio.create_task(
+            main_mod.detect_loop(frame_q, event_q, settings=settings, pool=pool)
+        )
+        while not frame_q.empty():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        assert event_q.empty()  # the interval is still open
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return [event_q.get_nowait() for _ in range(event_q.qsize())]
+
+    try:
+        events = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert len(events) == 1
+    evt = events[0]
+    assert evt.frame.frame_id == 2
+    assert evt.metrics["segment_end_frame"] == 10
+    assert evt.metrics["segment_detections"] == 5
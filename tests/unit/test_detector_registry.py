@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.config.load import load_settings
+from app.detectors import registry as registry_mod
+from app.detectors.base import Detector
+from app.detectors.blank import BlankDetector
+from app.detectors.pipeline import DetectorPipeline
+from app.detectors.registry import DetectorRegistry
+
+
+@dataclass
+class EchoConfig:
+    level: int = 1
+
+
+class EchoDetector(Detector):
+    config_class = EchoConfig
+
+    def __init__(self, level: int) -> None:
+        self.level = level
+
+    @classmethod
+    def from_config(cls, cfg: EchoConfig, settings) -> "EchoDetector":
+        return cls(cfg.level)
+
+    def process(self, pkt, state, ctx=None):
+        return None
+
+
+def test_only_enabled_detectors_are_imported(tmp_path):
+    cfg = tmp_path / "detectors.yaml"
+    cfg.write_text("detectors:\n  - blank\n")
+    code = textwrap.dedent(f"""
+        import sys
+        from pathlib import Path
+        from app.detectors.pipeline import DetectorPipeline
+        pipeline = DetectorPipeline.from_yaml(Path({str(cfg)!r}))
+        heavy = ["app.detectors.flicker", "app.detectors.hud", "skimage"]
+        print([m for m in heavy if m in sys.modules])
+        """)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[2],
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_registry_builds_plugin_from_extra_config(tmp_path, monkeypatch):
+    reg = DetectorRegistry()
+    reg.register("echo", EchoDetector)
+    monkeypatch.setattr("app.detectors.pipeline.NAME_MAP", reg)
+
+    settings_file = tmp_path / "settings.yaml"
+    settings_file.write_text("detectors:\n  echo:\n    level: 7\n")
+    cfg = tmp_path / "detectors.yaml"
+    cfg.write_text("detectors:\n  - echo\n  - blank\n")
+
+    pipeline = DetectorPipeline.from_yaml(cfg, settings=load_settings(settings_file))
+    echo, blank = pipeline.detectors
+    assert isinstance(echo, EchoDetector) and echo.level == 7
+    assert isinstance(blank, BlankDetector)
+
+
+def test_registry_discovers_entry_points_lazily(monkeypatch):
+    calls = []
+
+    def fake_entry_points(group):
+        calls.append(group)
+        return [SimpleNamespace(name="echo", value=f"{__name__}:EchoDetector")]
+
+    monkeypatch.setattr(registry_mod, "entry_points", fake_entry_points)
+    reg = DetectorRegistry()
+    assert reg["blank"] is BlankDetector
+    assert calls == []
+    assert reg["echo"] is EchoDetector
+    assert calls == [registry_mod.ENTRY_POINT_GROUP]
+    assert set(reg) == {"blank", "freeze", "flicker", "hud_glitch", "echo"}
+
+
+def test_registry_rejects_non_detectors():
+    reg = DetectorRegistry({"bad": "app.detectors.frame:FrameCache"})
+    with pytest.raises(TypeError):
+        reg["bad"]
@@ -3,7 +3,7 @@ from datetime import datetime
 import cv2
 import numpy as np
 
-from app.detectors.flicker import FlickerDetector
+from app.detectors.flicker import FlickerDetector, SlidingSpectrum
 from app.schemas.models import FramePacket
 from app.schemas.types import AnomalyType
 
@@ -39,3 +39,45 @@ def test_flicker_detector_ignores_luma_ramp(tmp_path):
         img = np.full((32, 32, 3), val, dtype=np.uint8)
         pkt = make_packet(img, tmp_path, i)
         assert det.process(pkt, state) is None
+
+
+def _fft_ratio(values) -> float:
+    # reference: the original full-window FFT computation
+    arr = np.array(values, dtype=np.float32)
+    arr -= np.mean(arr)
+    mags = np.abs(np.fft.rfft(arr)) ** 2
+    total = float(np.sum(mags))
+    return 0.0 if total <= 1e-6 else float(np.sum(mags[2:]) / total)
+
+
+def test_sliding_spectrum_matches_full_fft():
+    rng = np.random.default_rng(0)
+    for window in (8, 9, 60):
+        spec = SlidingSpectrum(window, resync=128)
+        series = rng.uniform(0, 255, 400)
+        for i, x in enumerate(series):
+            spec.push(x)
+            if spec.ready:
+                expected = _fft_ratio(series[i - window + 1 : i + 1])
+                assert abs(spec.high_freq_ratio()[0] - expected) < 1e-4
+
+
+def test_tiled_flicker_localises_small_region(tmp_path):
+    # a 16x16 blinking patch is 1/16 of the frame: too small for the global
+    # ratio once the rest of the frame drifts, but obvious in its own tile
+    tiled = FlickerDetector(window=8, ratio_thresh=0.6, tile_rows=4, tile_cols=4)
+    whole = FlickerDetector(window=8, ratio_thresh=0.6)
+    tiled_state, whole_state = {}, {}
+
+    tiled_evt = whole_evt = None
+    for i in range(8):
+        img = np.full((64, 64, 3), 40 + i * 25, dtype=np.uint8)
+        img[16:32, 32:48] = 255 if i % 2 == 0 else 0
+        pkt = make_packet(img, tmp_path, i)
+        tiled_evt = tiled.process(pkt, tiled_state) or tiled_evt
+        whole_evt = whole.process(pkt, whole_state) or whole_evt
+
+    assert whole_evt is None
+    assert tiled_evt is not None
+    assert tiled_evt.metrics["flicker_tiles"] == [[1, 2]]
+    assert tiled_evt.metrics["tile_grid"] == [4, 4]
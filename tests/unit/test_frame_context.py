@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from app.detectors import frame as frame_mod
+from app.detectors.frame import FrameCache, FrameContext
+from app.detectors.pipeline import DetectorPipeline
+from app.schemas.models import FramePacket
+
+
+def make_packet(img: np.ndarray, tmp_path, frame_id: int) -> FramePacket:
+    path = tmp_path / f"frame_{frame_id}.png"
+    cv2.imwrite(str(path), img)
+    return FramePacket(frame_id=frame_id, timestamp=datetime.utcnow(), path=path)
+
+
+def test_pipeline_decodes_each_frame_once(tmp_path, monkeypatch):
+    calls = []
+    real_imread = cv2.imread
+
+    def counting_imread(path, *args):
+        calls.append(path)
+        return real_imread(path, *args)
+
+    monkeypatch.setattr(frame_mod.cv2, "imread", counting_imread)
+    pipeline = DetectorPipeline.from_yaml()
+    img = np.zeros((32, 32, 3), dtype=np.uint8)
+    for i in range(3):
+        pipeline.process(make_packet(img, tmp_path, i))
+
+    assert len(calls) == 3
+
+
+def test_frame_context_views_are_cached():
+    ctx = FrameContext(1, np.full((16, 32, 3), 100, dtype=np.uint8))
+    assert ctx.hsv is ctx.hsv
+    small = ctx.view(0.5, "gray")
+    assert small.shape == (8, 16)
+    assert ctx.view(0.5, "gray") is small
+
+
+def test_frame_cache_evicts_least_recent():
+    cache = FrameCache(capacity=2)
+    img = np.zeros((4, 4, 3), dtype=np.uint8)
+    for i in range(3):
+        cache.put(FrameContext(i, img))
+    assert cache.get(0) is None
+    assert cache.get(1) is not None and cache.get(2) is not None
@@ -38,3 +38,95 @@ def test_freeze_detector_ignores_motion(tmp_path):
         cv2.circle(img, (i, i), 1, (255, 255, 255), -1)
         pkt = make_packet(img, tmp_path, i)
         assert det.process(pkt, state) is None
+
+
+def test_mad_bounded_matches_mad_below_limit_and_exits_early():
+    from app.detectors.utils import mad, mad_bounded
+
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    b = a.copy()
+    b[::7] ^= 1
+    assert abs(mad_bounded(a, b, limit=5.0, chunk=512) - mad(a, b)) < 1e-9
+
+    c = 255 - a
+    partial = mad_bounded(a, c, limit=1.0, chunk=512)
+    assert 1.0 < partial <= mad(a, c)
+
+
+def test_freeze_detector_gray_downscaled_reuses_prev_buffer(tmp_path):
+    det = FreezeDetector(min_frames=3, mad_thresh=1.0, scale=0.125, mode="gray")
+    state = {}
+    img = np.full((128, 128, 3), 90, dtype=np.uint8)
+
+    evt = None
+    buffers = set()
+    for i in range(4):
+        evt = det.process(make_packet(img, tmp_path, i), state)
+        buffers.add(id(state["prev_frame"]))
+
+    assert evt is not None and evt.type == AnomalyType.FREEZE
+    assert state["prev_frame"].shape == (16, 16)
+    assert len(buffers) == 1
+
+
+def test_freeze_detector_gray_downscaled_ignores_motion(tmp_path):
+    det = FreezeDetector(min_frames=3, mad_thresh=1.0, scale=0.125, mode="gray")
+    state = {}
+
+    for i in range(5):
+        img = np.zeros((128, 128, 3), dtype=np.uint8)
+        cv2.rectangle(img, (i * 16, 0), (i * 16 + 31, 31), (255, 255, 255), -1)
+        assert det.process(make_packet(img, tmp_path, i), state) is None
+
+
+def test_dhash_is_stable():
+    from app.detectors.utils import dhash, hamming
+
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    noisy = cv2.add(img, np.full_like(img, 3))
+    assert hamming(dhash(img), dhash(noisy)) <= 2
+    assert hamming(dhash(img), dhash(255 - img)) > 32
+
+
+def test_pipeline_sets_full_frame_checksum_on_events(tmp_path):
+    from app.detectors.pipeline import DetectorPipeline
+    from app.detectors.regions import RegionDetector
+    from app.detectors.utils import dhash
+
+    det = RegionDetector(
+        FreezeDetector(min_frames=2, hash_max_dist=4), {"corner": (0, 0, 32, 32)}
+    )
+    pipeline = DetectorPipeline([det])
+    img = np.random.default_rng(3).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    pkts = [make_packet(img, tmp_path, i) for i in range(3)]
+    events = [evt for pkt in pkts for evt in pipeline.process(pkt)]
+    assert events
+    full = f"{dhash(cv2.imread(str(pkts[0].path))):016x}"
+    assert all(evt.frame.checksum == full for evt in events)
+    # frames without events are left alone
+    assert pkts[0].checksum is None
+
+
+def test_freeze_ssim_confirmation_rejects_blinking_cursor(tmp_path):
+    rng = np.random.default_rng(2)
+    base = rng.integers(0, 256, (128, 128, 3), dtype=np.uint8)
+
+    def frames():
+        for i in range(5):
+            img = base.copy()
+            img[60:64, 60:64] = 255 if i % 2 else 0
+            yield make_packet(img, tmp_path, i)
+
+    # MAD alone sees a frozen screen ...
+    mad_only = FreezeDetector(min_frames=3, mad_thresh=1.0)
+    state = {}
+    assert any(mad_only.process(p, state) for p in frames())
+
+    # ... SSIM confirmation notices the cursor
+    confirmed = FreezeDetector(
+        min_frames=3, mad_thresh=1.0, hash_max_dist=4, ssim_thresh=0.999
+    )
+    state = {}
+    assert not any(confirmed.process(p, state) for p in frames())
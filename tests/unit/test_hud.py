@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.config.load import HudGlitchConfig, Settings
+from app.detectors.frame import FrameContext, crop, region_rects
+from app.detectors.hud import HudGlitchDetector
+from app.detectors.pipeline import DetectorPipeline
+from app.schemas.models import FramePacket
+from app.schemas.types import AnomalyType
+
+REGIONS = {
+    "full": {"top": 100, "left": 50, "width": 160, "height": 120},
+    "score": {"top": 110, "left": 60, "width": 40, "height": 20},
+}
+
+
+def _frame(score_value: int = 0) -> np.ndarray:
+    img = np.full((120, 160, 3), 60, dtype=np.uint8)
+    cv2.putText(
+        img, str(score_value), (12, 26), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,) * 3
+    )
+    return img
+
+
+def _run(det, frames, state=None):
+    state = {} if state is None else state
+    events = []
+    for i, img in enumerate(frames):
+        pkt = FramePacket(frame_id=i + 1, timestamp=datetime.utcnow(), path=Path("x"))
+        evt = det.process(pkt, state, FrameContext(pkt.frame_id, img))
+        if evt is not None:
+            events.append(evt)
+    return events
+
+
+def test_region_rects_are_relative_to_origin_and_crop_is_a_view():
+    rects = region_rects(REGIONS, ["score"])
+    assert rects == {"score": (10, 10, 40, 20)}
+    img = _frame()
+    roi = crop(img, rects["score"])
+    assert roi.shape == (20, 40, 3) and np.shares_memory(roi, img)
+
+
+def test_learned_templates_flag_corrupted_region():
+    det = HudGlitchDetector(
+        regions=region_rects(REGIONS, ["score"]), warmup=5, min_frames=3
+    )
+    frames = [_frame(i % 3) for i in range(10)]
+    assert _run(det, frames) == []
+
+    state: dict = {}
+    _run(det, frames, state)
+    rng = np.random.default_rng(0)
+    broken = []
+    for _ in range(3):
+        img = _frame(1)
+        img[10:30, 10:50] = rng.integers(0, 256, (20, 40, 3), dtype=np.uint8)
+        broken.append(img)
+    events = _run(det, broken, state)
+    assert len(events) == 1
+    assert events[0].type == AnomalyType.HUD_GLITCH
+    assert events[0].metrics["regions"] == ["score"]
+    assert events[0].metrics["distance"] > det.dist_thresh
+
+
+def test_magenta_region_fires_immediately_and_templates_load_from_dir(tmp_path):
+    cv2.imwrite(str(tmp_path / "score.png"), crop(_frame(7), (10, 10, 40, 20)))
+    det = HudGlitchDetector(
+        regions=region_rects(REGIONS, ["score"]), template_dir=tmp_path, warmup=0
+    )
+    assert _run(det, [_frame(7)]) == []
+
+    img = _frame(7)
+    img[10:30, 10:50] = (255, 0, 255)
+    events = _run(det, [img])
+    assert len(events) == 1
+    assert events[0].metrics["magenta_ratio"] == 1.0
+
+
+def test_pipeline_builds_hud_detector_from_settings(tmp_path):
+    cfg = tmp_path / "detectors.yaml"
+    cfg.write_text("detectors:\n  - hud_glitch\n")
+    settings = Settings(regions=REGIONS)
+    settings.detectors.hud_glitch = HudGlitchConfig(regions=["score"], frames=2)
+
+    pipeline = DetectorPipeline.from_yaml(cfg, settings=settings)
+    (det,) = pipeline.detectors
+    assert isinstance(det, HudGlitchDetector)
+    assert det.regions == {"score": (10, 10, 40, 20)} and det.min_frames == 2
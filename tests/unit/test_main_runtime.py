@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from app import main as main_mod
+from app.config.load import CaptureSettings, RuntimeSettings, Settings
+from app.schemas.models import FramePacket
+
+
+def _fake_capture(n: int):
+    def run(sink, *, settings, scheduler, stop, stream, frame_ids, buffer=None):
+        for _ in range(n):
+            if stop.is_set():
+                break
+            sink(
+                FramePacket(
+                    frame_id=next(frame_ids),
+                    timestamp=datetime.utcnow(),
+                    path=Path("x"),
+                    stream_id=stream,
+                )
+            )
+
+    return run
+
+
+def test_capture_loop_drops_oldest_when_queue_full(monkeypatch):
+    monkeypatch.setattr(main_mod.capture, "capture_loop", _fake_capture(10))
+    settings = Settings(runtime=RuntimeSettings(queue_policy="drop_oldest"))
+    stats = main_mod.RuntimeStats()
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue(maxsize=3)
+        stats.queues["frame"] = q
+        await main_mod.capture_loop(q, settings=settings, stats=stats)
+        return [q.get_nowait().frame_id for _ in range(q.qsize())]
+
+    assert asyncio.run(run()) == [8, 9, 10]
+    snap = stats.snapshot()
+    assert snap["dropped"] == {"frame": 7}
+    assert snap["queue_maxsize"] == {"frame": 3}
+    assert snap["capture"]["full"]["frames"] == 0
+
+
+def test_capture_loop_block_policy_loses_nothing(monkeypatch):
+    monkeypatch.setattr(main_mod.capture, "capture_loop", _fake_capture(10))
+    settings = Settings(runtime=RuntimeSettings(queue_policy="block"))
+    stats = main_mod.RuntimeStats()
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue(maxsize=2)
+        received = []
+
+        async def consume():
+            while len(received) < 10:
+                received.append((await q.get()).frame_id)
+
+        await asyncio.gather(
+            main_mod.capture_loop(q, settings=settings, stats=stats), consume()
+        )
+        return received
+
+    assert asyncio.run(run()) == list(range(1, 11))
+    assert stats.dropped == {}
+
+
+def test_capture_loop_runs_one_thread_per_stream(monkeypatch):
+    monkeypatch.setattr(main_mod.capture, "capture_loop", _fake_capture(5))
+    settings = Settings(
+        capture=CaptureSettings(streams=["left", "right"]),
+        runtime=RuntimeSettings(queue_policy="block"),
+    )
+    stats = main_mod.RuntimeStats()
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue()
+        await main_mod.capture_loop(q, settings=settings, stats=stats)
+        return [q.get_nowait() for _ in range(q.qsize())]
+
+    pkts = asyncio.run(run())
+    assert sorted(p.frame_id for p in pkts) == list(range(1, 11))
+    assert {p.stream_id for p in pkts} == {"left", "right"}
+    assert set(stats.capture) == {"left", "right"}
+
+
+def test_event_clips_wait_for_post_frames(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import timedelta
+
+    from app.capture.buffer import RollingBuffer
+    from app.schemas.models import AnomalyEvent
+    from app.schemas.types import AnomalyType, Severity
+
+    saved = []
+    monkeypatch.setattr(
+        main_mod.artifacts,
+        "save_event_artifacts",
+        lambda evt, pre, post, fps, clips: saved.append((pre, post)),
+    )
+    settings = Settings()
+    settings.clip.pre, settings.clip.post = 1, 1
+    buffer = RollingBuffer(fps=5, seconds=5)
+    t0 = datetime(2024, 1, 1)
+    epoch = main_mod._epoch(t0)
+    for i in range(6):
+        buffer.append(Path(f"{i}.png"), epoch + i * 0.5, frame_id=i)
+    frame = FramePacket(
+        frame_id=4, timestamp=t0 + timedelta(seconds=2), path=Path("4.png")
+    )
+    evt = AnomalyEvent(
+        event_id=1,
+        type=AnomalyType.BLANK,
+        severity=Severity.LOW,
+        frame=frame,
+        confidence=1.0,
+        metrics={},
+    )
+    frame.stream_id = "full"
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    main_mod._defer_artifacts([evt], {"full": buffer}, settings, pool)
+    assert buffer.pending == 1
+    buffer.append(Path("6.png"), epoch + 3.0, frame_id=6)
+    buffer.append(Path("7.png"), epoch + 3.5, frame_id=7)
+    pool.shutdown(wait=True)
+
+    [(pre, post)] = saved
+    assert [ref.path for ref in pre] == [Path("2.png"), Path("3.png")]
+    assert [ref.path for ref in post] == [Path("5.png"), Path("6.png")]
+
+
+def test_encoded_clip_frames_reach_artifacts_undecoded(monkeypatch):
+    from app.capture.buffer import EncodedFrame
+    from app.schemas.models import AnomalyEvent
+    from app.schemas.types import AnomalyType, Severity
+
+    saved = []
+    monkeypatch.setattr(
+        main_mod.artifacts,
+        "save_event_artifacts",
+        lambda evt, pre, post, fps, clips: saved.append((pre, post)),
+    )
+    t0 = datetime(2024, 1, 1)
+    epoch = main_mod._epoch(t0)
+    clip = [EncodedFrame(b"%d" % i, epoch + i - 1, frame_id=i) for i in range(3)]
+    evt = AnomalyEvent(
+        event_id=1,
+        type=AnomalyType.BLANK,
+        severity=Severity.LOW,
+        frame=FramePacket(frame_id=1, timestamp=t0, path=Path("1.png")),
+        confidence=1.0,
+        metrics={},
+    )
+    main_mod._save_artifacts([evt], 5, clip)
+    assert saved == [([clip[0]], [clip[2]])]
+
+
+def test_capture_threads_leave_default_executor_free(monkeypatch):
+    import threading
+
+    release = threading.Event()
+
+    def blocking(sink, *, stop, **kw):
+        while not stop.is_set() and not release.is_set():
+            release.wait(0.01)
+
+    monkeypatch.setattr(main_mod.capture, "capture_loop", blocking)
+    streams = [f"s{i}" for i in range(40)]  # more than the default executor
+    settings = Settings(capture=CaptureSettings(streams=streams))
+
+    async def run():
+        task = asyncio.create_task(
+            main_mod.capture_loop(asyncio.Queue(), settings=settings)
+        )
+        await asyncio.sleep(0.05)
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(lambda: "ok"), 2)
+        finally:
+            release.set()
+            await task
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_capture_loop_uses_given_frame_ids(monkeypatch):
+    import itertools
+
+    monkeypatch.setattr(main_mod.capture, "capture_loop", _fake_capture(3))
+    settings = Settings(runtime=RuntimeSettings(queue_policy="block"))
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue()
+        await main_mod.capture_loop(q, settings=settings, frame_ids=itertools.count(41))
+        return [q.get_nowait().frame_id for _ in range(q.qsize())]
+
+    assert asyncio.run(run()) == [41, 42, 43]
+
+
+@pytest.mark.parametrize("kind", ["files", "mmap"])
+def test_segment_clips_are_cut_when_the_incident_opens(tmp_path, monkeypatch, kind):
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import timedelta
+
+    import numpy as np
+
+    from app.capture.buffer import MmapRingBuffer, RollingBuffer
+    from app.detectors.segments import EventSegmenter
+    from app.schemas.models import AnomalyEvent
+    from app.schemas.types import AnomalyType, Severity
+
+    saved = []
+    monkeypatch.setattr(
+        main_mod.artifacts,
+        "save_event_artifacts",
+        lambda evt, pre, post, fps, clips: saved.append((evt, pre, post)),
+    )
+    settings = Settings()
+    settings.clip.pre, settings.clip.post = 2, 2
+    if kind == "files":
+        buffer = RollingBuffer(fps=5, seconds=5)
+    else:
+        buffer = MmapRingBuffer(tmp_path / "full.ring", fps=5, seconds=5)
+    segments = main_mod.SegmentClips({"full": buffer}, settings.clip)
+    segmenter = EventSegmenter(gap=2, max_length=60, on_open=segments.open)
+    t0 = datetime(2024, 1, 1)
+    epoch = main_mod._epoch(t0)
+
+    # a 10 s blank screen from frame 2 on, detected on every frame
+    closed = []
+    for i in range(70):
+        pkt = FramePacket(
+            frame_id=i,
+            timestamp=t0 + timedelta(seconds=i / 5),
+            path=Path(f"{i}.png"),
+            stream_id="full",
+        )
+        if kind == "files":
+            buffer.append(pkt.path, epoch + i / 5, frame_id=i)
+        else:
+            buffer.append_frame(np.full((4, 4, 3), i, np.uint8), epoch + i / 5, i)
+        detections = []
+        if 2 <= i < 52:
+            detections.append(
+                AnomalyEvent(
+                    event_id=i,
+                    type=AnomalyType.BLANK,
+                    severity=Severity.LOW,
+                    frame=pkt,
+                    confidence=1.0,
+                    metrics={},
+                )
+            )
+        closed += segmenter.feed(pkt, detections)
+        if closed:
+            break
+    [evt] = closed
+    assert evt.frame.frame_id == 2
+    # by the time the incident closes the buffer no longer holds its start
+    assert buffer.window(epoch + 0.4, 2, 2) == []
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    main_mod._defer_artifacts([evt], {"full": buffer}, settings, pool, None, segments)
+    pool.shutdown(wait=True)
+
+    [(_, pre, post)] = saved
+    assert [f.frame_id for f in pre] == [0, 1]
+    assert [f.frame_id for f in post] == [3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+    if kind == "mmap":  # the pinned copies outlive the ring slots
+        assert [int(f.load().mean()) for f in pre] == [0, 1]
@@ -7,7 +7,7 @@ import cv2
 import numpy as np
 
 from app.detectors.blank import BlankDetector
-from app.detectors.pipeline import DetectorPipeline
+from app.detectors.pipeline import DedupWindow, DetectorPipeline
 from app.schemas.models import FramePacket
 
 
@@ -32,3 +32,27 @@ def test_pipeline_deduplicates_same_event_from_multiple_detectors(tmp_path):
     events = pipeline.process(pkt)
     # Without dedup we'd have two events; expect only one
     assert len(events) == 1
+
+
+def test_pipeline_dedup_memory_is_bounded():
+    pipeline = DetectorPipeline(
+        [BlankDetector(min_frames=1, pct=0.99)], dedup_window=10
+    )
+    black = np.zeros((8, 8, 3), dtype=np.uint8)
+    for i in range(1, 101):
+        pkt = FramePacket(
+            frame_id=i, timestamp=datetime.utcnow(), path="x.png", image=black
+        )
+        assert len(pipeline.process(pkt)) == 1
+    assert pipeline.dedup_size <= 10
+
+
+def test_dedup_window_drops_repeats_within_window():
+    seen = DedupWindow(window=5)
+    seen.advance(1)
+    assert seen.add(("blank", 1))
+    assert not seen.add(("blank", 1))
+    seen.advance(5)  # window covers frames 1..5
+    assert len(seen) == 1
+    seen.advance(6)
+    assert len(seen) == 0
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pytest
+
+from app.config.load import Settings
+from app.detectors.base import Detector, DetectorState
+from app.detectors.blank import BlankDetector
+from app.detectors.freeze import FreezeDetector
+from app.detectors.pipeline import DetectorPipeline, Sampling
+from app.detectors.regions import RegionDetector
+from app.schemas.models import FramePacket
+from app.schemas.types import AnomalyType
+
+
+class Recorder(Detector):
+    """Records the frames it ran on and the elapsed frame counts it saw."""
+
+    def __init__(self, suspicious_on: Optional[set] = None) -> None:
+        self.calls: List[int] = []
+        self.elapsed: List[int] = []
+        self.suspicious_on = suspicious_on or set()
+
+    def process(self, pkt, state: DetectorState, ctx=None):
+        self.calls.append(pkt.frame_id)
+        self.elapsed.append(state["elapsed_frames"])
+        state["last"] = pkt.frame_id
+        return None
+
+    def suspicious(self, state: DetectorState) -> bool:
+        return state.get("last") in self.suspicious_on
+
+
+def _packets(frames: np.ndarray) -> List[FramePacket]:
+    pkts = []
+    for i, frame in enumerate(frames):
+        pkt = FramePacket(frame_id=i + 1, timestamp=datetime.utcnow(), path=Path("x"))
+        pkt.image = frame
+        pkts.append(pkt)
+    return pkts
+
+
+def _frames(n: int) -> np.ndarray:
+    return np.zeros((n, 8, 8, 3), dtype=np.uint8)
+
+
+def test_every_nth_frame_reports_elapsed_frames():
+    rec = Recorder()
+    pipeline = DetectorPipeline([rec], sampling=[Sampling(every=3)])
+    for pkt in _packets(_frames(10)):
+        pipeline.process(pkt)
+    assert rec.calls == [1, 4, 7, 10]
+    assert rec.elapsed == [1, 3, 3, 3]
+
+
+def test_sparse_freeze_keeps_min_frames_as_duration():
+    frames = _frames(12)
+    dense = DetectorPipeline([FreezeDetector(min_frames=6)])
+    sparse = DetectorPipeline(
+        [FreezeDetector(min_frames=6)], sampling=[Sampling(every=3)]
+    )
+    dense_ids = [e.frame.frame_id for p in _packets(frames) for e in dense.process(p)]
+    sparse_ids = [e.frame.frame_id for p in _packets(frames) for e in sparse.process(p)]
+    assert dense_ids == [7]
+    # the first frozen sample counts one frame, later ones the whole period,
+    # so the sparse run fires within one sampling period of the dense one
+    assert sparse_ids == [10]
+
+
+def test_isolated_positive_sample_does_not_count_the_gap():
+    frames = np.full((12, 8, 8, 3), 200, dtype=np.uint8)
+    frames[5] = 0  # frame 6 is the only black frame
+    pipeline = DetectorPipeline(
+        [BlankDetector(min_frames=3)], sampling=[Sampling(every=5)]
+    )
+    assert [e for p in _packets(frames) for e in pipeline.process(p)] == []
+
+
+def test_suspicious_detector_boosts_sampled_detector():
+    cheap = Recorder(suspicious_on={5})
+    costly = Recorder()
+    pipeline = DetectorPipeline(
+        [cheap, costly], sampling=[Sampling(), Sampling(every=4, boost=3)]
+    )
+    for pkt in _packets(_frames(14)):
+        pipeline.process(pkt)
+    assert costly.calls == [1, 5, 6, 7, 8, 12]
+    assert costly.elapsed == [1, 4, 1, 1, 1, 4]
+
+
+def test_from_yaml_reads_sampling_entries(tmp_path):
+    cfg = tmp_path / "detectors.yaml"
+    cfg.write_text(
+        "detectors:\n"
+        "  - name: blank\n    hz: 5\n    boost_frames: 10\n"
+        "  - name: freeze\n    every: 4\n"
+        "  - flicker\n"
+    )
+    pipeline = DetectorPipeline.from_yaml(cfg, settings=Settings(fps=30))
+    assert pipeline.sampling == [
+        Sampling(every=6, boost=10),
+        Sampling(every=4),
+        Sampling(),
+    ]
+    assert not pipeline.dense
+
+
+def test_process_clip_with_sampling_matches_process():
+    frames = _frames(12)
+    make = lambda: DetectorPipeline(  # noqa: E731
+        [FreezeDetector(min_frames=4)], sampling=[Sampling(every=2)]
+    )
+    streaming = make()
+    expected = [e for p in _packets(frames) for e in streaming.process(p)]
+    pkts = _packets(frames)
+    for pkt in pkts:
+        pkt.image = None
+    got = make().process_clip(pkts, frames)
+    assert [e.frame.frame_id for e in got] == [e.frame.frame_id for e in expected]
+    assert all(e.type == AnomalyType.FREEZE for e in got) and got
+
+
+class BatchSpy(Detector):
+    """Dense detector without suspicion, counting batched calls."""
+
+    def __init__(self) -> None:
+        self.batches = 0
+
+    def process(self, pkt, state: DetectorState, ctx=None):
+        return None
+
+    def process_batch(self, frames, pkts, state):
+        self.batches += 1
+        return super().process_batch(frames, pkts, state)
+
+
+def test_process_clip_batches_dense_detectors_next_to_sampled_ones():
+    frames = np.concatenate([_frames(8), np.full((8, 8, 8, 3), 200, np.uint8)])
+    make = lambda: (  # noqa: E731
+        [BatchSpy(), FreezeDetector(min_frames=3), BlankDetector(min_frames=4)],
+        [Sampling(), Sampling(), Sampling(every=3, boost=4)],
+    )
+    dets, sampling = make()
+    streaming = DetectorPipeline(dets, sampling=sampling)
+    expected = [e for p in _packets(frames) for e in streaming.process(p)]
+
+    dets, sampling = make()
+    got = DetectorPipeline(dets, sampling=sampling).process_clip(
+        _packets(frames), frames
+    )
+    key = lambda e: (e.frame.frame_id, e.type)  # noqa: E731
+    assert [key(e) for e in got] == [key(e) for e in expected]
+    assert {e.type for e in got} == {AnomalyType.FREEZE, AnomalyType.BLANK}
+    # the spy ran batched; freeze can boost blank, so it is replayed
+    assert dets[0].batches == 1
+
+
+class StrideSpy(Detector):
+    """Records the frame ids and elapsed frames of each batched call."""
+
+    def __init__(self) -> None:
+        self.batches: List[tuple] = []
+
+    def process(self, pkt, state: DetectorState, ctx=None):
+        return None
+
+    def process_batch(self, frames, pkts, state):
+        self.batches.append(([p.frame_id for p in pkts], state["elapsed_frames"]))
+        return []
+
+
+def test_process_clip_batches_sparse_detectors_on_their_frames():
+    frames = _frames(12)
+    spy = StrideSpy()
+    pipeline = DetectorPipeline([spy], sampling=[Sampling(every=3)])
+    pipeline.process_clip(_packets(frames)[:7], frames[:7])
+    pipeline.process_clip(_packets(frames)[7:], frames[7:])
+    assert spy.batches == [([1], 1), ([4, 7], 3), ([10], 3)]
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        lambda: BlankDetector(min_frames=6),
+        lambda: RegionDetector(BlankDetector(min_frames=6), {"top": (0, 0, 8, 4)}),
+    ],
+)
+def test_process_clip_with_sparse_batches_matches_process(make):
+    frames = np.full((30, 8, 8, 3), 200, dtype=np.uint8)
+    frames[4:17] = 0
+    frames[20:] = 0
+    streaming = DetectorPipeline([make()], sampling=[Sampling(every=4)])
+    expected = [e for p in _packets(frames) for e in streaming.process(p)]
+
+    pkts = _packets(frames)
+    for pkt in pkts:
+        pkt.image = None
+    got = DetectorPipeline([make()], sampling=[Sampling(every=4)]).process_clip(
+        pkts, frames
+    )
+    assert [e.frame.frame_id for e in got] == [e.frame.frame_id for e in expected]
+    assert len(got) == 2
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from concurrent.futures import wait
+from datetime import datetime
+
+import numpy as np
+
+from app.detectors.blank import BlankDetector
+from app.detectors.flicker import FlickerDetector
+from app.detectors.pipeline import DetectorPipeline
+from app.detectors.workers import DetectionPool
+from app.schemas.models import FramePacket
+
+
+def _pkt(frame_id: int, stream: str, val: int) -> FramePacket:
+    return FramePacket(
+        frame_id=frame_id,
+        timestamp=datetime.utcnow(),
+        path="x.png",
+        image=np.full((16, 16, 3), val, dtype=np.uint8),
+        stream_id=stream,
+    )
+
+
+def test_interleaved_streams_keep_independent_state():
+    pipeline = DetectorPipeline([FlickerDetector(window=8, ratio_thresh=0.6)])
+    events = []
+    # one dark and one bright stream interleaved would look like flicker if
+    # they shared state
+    for i in range(16):
+        stream, val = ("a", 0) if i % 2 == 0 else ("b", 255)
+        events += pipeline.process(_pkt(i, stream, val))
+    assert events == []
+    assert sorted(pipeline.streams) == ["a", "b"]
+
+
+def test_many_streams_on_shared_thread_pool():
+    pool = DetectionPool(
+        lambda: DetectorPipeline([BlankDetector(min_frames=3, pct=0.99)]), workers=4
+    )
+    streams = [f"rig{i}" for i in range(8)]
+    futs = {s: [] for s in streams}
+    frame_id = 0
+    for _ in range(6):
+        for s in streams:
+            frame_id += 1
+            futs[s].append(pool.submit(_pkt(frame_id, s, 0)))
+    wait([f for fs in futs.values() for f in fs])
+    pool.shutdown()
+
+    for s in streams:
+        hits = [i for i, f in enumerate(futs[s]) if f.result()]
+        assert hits == [2, 5], s
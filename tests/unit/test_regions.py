@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.config.load import Settings
+from app.detectors.blank import BlankDetector
+from app.detectors.frame import FrameContext
+from app.detectors.freeze import FreezeDetector
+from app.detectors.pipeline import DetectorPipeline
+from app.detectors.regions import RegionDetector
+from app.schemas.models import FramePacket
+from app.schemas.types import AnomalyType
+
+RECTS = {"minimap": (0, 0, 32, 32), "hud": (64, 48, 48, 24)}
+
+
+def _packets(n: int):
+    return [
+        FramePacket(frame_id=i + 1, timestamp=datetime.utcnow(), path=Path("x"))
+        for i in range(n)
+    ]
+
+
+def _frames(n: int) -> np.ndarray:
+    """Noisy frames whose minimap corner goes black from frame 3 on."""
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, (n, 96, 128, 3), dtype=np.uint8)
+    frames[2:, :32, :32] = 0
+    return frames
+
+
+def _replay(det, frames, pkts, state):
+    events = []
+    for frame, pkt in zip(frames, pkts):
+        evt = det.process(pkt, state, FrameContext(pkt.frame_id, frame))
+        if evt is not None:
+            events.append(evt)
+    return events
+
+
+def test_region_detector_reports_only_the_region_that_fired():
+    det = RegionDetector(BlankDetector(min_frames=3), RECTS)
+    state: dict = {}
+    events = _replay(det, _frames(6), _packets(6), state)
+
+    assert [e.frame.frame_id for e in events] == [5]
+    evt = events[0]
+    assert evt.type == AnomalyType.BLANK
+    assert evt.metrics["regions"] == ["minimap"]
+    assert evt.metrics["minimap.luma_ratio"] == 1.0
+    assert set(state["regions"]) == {"minimap", "hud"}
+    # a whole-frame blank check never fires on these frames
+    assert _replay(BlankDetector(min_frames=3), _frames(6), _packets(6), {}) == []
+
+
+def test_region_contexts_are_zero_copy_and_shared():
+    frame = _frames(1)[0]
+    ctx = FrameContext(1, frame)
+    sub = ctx.region(RECTS["hud"])
+    assert sub is ctx.region(RECTS["hud"])
+    assert sub.bgr.shape == (24, 48, 3) and np.shares_memory(sub.bgr, frame)
+
+
+def test_region_detector_batch_matches_replay():
+    frames = np.concatenate([_frames(6), np.repeat(_frames(1), 5, axis=0)])
+    pkts = _packets(len(frames))
+    make = lambda: RegionDetector(FreezeDetector(min_frames=2), RECTS)  # noqa: E731
+
+    expected = _replay(make(), frames, pkts, {})
+    got = make().process_batch(frames, pkts, {})
+
+    assert expected
+    assert [(e.frame.frame_id, e.event_id, e.metrics) for e in got] == [
+        (e.frame.frame_id, e.event_id, e.metrics) for e in expected
+    ]
+
+
+def test_pipeline_wraps_detectors_with_configured_regions(tmp_path):
+    cfg = tmp_path / "detectors.yaml"
+    cfg.write_text("detectors:\n  - blank\n  - freeze\n")
+    settings = Settings(
+        regions={
+            "full": {"top": 0, "left": 0, "width": 128, "height": 96},
+            "minimap": {"top": 0, "left": 0, "width": 32, "height": 32},
+        }
+    )
+    settings.detectors.blank.regions = ["minimap"]
+
+    blank, freeze = DetectorPipeline.from_yaml(cfg, settings=settings).detectors
+    assert isinstance(blank, RegionDetector)
+    assert blank.regions == {"minimap": (0, 0, 32, 32)}
+    assert isinstance(freeze, FreezeDetector)
+
+
+def test_region_rects_follow_each_stream_origin(tmp_path):
+    cfg = tmp_path / "detectors.yaml"
+    cfg.write_text("detectors:\n  - blank\n")
+    settings = Settings(
+        regions={
+            "full": {"top": 0, "left": 0, "width": 128, "height": 96},
+            "right": {"top": 16, "left": 64, "width": 64, "height": 64},
+            "badge": {"top": 32, "left": 80, "width": 16, "height": 16},
+        }
+    )
+    settings.capture.streams = ["full", "right"]
+    settings.detectors.blank.regions = ["badge"]
+    (det,) = DetectorPipeline.from_yaml(cfg, settings=settings).detectors
+    assert det.rects("full") == {"badge": (80, 32, 16, 16)}
+    assert det.rects("right") == {"badge": (16, 16, 16, 16)}
+
+    # the badge goes black; on the "right" stream it sits at (16, 16)
+    pipeline = DetectorPipeline([det])
+    frame = np.full((64, 64, 3), 200, dtype=np.uint8)
+    frame[16:32, 16:32] = 0
+    ids = []
+    for pkt in _packets(3):
+        pkt.stream_id, pkt.image = "right", frame
+        ids += [e.frame.frame_id for e in pipeline.process(pkt)]
+    assert ids == [3]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from app.detectors.segments import EventSegmenter
+from app.schemas.models import AnomalyEvent, FramePacket
+from app.schemas.types import AnomalyType, Severity
+
+T0 = datetime(2024, 1, 1)
+
+
+def _pkt(frame_id: int, t: float, stream: str = "full") -> FramePacket:
+    return FramePacket(
+        frame_id=frame_id,
+        timestamp=T0 + timedelta(seconds=t),
+        path="x.png",
+        stream_id=stream,
+    )
+
+
+def _evt(pkt: FramePacket, conf: float = 0.5, kind=AnomalyType.BLANK) -> AnomalyEvent:
+    return AnomalyEvent(
+        event_id=1,
+        type=kind,
+        severity=Severity.HIGH,
+        frame=pkt,
+        confidence=conf,
+        metrics={"conf": conf},
+        created_at=T0,
+    )
+
+
+def _run(seg: EventSegmenter, detections, frames):
+    """Feed ``frames`` (id, t) and return closed events; ``detections`` maps id -> conf."""
+    closed = []
+    for frame_id, t in frames:
+        pkt = _pkt(frame_id, t)
+        evts = [_evt(pkt, detections[frame_id])] if frame_id in detections else []
+        closed += seg.feed(pkt, evts)
+    return closed
+
+
+def test_detections_within_gap_merge_and_close_after_gap():
+    seg = EventSegmenter(gap=1.0)
+    frames = [(i, i * 0.5) for i in range(1, 11)]
+    closed = _run(seg, {2: 0.4, 3: 0.9, 4: 0.6}, frames)
+    assert len(closed) == 1
+    evt = closed[0]
+    # reported on the first frame with the peak detection's metrics
+    assert evt.frame.frame_id == 2
+    assert evt.confidence == 0.9 and evt.metrics["conf"] == 0.9
+    assert evt.metrics["segment_start_frame"] == 2
+    assert evt.metrics["segment_end_frame"] == 4
+    assert evt.metrics["segment_peak_frame"] == 3
+    assert evt.metrics["segment_detections"] == 3
+    assert evt.metrics["segment_duration_s"] == 1.0
+    assert seg.open_segments == 0
+
+
+def test_gap_splits_intervals():
+    seg = EventSegmenter(gap=1.0)
+    frames = [(i, float(i)) for i in range(1, 10)]
+    closed = _run(seg, {1: 0.5, 2: 0.5, 5: 0.5}, frames)
+    closed += seg.flush()
+    assert [e.metrics["segment_start_frame"] for e in closed] == [1, 5]
+
+
+def test_max_length_cuts_long_intervals():
+    seg = EventSegmenter(gap=5.0, max_length=3.0)
+    frames = [(i, float(i)) for i in range(0, 8)]
+    closed = _run(seg, {i: 0.5 for i in range(0, 8)}, frames)
+    assert [
+        (e.metrics["segment_start_frame"], e.metrics["segment_end_frame"])
+        for e in closed
+    ] == [(0, 3), (4, 7)]
+
+
+def test_streams_and_types_are_segmented_separately():
+    seg = EventSegmenter(gap=10.0)
+    a, b = _pkt(1, 0.0, "a"), _pkt(1, 0.0, "b")
+    seg.feed(a, [_evt(a), _evt(a, kind=AnomalyType.FREEZE)])
+    seg.feed(b, [_evt(b)])
+    assert seg.open_segments == 3
+    # a late frame on stream "a" closes only that stream's intervals
+    assert len(seg.feed(_pkt(2, 20.0, "a"), [])) == 2
+    assert seg.open_segments == 1
+
+
+def test_flush_closes_open_intervals():
+    seg = EventSegmenter(gap=1.0)
+    closed = _run(seg, {1: 0.3, 2: 0.7}, [(1, 0.0), (2, 0.5)])
+    assert closed == []
+    (evt,) = seg.flush()
+    assert evt.metrics["segment_detections"] == 2
+    assert evt.confidence == 0.7
+    assert seg.flush() == []
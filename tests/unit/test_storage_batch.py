@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from app import main as main_mod
+from app.config.load import RuntimeSettings, Settings
+from app.schemas.models import AnomalyEvent, FramePacket
+from app.schemas.types import AnomalyType, Severity
+from app.storage import batch as batch_mod
+from app.storage import db, models
+from app.storage.batch import CommitStats, persist_events
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    db._engine = None  # type: ignore[attr-defined]
+    db._SessionLocal = None  # type: ignore[attr-defined]
+    db.init_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    models.Base.metadata.create_all(db.get_engine())
+    yield
+    db._engine = None  # type: ignore[attr-defined]
+    db._SessionLocal = None  # type: ignore[attr-defined]
+
+
+def _event(eid: int, path: Path) -> AnomalyEvent:
+    frame = FramePacket(frame_id=eid, timestamp=datetime.utcnow(), path=path)
+    return AnomalyEvent(
+        event_id=eid,
+        type=AnomalyType.BLANK,
+        severity=Severity.LOW,
+        frame=frame,
+        confidence=0.9,
+        metrics={"value": 1.0},
+    )
+
+
+def _stored_ids() -> list[int]:
+    with db.session_scope() as session:
+        return sorted(e.id for e in session.query(models.Event).all())
+
+
+def test_persist_events_commits_batch_atomically(tmp_path, fresh_db, monkeypatch):
+    stats = CommitStats()
+    persist_events(
+        [_event(1, tmp_path / "a.png"), _event(2, tmp_path / "b.png")], stats
+    )
+    assert _stored_ids() == [1, 2]
+
+    real_save = batch_mod.repo.save_event
+
+    def failing_save(session, evt):
+        if evt.event_id == 4:
+            raise RuntimeError("boom")
+        return real_save(session, evt)
+
+    monkeypatch.setattr(batch_mod.repo, "save_event", failing_save)
+    with pytest.raises(RuntimeError):
+        persist_events(
+            [_event(3, tmp_path / "c.png"), _event(4, tmp_path / "d.png")], stats
+        )
+    assert _stored_ids() == [1, 2]
+
+    snap = stats.snapshot()
+    assert snap["batches"] == 1 and snap["events"] == 2 and snap["failures"] == 1
+    assert snap["last_ms"] > 0
+
+
+def test_event_loop_commits_in_micro_batches(tmp_path, fresh_db, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    settings = Settings(runtime=RuntimeSettings(persist_batch=3, persist_interval=0.05))
+    stats = main_mod.RuntimeStats()
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue()
+        for i in range(1, 8):
+            q.put_nowait(_event(i, tmp_path / f"{i}.png"))
+        task = asyncio.create_task(
+            main_mod.event_loop(q, settings=settings, stats=stats)
+        )
+        while stats.commits.events < 7:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert _stored_ids() == list(range(1, 8))
+    assert stats.commits.batches == 3  # 3 + 3 + 1
+
+
+def test_event_loop_retries_failed_commit(tmp_path, fresh_db, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    settings = Settings(
+        runtime=RuntimeSettings(
+            persist_batch=2, persist_interval=0.01, persist_backoff=0.01
+        )
+    )
+    stats = main_mod.RuntimeStats()
+    real_persist = main_mod.persist_events
+    failures = [RuntimeError("database is locked")] * 2
+
+    def flaky(batch, commit_stats):
+        if failures:
+            raise failures.pop()
+        return real_persist(batch, commit_stats)
+
+    monkeypatch.setattr(main_mod, "persist_events", flaky)
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue()
+        q.put_nowait(_event(1, tmp_path / "1.png"))
+        q.put_nowait(_event(2, tmp_path / "2.png"))
+        task = asyncio.create_task(
+            main_mod.event_loop(q, settings=settings, stats=stats)
+        )
+        while stats.commits.events < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert _stored_ids() == [1, 2]
+    assert failures == []
+
+
+def test_event_loop_assigns_unique_event_ids(tmp_path, fresh_db, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    persist_events([_event(5, tmp_path / "old.png")])
+    settings = Settings(runtime=RuntimeSettings(persist_batch=4, persist_interval=0.01))
+    stats = main_mod.RuntimeStats()
+    # two streams whose detectors both numbered their first event 1
+    a, b = _event(1, tmp_path / "a.png"), _event(1, tmp_path / "b.png")
+    a.frame.stream_id, b.frame.stream_id = "a", "b"
+    b.frame.frame_id = 2
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue()
+        q.put_nowait(a)
+        q.put_nowait(b)
+        task = asyncio.create_task(
+            main_mod.event_loop(q, settings=settings, stats=stats)
+        )
+        while stats.commits.events < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert (a.event_id, b.event_id) == (6, 7)
+    assert _stored_ids() == [5, 6, 7]
+
+
+def test_next_frame_id_continues_after_stored_frames(tmp_path, fresh_db):
+    assert batch_mod.next_frame_id() == 1
+    persist_events([_event(5, tmp_path / "old.png")])
+    assert batch_mod.next_frame_id() == 6